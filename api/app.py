@@ -1,31 +1,58 @@
 import os
+import io
 import sys
+import csv
 import json
-import pandas as pd
-from flask import Flask, request, jsonify, render_template, send_from_directory
+import time
+from datetime import datetime, timezone
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
 from flask_cors import CORS
-import threading
 
 # Add parent directory to path to import from scraper
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from scraper.scraper import SportsScraper
-from scraper.config import AVAILABLE_LEAGUES, AVAILABLE_STATISTICS
+from scraper.config import (
+    AVAILABLE_LEAGUES,
+    AVAILABLE_STATISTICS,
+    BROWSER_BUDGET,
+    DATA_STREAM_CHUNK_ROWS,
+    JOB_DB_FILENAME,
+    JOB_EVENT_HEARTBEAT,
+    JOB_EVENT_POLL_INTERVAL,
+    JOB_WORKERS,
+    ODDS_QUERY_MAX_ROWS,
+    SPORTSBOOKS,
+)
+from scraper.metrics import render_prometheus
+from scraper import odds_store as odds
+from scraper.writers import OUTPUT_COLUMNS
+from api import datasets
+from api.job_queue import FINISHED_STATUSES, JobQueue
+from api.job_worker import JobWorkerPool
 
 app = Flask(__name__, 
             static_folder='../static',
             template_folder='../templates')
 CORS(app)  # Enable Cross-Origin Resource Sharing
 
-# Keep track of running jobs
-active_jobs = {}
-job_lock = threading.Lock()
-job_counter = 0
-
 # Create data directory if it doesn't exist
 data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
 if not os.path.exists(data_dir):
     os.makedirs(data_dir)
 
+# Jobs live in SQLite so they survive restarts; worker processes run them
+job_queue = JobQueue(os.path.join(data_dir, JOB_DB_FILENAME))
+# Every row the workers write, across jobs, for /api/odds queries (None if disabled)
+odds_store = odds.open_odds_store(data_dir)
+workers = None
+
+def start_workers(size=JOB_WORKERS, browser_budget=BROWSER_BUDGET):
+    """Start the job worker processes (once per server process)"""
+    global workers
+    if workers is None:
+        workers = JobWorkerPool(job_queue.path, data_dir, size=size, browser_budget=browser_budget)
+        workers.start()
+    return workers
+
 @app.route('/')
 def index():
     """Render the main page"""
@@ -41,110 +68,357 @@ def get_statistics():
     """Get available statistics"""
     return jsonify({"statistics": AVAILABLE_STATISTICS})
 
+@app.route('/api/sportsbooks', methods=['GET'])
+def get_sportsbooks():
+    """Get available sportsbooks and their concurrent browser limits"""
+    return jsonify({"sportsbooks": list(SPORTSBOOKS), "limits": SPORTSBOOKS})
+
 @app.route('/api/scrape', methods=['POST'])
 def start_scrape():
-    """Start a scraping job"""
-    global job_counter
-    
+    """Queue a scraping job"""
     data = request.get_json()
     leagues = data.get('leagues', [])
-    statistic = data.get('statistic', '')
+    # Accept a list of statistics, or a single statistic for older clients
+    statistics = data.get('statistics') or ([data['statistic']] if data.get('statistic') else [])
+    books = data.get('books') or None
     
     # Validate input
     if not leagues:
         return jsonify({"error": "No leagues selected"}), 400
     
-    if not statistic:
+    if not statistics:
         return jsonify({"error": "No statistic selected"}), 400
     
-    # Check if leagues and statistic are valid
+    # Check if leagues and statistics are valid
     invalid_leagues = [league for league in leagues if league not in AVAILABLE_LEAGUES]
     if invalid_leagues:
         return jsonify({"error": f"Invalid leagues: {', '.join(invalid_leagues)}"}), 400
     
-    if statistic not in AVAILABLE_STATISTICS:
-        return jsonify({"error": f"Invalid statistic: {statistic}"}), 400
-    
-    # Create a job ID
-    with job_lock:
-        job_id = job_counter
-        job_counter += 1
-        active_jobs[job_id] = {
-            "leagues": leagues,
-            "statistic": statistic,
-            "status": "starting",
-            "output_file": None
-        }
-    
-    # Start the scraper in a separate thread
-    thread = threading.Thread(target=run_scraper_job, args=(job_id, leagues, statistic))
-    thread.daemon = True
-    thread.start()
+    invalid_statistics = [statistic for statistic in statistics if statistic not in AVAILABLE_STATISTICS]
+    if invalid_statistics:
+        return jsonify({"error": f"Invalid statistics: {', '.join(invalid_statistics)}"}), 400
+    
+    invalid_books = [book for book in books or [] if book not in SPORTSBOOKS]
+    if invalid_books:
+        return jsonify({"error": f"Invalid sportsbooks: {', '.join(invalid_books)}"}), 400
+    
+    try:
+        priority = int(data.get('priority', 0))
+        browsers = int(data['browsers']) if data.get('browsers') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "priority and browsers must be integers"}), 400
+    if browsers is not None and browsers < 1:
+        return jsonify({"error": "browsers must be at least 1"}), 400
+    
+    job_id = job_queue.submit(leagues, statistics, priority=priority, browsers=browsers, books=books)
     
     return jsonify({
         "job_id": job_id,
-        "status": "started",
-        "message": f"Started scraping {statistic} for {', '.join(leagues)}"
+        "status": "queued",
+        "message": f"Queued scraping {', '.join(statistics)} for {', '.join(leagues)}"
+                   + (f" on {', '.join(books)}" if books else "")
     })
 
-def run_scraper_job(job_id, leagues, statistic):
-    """Run the scraper job in a separate thread"""
-    try:
-        # Update job status
-        with job_lock:
-            active_jobs[job_id]["status"] = "running"
-        
-        # Create scraper and run the job
-        scraper = SportsScraper(output_dir=data_dir)
-        output_file = scraper.scrape_data(leagues, statistic)
-        
-        # Update job status
-        with job_lock:
-            active_jobs[job_id]["status"] = "completed"
-            active_jobs[job_id]["output_file"] = os.path.basename(output_file)
-    
-    except Exception as e:
-        # Update job status on error
-        with job_lock:
-            active_jobs[job_id]["status"] = "failed"
-            active_jobs[job_id]["error"] = str(e)
-
 @app.route('/api/job/<int:job_id>', methods=['GET'])
 def get_job_status(job_id):
     """Get the status of a job"""
-    if job_id not in active_jobs:
+    job = job_queue.get(job_id)
+    if job is None:
         return jsonify({"error": "Job not found"}), 404
     
-    return jsonify(active_jobs[job_id])
+    return jsonify(job)
+
+@app.route('/api/job/<int:job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """
+    Server-Sent Events stream of a job's progress
+
+    Sends `status` events with the full job on every status change and a
+    `rows` event with each game's rows as soon as it is scraped. The stream
+    ends after the job finishes; reconnecting clients resume from Last-Event-ID.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    last_id = request.headers.get('Last-Event-ID', type=int) or request.args.get('after', 0, type=int)
+    
+    def generate():
+        after = last_id
+        last_sent = time.monotonic()
+        # Events of long-finished jobs may have been pruned
+        finished = job["status"] in FINISHED_STATUSES
+        while True:
+            events = job_queue.events(job_id, after)
+            for event_id, event_type, data in events:
+                yield f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+                after = event_id
+                if event_type == "status" and json.loads(data)["status"] in FINISHED_STATUSES:
+                    finished = True
+            if events:
+                last_sent = time.monotonic()
+                continue
+            if finished:
+                yield "event: end\ndata: {}\n\n"
+                return
+            if time.monotonic() - last_sent >= JOB_EVENT_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(JOB_EVENT_POLL_INTERVAL)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/job/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued job, or ask the worker running it to stop"""
+    status = job_queue.cancel(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    return jsonify({"job_id": job_id, "status": status, "cancel_requested": status == "running"})
 
 @app.route('/api/data/<filename>', methods=['GET'])
 def get_data(filename):
-    """Get data from a completed job"""
+    """
+    Stream rows from a job's output file as JSON
+
+    Query parameters:
+        offset, limit: Pagination over matching rows (limit defaults to all rows)
+        columns: Comma-separated columns to return
+        book, league, team, player, statistic: Server-side filters
+    """
     try:
         file_path = os.path.join(data_dir, filename)
         if not os.path.exists(file_path):
             return jsonify({"error": "File not found"}), 404
         
-        # Read CSV file
-        df = pd.read_csv(file_path)
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', type=int)
+        if offset < 0 or (limit is not None and limit < 0):
+            return jsonify({"error": "offset and limit must be non-negative"}), 400
+        
+        available_columns = datasets.get_columns(file_path)
+        columns = [c for c in request.args.get('columns', '').split(',') if c] or None
+        if columns:
+            unknown = [c for c in columns if c not in available_columns]
+            if unknown:
+                return jsonify({"error": f"Unknown columns: {', '.join(unknown)}"}), 400
         
-        # Convert to dictionary format
-        data = df.to_dict(orient='records')
+        filters = {name: request.args.get(name) for name in datasets.FILTERS if request.args.get(name)}
+        total = None if filters else datasets.get_row_count(file_path)
         
-        return jsonify({"data": data})
+        # Read one extra row to tell whether another page exists
+        rows = datasets.iter_rows(file_path, offset=offset,
+                                  limit=None if limit is None else limit + 1,
+                                  columns=columns, filters=filters)
+        
+        def generate():
+            yield '{"offset": %d, "limit": %s, "total": %s, "data": [' % (
+                offset, json.dumps(limit), json.dumps(total))
+            count = 0
+            has_more = False
+            chunk = []
+            for row in rows:
+                if limit is not None and count >= limit:
+                    has_more = True
+                    break
+                chunk.append(json.dumps(row))
+                count += 1
+                if len(chunk) >= DATA_STREAM_CHUNK_ROWS:
+                    yield ('' if count == len(chunk) else ',') + ','.join(chunk)
+                    chunk = []
+            if chunk:
+                yield ('' if count == len(chunk) else ',') + ','.join(chunk)
+            yield '], "count": %d, "has_more": %s}' % (count, json.dumps(has_more))
+        
+        return Response(stream_with_context(generate()), mimetype='application/json')
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def stream_csv(rows, columns):
+    """Yield rows as CSV text, DATA_STREAM_CHUNK_ROWS rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % DATA_STREAM_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_file(filename):
-    """Download the CSV file"""
+    """
+    Download the output file
+
+    The file on disk is authoritative: store inserts can fail without stopping
+    the writer. A CSV run whose file is gone is rendered from the odds store.
+    """
+    file_exists = os.path.isfile(os.path.join(data_dir, os.path.basename(filename)))
+    if not file_exists and odds_store and filename.endswith('.csv') and odds_store.has_run(filename):
+        rows = odds_store.iter_rows({"run": filename})
+        return Response(stream_with_context(stream_csv(rows, OUTPUT_COLUMNS)), mimetype='text/csv',
+                        headers={"Content-Disposition": f"attachment; filename={filename}"})
     return send_from_directory(data_dir, filename, as_attachment=True)
 
+def parse_time(text):
+    """Parse a since/until parameter: Unix seconds or an ISO 8601 time (UTC if no zone)"""
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        parsed = datetime.fromisoformat(text)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+
+def odds_query_args():
+    """Read the filter, time range and latest parameters shared by /api/odds endpoints"""
+    filters = {name: request.args.get(name) for name in odds.FILTERS if request.args.get(name)}
+    return {
+        "filters": filters,
+        "since": parse_time(request.args.get('since')),
+        "until": parse_time(request.args.get('until')),
+        "latest": request.args.get('latest', '').lower() in ('1', 'true', 'yes'),
+    }
+
+@app.route('/api/odds', methods=['GET'])
+def get_odds():
+    """
+    Query scraped rows across every run, newest first
+
+    Query parameters:
+        run, book, league, game, player, team, statistic: Exact (case-insensitive) filters
+        since, until: Scrape time range, as Unix seconds or ISO 8601
+        latest: Only the most recent row of each line (game, player, statistic, value, book)
+        offset, limit: Pagination (limit defaults to and is capped at ODDS_QUERY_MAX_ROWS)
+        columns: Comma-separated columns to return
+    """
+    if odds_store is None:
+        return jsonify({"error": "The odds store is disabled"}), 404
+    try:
+        args = odds_query_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    offset = request.args.get('offset', 0, type=int)
+    limit = min(request.args.get('limit', ODDS_QUERY_MAX_ROWS, type=int), ODDS_QUERY_MAX_ROWS)
+    if offset < 0 or limit < 0:
+        return jsonify({"error": "offset and limit must be non-negative"}), 400
+    columns = [c for c in request.args.get('columns', '').split(',') if c] or odds.COLUMNS
+    unknown = [c for c in columns if c not in odds.COLUMNS]
+    if unknown:
+        return jsonify({"error": f"Unknown columns: {', '.join(unknown)}"}), 400
+    
+    # Read one extra row to tell whether another page exists
+    rows = list(odds_store.iter_rows(newest_first=True, limit=limit + 1, offset=offset, **args))
+    data = [{column: row[column] for column in columns} for row in rows[:limit]]
+    return jsonify({"offset": offset, "limit": limit, "count": len(data),
+                    "has_more": len(rows) > limit, "data": data})
+
+@app.route('/api/odds/aggregate', methods=['GET'])
+def get_odds_aggregate():
+    """
+    Row count, min/max/average odds and first/last scrape time per group
+
+    Query parameters:
+        group_by: Comma-separated groups (run, book, league, game, player, team,
+            statistic, value, day)
+        Plus the filters, since, until and latest of /api/odds
+    """
+    if odds_store is None:
+        return jsonify({"error": "The odds store is disabled"}), 404
+    try:
+        group_by = [g for g in request.args.get('group_by', '').split(',') if g]
+        groups = odds_store.aggregate(group_by, **odds_query_args())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"group_by": group_by, "groups": groups})
+
+@app.route('/api/odds/compare', methods=['GET'])
+def get_odds_compare():
+    """
+    Latest odds of each line at every sportsbook, with the best price
+
+    Query parameters:
+        min_books: Only lines offered by at least this many books (default 1)
+        Plus the filters, since and until of /api/odds
+    """
+    if odds_store is None:
+        return jsonify({"error": "The odds store is disabled"}), 404
+    try:
+        args = odds_query_args()
+        args.pop("latest")
+        lines = odds_store.compare(min_books=request.args.get('min_books', 1, type=int), **args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"lines": lines})
+
+@app.route('/api/odds/runs', methods=['GET'])
+def get_odds_runs():
+    """Recent runs in the odds store with their row counts"""
+    if odds_store is None:
+        return jsonify({"error": "The odds store is disabled"}), 404
+    return jsonify({"runs": odds_store.runs()})
+
+@app.route('/api/odds/export.csv', methods=['GET'])
+def export_odds():
+    """Stream matching rows as CSV, in the order they were scraped; takes the /api/odds filters"""
+    if odds_store is None:
+        return jsonify({"error": "The odds store is disabled"}), 404
+    try:
+        rows = odds_store.iter_rows(**odds_query_args())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return Response(stream_with_context(stream_csv(rows, odds.COLUMNS)), mimetype='text/csv',
+                    headers={"Content-Disposition": "attachment; filename=odds.csv"})
+
+@app.route('/api/pool', methods=['GET'])
+def get_pool_stats():
+    """Get driver pool metrics reported by each job worker"""
+    return jsonify({name: stats.get("pool") for name, stats in job_queue.worker_stats().items()})
+
+@app.route('/api/readiness', methods=['GET'])
+def get_readiness_stats():
+    """Get measured readiness waits per scrape step, per job worker"""
+    return jsonify({name: stats.get("readiness") for name, stats in job_queue.worker_stats().items()})
+
+@app.route('/api/cache', methods=['GET'])
+def get_cache_stats():
+    """Get result cache hit/miss metrics, per job worker"""
+    return jsonify({name: stats.get("cache") for name, stats in job_queue.worker_stats().items()})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus-style step timings and per-league counters from every job worker"""
+    worker_stats = job_queue.worker_stats()
+    snapshots = [({"worker": name}, stats["metrics"]) for name, stats in worker_stats.items() if stats.get("metrics")]
+    now = time.time()
+    gauges = [
+        ("scraper_jobs", "Jobs in the queue by status", {"status": status}, count)
+        for status, count in sorted(job_queue.status_counts().items())
+    ]
+    gauges += [
+        ("scraper_worker_report_age_seconds", "Seconds since each job worker last reported",
+         {"worker": name}, round(now - stats["updated_at"], 3))
+        for name, stats in worker_stats.items()
+    ]
+    return Response(render_prometheus(snapshots, gauges), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/jobs', methods=['GET'])
 def get_jobs():
-    """Get all jobs"""
-    return jsonify({"jobs": active_jobs})
+    """Get recent jobs"""
+    return jsonify({"jobs": job_queue.list()})
 
 if __name__ == '__main__':
+    # The reloader runs the app in a child process; only start workers there
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_workers()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""
+Streaming, paginated access to scraper output files
+
+Rows are read lazily so memory stays flat regardless of file size. For CSV and
+NDJSON files a row index (row count plus the byte offset of every
+DATA_INDEX_STRIDE-th row) is built once per file version and cached by mtime,
+so pages deep into a file seek straight to the nearest checkpoint.
+"""
+import os
+import csv
+import json
+import threading
+from collections import OrderedDict
+
+from scraper.config import DATA_INDEX_CACHE_SIZE, DATA_INDEX_STRIDE
+from scraper.writers import NUMERIC_COLUMNS
+
+# Filters accepted by iter_rows: exact (case-insensitive) or substring matches
+EXACT_FILTERS = ("book", "league", "statistic")
+SUBSTRING_FILTERS = ("team", "player")
+FILTERS = EXACT_FILTERS + SUBSTRING_FILTERS
+
+
+class FileIndex:
+    """Header, row count and row checkpoints for one version of a file"""
+
+    def __init__(self, columns, row_count, checkpoints):
+        self.columns = columns
+        self.row_count = row_count
+        self.checkpoints = checkpoints  # checkpoints[i] = byte offset of row i * DATA_INDEX_STRIDE
+
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+
+def _typed(column, value):
+    """Convert CSV strings in numeric columns back to numbers"""
+    if column in NUMERIC_COLUMNS and isinstance(value, str):
+        if value == "":
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _csv_records(f):
+    """
+    Yield (byte offset, record) for each CSV record after the header
+
+    Lines are fed to csv.reader one at a time so offsets stay exact even for
+    quoted fields that span lines.
+    """
+    position = [f.tell()]
+
+    def lines():
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            position[0] += len(line)
+            yield line.decode("utf-8")
+
+    start = position[0]
+    for record in csv.reader(lines()):
+        yield start, record
+        start = position[0]
+
+
+def _ndjson_records(f):
+    """Yield (byte offset, record) for each NDJSON line"""
+    offset = f.tell()
+    for line in iter(f.readline, b""):
+        if line.strip():
+            yield offset, json.loads(line)
+        offset += len(line)
+
+
+def _read_header(path):
+    """Return the column names of a CSV or NDJSON file"""
+    with open(path, "rb") as f:
+        if path.endswith(".ndjson"):
+            first = f.readline()
+            return list(json.loads(first).keys()) if first.strip() else []
+        header = f.readline().decode("utf-8")
+        return next(csv.reader([header]), [])
+
+
+def _build_index(path):
+    columns = _read_header(path)
+    checkpoints = []
+    row_count = 0
+    with open(path, "rb") as f:
+        if path.endswith(".ndjson"):
+            records = _ndjson_records(f)
+        else:
+            f.readline()
+            records = _csv_records(f)
+        for offset, _ in records:
+            if row_count % DATA_INDEX_STRIDE == 0:
+                checkpoints.append(offset)
+            row_count += 1
+    return FileIndex(columns, row_count, checkpoints)
+
+
+def get_index(path):
+    """Return the cached FileIndex for a CSV/NDJSON file, rebuilding it if the file changed"""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _index_lock:
+        if key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+
+    index = _build_index(path)
+
+    with _index_lock:
+        _index_cache[key] = index
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > DATA_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def get_columns(path):
+    """Return the column names of an output file"""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+    return get_index(path).columns
+
+
+def get_row_count(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    return get_index(path).row_count
+
+
+def _iter_all(path, start_row=0):
+    """Yield every row dict from start_row, seeking to the nearest checkpoint when possible"""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        row = 0
+        for batch in pq.ParquetFile(path).iter_batches():
+            if row + batch.num_rows <= start_row:
+                row += batch.num_rows
+                continue
+            for record in batch.to_pylist()[max(0, start_row - row):]:
+                yield record
+            row += batch.num_rows
+        return
+
+    index = get_index(path)
+    if start_row >= index.row_count:
+        return
+    checkpoint = start_row // DATA_INDEX_STRIDE
+    skip = start_row - checkpoint * DATA_INDEX_STRIDE
+
+    with open(path, "rb") as f:
+        f.seek(index.checkpoints[checkpoint])
+        if path.endswith(".ndjson"):
+            records = (record for _, record in _ndjson_records(f))
+        else:
+            records = (
+                {column: _typed(column, value) for column, value in zip(index.columns, record)}
+                for _, record in _csv_records(f)
+            )
+        for record in records:
+            if skip:
+                skip -= 1
+                continue
+            yield record
+
+
+def _matches(row, filters):
+    for name, wanted in filters.items():
+        value = str(row.get(name) or "").lower()
+        if name in EXACT_FILTERS and value != wanted:
+            return False
+        if name in SUBSTRING_FILTERS and wanted not in value:
+            return False
+    return True
+
+
+def iter_rows(path, offset=0, limit=None, columns=None, filters=None):
+    """
+    Lazily yield rows of an output file
+
+    Args:
+        path (str): CSV, NDJSON or Parquet file
+        offset (int): Number of matching rows to skip
+        limit (int): Maximum rows to yield, all remaining rows if None
+        columns (list): Columns to include, all if None
+        filters (dict): Filter name (see FILTERS) to wanted value
+
+    Yields:
+        dict: One row with typed values
+    """
+    filters = {name: str(value).lower() for name, value in (filters or {}).items() if value}
+    # Without filters the offset can be resolved with the row index
+    rows = _iter_all(path, 0 if filters else offset)
+    skip = offset if filters else 0
+
+    yielded = 0
+    for row in rows:
+        if filters and not _matches(row, filters):
+            continue
+        if skip:
+            skip -= 1
+            continue
+        if limit is not None and yielded >= limit:
+            return
+        yield {column: row.get(column) for column in columns} if columns else row
+        yielded += 1
@@ -0,0 +1,268 @@
+"""
+Durable SQLite-backed job queue shared by the Flask app and worker processes
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from scraper.config import DEFAULT_MAX_WORKERS, DEFAULT_SPORTSBOOK, JOB_EVENT_RETENTION
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    leagues TEXT NOT NULL,
+    statistics TEXT NOT NULL,
+    books TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    browsers INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    output_file TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority DESC, id);
+CREATE TABLE IF NOT EXISTS job_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    pid INTEGER,
+    stats TEXT,
+    updated_at REAL
+);
+"""
+
+# Statuses a job can no longer leave
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class JobQueue:
+    def __init__(self, path):
+        """
+        Open (and create if needed) the queue database
+
+        Args:
+            path (str): SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Queues created before jobs had sportsbooks
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "books" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN books TEXT")
+
+    def _connection(self):
+        """Return this thread's connection (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(row)
+        job["leagues"] = json.loads(job["leagues"])
+        job["statistics"] = json.loads(job["statistics"])
+        job["books"] = json.loads(job["books"]) if job["books"] else [DEFAULT_SPORTSBOOK]
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def submit(self, leagues, statistics, priority=0, browsers=None, books=None):
+        """
+        Queue a job
+
+        Args:
+            leagues (list): Leagues to scrape
+            statistics (list): Statistics to scrape
+            priority (int): Higher priorities are claimed first
+            browsers (int): Concurrent browsers the job uses, defaults to
+                min(DEFAULT_MAX_WORKERS, number of book/league pairs)
+            books (list): Sportsbooks to scrape, defaults to DEFAULT_SPORTSBOOK
+
+        Returns:
+            int: The job ID
+        """
+        books = books or [DEFAULT_SPORTSBOOK]
+        browsers = browsers or min(DEFAULT_MAX_WORKERS, len(leagues) * len(books))
+        self.prune_events()
+        cursor = self._connection().execute(
+            "INSERT INTO jobs (leagues, statistics, books, priority, browsers, status, created_at) "
+            "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+            (json.dumps(leagues), json.dumps(statistics), json.dumps(books), priority, browsers, time.time()))
+        self._status_event(cursor.lastrowid)
+        return cursor.lastrowid
+
+    def claim(self, worker, browser_budget):
+        """
+        Atomically claim the highest-priority queued job if it fits in the
+        browsers left in the global budget
+
+        Jobs are claimed strictly in priority order, so a large job at the
+        head of the queue is never starved by smaller ones behind it.
+
+        Returns:
+            dict: The claimed job, or None
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            in_use = conn.execute(
+                "SELECT COALESCE(SUM(browsers), 0) FROM jobs WHERE status = 'running'").fetchone()[0]
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1").fetchone()
+            if row is None or in_use + min(row["browsers"], browser_budget) > browser_budget:
+                conn.execute("COMMIT")
+                return None
+
+            browsers = min(row["browsers"], browser_budget)
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, browsers = ?, started_at = ? WHERE id = ?",
+                (worker, browsers, time.time(), row["id"]))
+            self._status_event(row["id"])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"])
+
+    def complete(self, job_id, output_file):
+        self._finish(job_id, "completed", output_file=output_file)
+
+    def fail(self, job_id, error):
+        self._finish(job_id, "failed", error=error)
+
+    def mark_cancelled(self, job_id, output_file=None):
+        self._finish(job_id, "cancelled", output_file=output_file)
+
+    def _finish(self, job_id, status, output_file=None, error=None):
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, output_file = ?, error = ?, finished_at = ? WHERE id = ?",
+            (status, output_file, error, time.time(), job_id))
+        self._status_event(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: queued jobs are cancelled immediately, running jobs are
+        flagged and stopped by their worker
+
+        Returns:
+            str: The job's status after the request, or None if it doesn't exist
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            status = row["status"]
+            if status == "queued":
+                status = "cancelled"
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ?",
+                    (time.time(), job_id))
+            elif status == "running":
+                conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            if status in ("cancelled", "running"):
+                self._status_event(job_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return status
+
+    def is_cancel_requested(self, job_id):
+        row = self._connection().execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def requeue(self, job_id):
+        """Put a claimed job back in the queue"""
+        self._connection().execute(
+            "UPDATE jobs SET status = 'queued', worker = NULL, started_at = NULL WHERE id = ?",
+            (job_id,))
+        self._status_event(job_id)
+
+    def requeue_running(self):
+        """Return jobs left running by workers that no longer exist to the queue"""
+        rows = self._connection().execute("SELECT id FROM jobs WHERE status = 'running'").fetchall()
+        for row in rows:
+            self.requeue(row["id"])
+        return len(rows)
+
+    def get(self, job_id):
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(self, limit=100):
+        """Return the most recent jobs keyed by ID"""
+        rows = self._connection().execute(
+            "SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return {row["id"]: self._to_dict(row) for row in reversed(rows)}
+
+    def status_counts(self):
+        """Return the number of jobs in each status"""
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def add_event(self, job_id, event_type, data):
+        """Append an event to a job's stream"""
+        self._connection().execute(
+            "INSERT INTO job_events (job_id, type, data, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, event_type, json.dumps(data), time.time()))
+
+    def _status_event(self, job_id):
+        job = self.get(job_id)
+        if job:
+            self.add_event(job_id, "status", job)
+
+    def events(self, job_id, after_id=0, limit=500):
+        """
+        Return a job's events newer than after_id
+
+        Returns:
+            list: (event ID, type, data JSON string) tuples in order
+        """
+        rows = self._connection().execute(
+            "SELECT id, type, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (job_id, after_id, limit)).fetchall()
+        return [(row["id"], row["type"], row["data"]) for row in rows]
+
+    def prune_events(self, retention=JOB_EVENT_RETENTION):
+        """Drop the events of jobs that finished more than retention seconds ago"""
+        self._connection().execute(
+            "DELETE FROM job_events WHERE job_id IN "
+            "(SELECT id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?)",
+            (time.time() - retention,))
+
+    def report_worker(self, worker, stats):
+        """Store a worker's latest scraper statistics"""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO workers (worker, pid, stats, updated_at) VALUES (?, ?, ?, ?)",
+            (worker, os.getpid(), json.dumps(stats), time.time()))
+
+    def worker_stats(self):
+        rows = self._connection().execute("SELECT * FROM workers ORDER BY worker").fetchall()
+        return {
+            row["worker"]: dict(json.loads(row["stats"] or "{}"), pid=row["pid"], updated_at=row["updated_at"])
+            for row in rows
+        }
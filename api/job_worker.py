@@ -0,0 +1,181 @@
+"""
+Worker processes that claim jobs from the JobQueue and run the scraper
+"""
+import os
+import time
+import signal
+import threading
+import multiprocessing
+
+from scraper.config import (
+    BROWSER_BUDGET,
+    CANCEL_CHECK_INTERVAL,
+    DEFAULT_ENGINE,
+    JOB_POLL_INTERVAL,
+    JOB_WORKERS,
+    METRICS_REPORT_INTERVAL,
+    RESULT_CACHE_FILENAME,
+    RESULT_CACHE_TTL,
+)
+from scraper.cache import ResultCache
+from scraper.odds_store import open_odds_store
+from scraper.scraper import ScrapeCancelled, create_scraper
+from scraper.writers import typed_row
+from api.job_queue import JobQueue
+
+
+class CancelCheck:
+    """
+    Callable polled by the scraper; reads the job's cancel flag at most once
+    per interval and also stops the job when the worker is shutting down
+    """
+
+    def __init__(self, job_queue, job_id, stopping, interval=CANCEL_CHECK_INTERVAL):
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self.stopping = stopping
+        self.interval = interval
+        self._checked_at = 0.0
+        self._cancelled = False
+
+    def __call__(self):
+        if self.stopping:
+            return True
+        now = time.monotonic()
+        if not self._cancelled and now - self._checked_at >= self.interval:
+            self._checked_at = now
+            self._cancelled = self.job_queue.is_cancel_requested(self.job_id)
+        return self._cancelled
+
+
+class WorkerReport:
+    """Stores a worker's scraper statistics in the job queue, at most once per interval unless forced"""
+
+    def __init__(self, job_queue, worker_name, scraper, interval=METRICS_REPORT_INTERVAL):
+        self.job_queue = job_queue
+        self.worker_name = worker_name
+        self.scraper = scraper
+        self.interval = interval
+        self._reported_at = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._reported_at < self.interval:
+                return
+            self._reported_at = now
+        try:
+            self.job_queue.report_worker(self.worker_name, {
+                "pool": self.scraper.pool_stats(),
+                "readiness": self.scraper.readiness_stats(),
+                "cache": self.scraper.cache_stats(),
+                "metrics": self.scraper.metrics_snapshot(),
+            })
+        except Exception as e:
+            print(f"Could not report stats for {self.worker_name}: {e}")
+
+
+class GameEvents:
+    """on_game callback that publishes each scraped game's rows to the job's event stream"""
+
+    def __init__(self, job_queue, job_id, report=None):
+        self.job_queue = job_queue
+        self.job_id = job_id
+        self.report = report
+
+    def __call__(self, league, game_title, rows):
+        try:
+            self.job_queue.add_event(self.job_id, "rows", {
+                "book": rows[0].get("book") if rows else None,
+                "league": league,
+                "game": game_title,
+                "rows": [typed_row(row) for row in rows],
+            })
+        except Exception as e:
+            # Rows are already in the output file; a missed event only delays the UI
+            print(f"Could not publish rows for job {self.job_id}: {e}")
+        # Keeps /metrics current while a long job runs
+        if self.report:
+            self.report()
+
+
+def run_job(scraper, job_queue, job, stopping, report=None):
+    """Run one claimed job and record its outcome"""
+    job_id = job["id"]
+    print(f"Worker {os.getpid()} running job {job_id}: {job['statistics']} for {job['leagues']} on {job['books']}")
+    try:
+        output_file = scraper.scrape_data(
+            job["leagues"], job["statistics"], max_workers=job["browsers"],
+            should_cancel=CancelCheck(job_queue, job_id, stopping),
+            on_game=GameEvents(job_queue, job_id, report), books=job["books"])
+        job_queue.complete(job_id, os.path.basename(output_file))
+    except ScrapeCancelled as e:
+        if stopping:
+            # Interrupted by shutdown rather than by the user: run it again later
+            job_queue.requeue(job_id)
+            return
+        job_queue.mark_cancelled(job_id, os.path.basename(e.output_file) if e.output_file else None)
+    except Exception as e:
+        job_queue.fail(job_id, str(e))
+
+
+def run_worker(db_path, output_dir, worker_name, browser_budget=BROWSER_BUDGET):
+    """Claim and run jobs until terminated"""
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+
+    job_queue = JobQueue(db_path)
+    # Workers share one cache so concurrent jobs for the same leagues scrape each page once
+    cache = ResultCache(os.path.join(output_dir, RESULT_CACHE_FILENAME)) if RESULT_CACHE_TTL > 0 else None
+    scraper = create_scraper(DEFAULT_ENGINE, output_dir=output_dir, cache=cache,
+                             odds_store=open_odds_store(output_dir))
+    report = WorkerReport(job_queue, worker_name, scraper)
+    report(force=True)
+    try:
+        while not stopping:
+            job = job_queue.claim(worker_name, browser_budget)
+            if job is None:
+                time.sleep(JOB_POLL_INTERVAL)
+                continue
+            run_job(scraper, job_queue, job, stopping, report)
+            report(force=True)
+    finally:
+        scraper.close()
+
+
+class JobWorkerPool:
+    """Starts and stops the worker processes for the web app"""
+
+    def __init__(self, db_path, output_dir, size=JOB_WORKERS, browser_budget=BROWSER_BUDGET):
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.size = size
+        self.browser_budget = browser_budget
+        self.processes = []
+
+    def start(self):
+        # Jobs still marked running belonged to workers of a previous app run
+        requeued = JobQueue(self.db_path).requeue_running()
+        if requeued:
+            print(f"Requeued {requeued} interrupted jobs")
+
+        # Spawn rather than fork so workers don't inherit the web server's threads
+        context = multiprocessing.get_context("spawn")
+        for i in range(self.size):
+            process = context.Process(
+                target=run_worker,
+                args=(self.db_path, self.output_dir, f"worker-{i}", self.browser_budget),
+                name=f"scrape-worker-{i}",
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        print(f"Started {self.size} job workers with a budget of {self.browser_budget} browsers")
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(timeout=30)
+        self.processes = []
@@ -0,0 +1,294 @@
+"""
+Local stand-in for the betbuilder site, for benchmarks and offline testing
+
+Serves a page with the same markup the scraper's selectors expect and the
+JSON API behind it. Odds come from saved fixtures when present
+(<fixtures>/<league>/<statistic>.json, in the payload layout returned by
+/api/odds) and are generated deterministically otherwise, differently for each
+sportsbook (the page's sb= parameter). A saved page can
+replace the built-in one as <fixtures>/page.html. Like the real page, the
+built-in one also loads banner images, team logos and a web font, which the
+"lean" browser profile skips. Every API and asset response can be delayed to
+mimic the real site's latency.
+
+Usage:
+    python -m benchmarks.fixture_server --port 8765 --latency 0.2
+    python run.py scrape --leagues EPL --statistics Passes --base-url "http://127.0.0.1:8765/betbuilder?sb=betus"
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper.config import AVAILABLE_LEAGUES, AVAILABLE_STATISTICS
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8"><title>Betbuilder fixture</title>
+<style>
+@font-face { font-family: Fixture; src: url('/assets/fixture.woff2'); }
+body { font-family: Fixture, sans-serif; }
+</style>
+</head>
+<body>
+<div class="banners">%(banners)s</div>
+<div class="ligues-slider">%(leagues)s</div>
+<div class="main-markets" id="markets"></div>
+<div class="tiered-block" id="games"></div>
+<script>
+const esc = s => String(s).replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c]));
+const sb = new URLSearchParams(location.search).get('sb') || '';
+const api = (path, params) => fetch(path + '?' + new URLSearchParams({...params, sb})).then(r => r.json());
+
+document.querySelectorAll('.ligues-slider__item').forEach(item => {
+    item.addEventListener('click', () => selectLeague(item.dataset.league));
+});
+
+async function selectLeague(league) {
+    const data = await api('/api/markets', {league});
+    const markets = document.getElementById('markets');
+    markets.innerHTML = data.statistics.map(s =>
+        `<div class="main-markets__item" data-statistic="${esc(s)}"><p>${esc(s)}</p></div>`).join('');
+    markets.querySelectorAll('.main-markets__item').forEach(item => {
+        item.addEventListener('click', () => selectStatistic(league, item.dataset.statistic));
+    });
+}
+
+async function selectStatistic(league, statistic) {
+    const games = document.getElementById('games');
+    games.innerHTML = '';
+    const data = await api('/api/odds', {league, statistic});
+    games.innerHTML = data.events.map((event, index) => `
+        <div class="tiered-block__item" data-index="${index}">
+            <div class="tiered-block__item__top">
+                <img class="team-logo" src="/assets/logo-${encodeURIComponent(event.homeTeam)}.png">
+                <p class="tiered-block__player-team"><span>${esc(event.homeTeam)}</span> - <span>${esc(event.awayTeam)}</span></p>
+                <img class="team-logo" src="/assets/logo-${encodeURIComponent(event.awayTeam)}.png">
+            </div>
+        </div>`).join('');
+    games.querySelectorAll('.tiered-block__item__top').forEach(header => {
+        header.addEventListener('click', () => expandGame(league, statistic, header.parentElement));
+    });
+}
+
+async function expandGame(league, statistic, container) {
+    if (container.dataset.loading) {
+        return;
+    }
+    container.dataset.loading = '1';
+    const event = await api('/api/game', {league, statistic, index: container.dataset.index});
+    const players = event.markets.flatMap(market => market.players);
+    container.insertAdjacentHTML('beforeend', players.map(player => `
+        <div class="shots-block__player">
+            <p class="shots-block__player-name">${esc(player.playerName)}</p>
+            <p class="shots-block__player-team">${esc(player.teamName)}</p>
+            <div class="markets-slider">${player.lines.map(line => `
+                <div class="markets-slider__item">
+                    <p class="markets-slider__amount">${esc(line.line)}</p>
+                    <p class="markets-slider__stat">${esc(line.odds)}</p>
+                </div>`).join('')}
+            </div>
+        </div>`).join(''));
+}
+</script>
+</body>
+</html>
+"""
+
+BANNERS = 6
+ASSET_BYTES = 64 * 1024  # Size of every image and font response
+ASSET_TYPES = {".png": "image/png", ".jpg": "image/jpeg", ".woff2": "font/woff2"}
+
+TEAMS = ["Arsenal", "Chelsea", "Liverpool", "Everton", "Leeds", "Fulham", "Brighton", "Burnley",
+         "Wolves", "Spurs", "Villa", "Forest", "Bournemouth", "Brentford", "Palace", "Newcastle"]
+
+
+class FixtureSet:
+    def __init__(self, directory=None, leagues=None, statistics=None, games=12, players=8, lines=4):
+        """
+        Args:
+            directory (str): Saved fixtures; generated data is used for anything missing
+            leagues, statistics (list): Shown on the page, default to the scraper's config
+            games, players, lines (int): Size of generated fixtures (games per
+                league, players per game, lines per player)
+        """
+        self.directory = directory
+        self.leagues = leagues or AVAILABLE_LEAGUES
+        self.statistics = statistics or AVAILABLE_STATISTICS
+        self.games = games
+        self.players = players
+        self.lines = lines
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def page(self):
+        path = os.path.join(self.directory, "page.html") if self.directory else None
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        leagues = "".join(
+            f'<div class="ligues-slider__item" data-league="{league}">'
+            f'<div class="ligues-slider__ligue-name">{league}</div></div>'
+            for league in self.leagues
+        )
+        banners = "".join(f'<img class="banner" src="/assets/banner-{i}.jpg">' for i in range(BANNERS))
+        return PAGE % {"leagues": leagues, "banners": banners}
+
+    def odds(self, league, statistic, book=None):
+        """Return the /api/odds payload for a league and statistic, as shown by a sportsbook"""
+        key = (league, statistic, book)
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = self._load(league, statistic) or self._generate(league, statistic, book)
+            return self._cache[key]
+
+    def _load(self, league, statistic):
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, league, f"{statistic}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _generate(self, league, statistic, book=None):
+        # Books share games and players but price them differently
+        seed = int(hashlib.md5(f"{league}/{statistic}".encode()).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+        prices = random.Random(f"{seed}/{book}") if book else rng
+        events = []
+        for game in range(self.games):
+            home, away = rng.sample(TEAMS, 2)
+            players = []
+            for player in range(self.players):
+                team = home if player % 2 == 0 else away
+                lines = [
+                    {"line": f"{(line + 1) * 10}+", "odds": f"{prices.choice('+-')}{prices.randint(100, 400)}"}
+                    for line in range(self.lines)
+                ]
+                players.append({"playerName": f"{team} Player {player + 1}", "teamName": team, "lines": lines})
+            events.append({
+                "eventName": f"{home} vs {away}",
+                "homeTeam": home,
+                "awayTeam": away,
+                "markets": [{"marketName": statistic, "players": players}],
+            })
+        return {"league": league, "statistic": statistic, "events": events}
+
+    def save(self, directory):
+        """Write the page and every fixture to directory, e.g. as a starting point for edits"""
+        for league in self.leagues:
+            os.makedirs(os.path.join(directory, league), exist_ok=True)
+            for statistic in self.statistics:
+                with open(os.path.join(directory, league, f"{statistic}.json"), "w", encoding="utf-8") as f:
+                    json.dump(self.odds(league, statistic), f, indent=2)
+        with open(os.path.join(directory, "page.html"), "w", encoding="utf-8") as f:
+            f.write(self.page())
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    fixtures = None
+    latency = 0.0
+    jitter = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, content_type, body):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self):
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path in ("/", "/betbuilder"):
+            self._send(200, "text/html; charset=utf-8", self.fixtures.page())
+            return
+
+        self._delay()
+        if url.path.startswith("/assets/"):
+            content_type = ASSET_TYPES.get(os.path.splitext(url.path)[1], "application/octet-stream")
+            self._send(200, content_type, b"\0" * ASSET_BYTES)
+        elif url.path == "/api/markets":
+            self._send(200, "application/json", json.dumps({"statistics": self.fixtures.statistics}))
+        elif url.path == "/api/odds":
+            payload = self.fixtures.odds(params.get("league"), params.get("statistic"), params.get("sb"))
+            self._send(200, "application/json", json.dumps(payload))
+        elif url.path == "/api/game":
+            events = self.fixtures.odds(params.get("league"), params.get("statistic"), params.get("sb"))["events"]
+            try:
+                self._send(200, "application/json", json.dumps(events[int(params.get("index", -1))]))
+            except (ValueError, IndexError):
+                self._send(404, "application/json", json.dumps({"error": "Game not found"}))
+        else:
+            self._send(404, "application/json", json.dumps({"error": "Not found"}))
+
+
+def start_fixture_server(fixtures=None, host="127.0.0.1", port=0, latency=0.0, jitter=0.0):
+    """
+    Serve fixtures in a background thread
+
+    Returns:
+        tuple: (server, base URL of the betbuilder page); call server.shutdown() to stop
+    """
+    handler = type("Handler", (FixtureHandler,), {
+        "fixtures": fixtures or FixtureSet(),
+        "latency": latency,
+        "jitter": jitter,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/betbuilder?sb=betus"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve betbuilder fixtures locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="Directory of saved fixtures")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every API response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay of up to this many seconds")
+    parser.add_argument("--games", type=int, default=12, help="Games per league in generated fixtures")
+    parser.add_argument("--players", type=int, default=8, help="Players per game in generated fixtures")
+    parser.add_argument("--lines", type=int, default=4, help="Lines per player in generated fixtures")
+    parser.add_argument("--save", metavar="DIR", help="Write generated fixtures to DIR and exit")
+    args = parser.parse_args()
+
+    fixtures = FixtureSet(args.fixtures, games=args.games, players=args.players, lines=args.lines)
+    if args.save:
+        fixtures.save(args.save)
+        print(f"Saved fixtures to {args.save}")
+        return
+
+    server, url = start_fixture_server(fixtures, args.host, args.port, args.latency, args.jitter)
+    print(f"Serving fixtures at {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
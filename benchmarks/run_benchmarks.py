@@ -0,0 +1,287 @@
+"""
+Throughput benchmarks against the local fixture server
+
+Runs the scraper for every engine, extraction mode, browser profile and
+concurrency level against benchmarks/fixture_server.py and reports rows/sec,
+per-step latency (page load, league click, statistic click, per-game
+extraction, output write), peak memory per browser and how many browsers
+would fit in this machine's memory. Each configuration runs in its own
+process so peak memory and the driver pool start from scratch. Results are
+written as JSON so runs can be compared over time.
+
+Usage:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --modes xpath js --workers 1 3 --latency 0.2
+    python -m benchmarks.run_benchmarks --engines selenium --modes js_league --profiles full lean
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESULT_MARKER = "BENCHMARK_RESULT "
+
+# Steps reported from the scraper's readiness recorder
+STEPS = ["page_load", "league_click", "stat_click", "game_expand", "extract_game"]
+
+# The async engine reads the DOM with one script per tab whatever the mode,
+# so only the DOM/network distinction is worth measuring there
+ASYNC_MODES = ["js_league", "network"]
+
+
+def peak_rss_mb(who):
+    """Peak resident memory of this process or its finished children, in MB"""
+    import resource
+
+    rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _proc_rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _proc_children(pid):
+    """Direct children of pid, from /proc/<pid>/task/*/children"""
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def total_memory_mb():
+    """Physical memory of this machine in MB, or None when unknown"""
+    try:
+        return round(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1024 * 1024), 1)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class BrowserMemorySampler:
+    """
+    Tracks the peak combined RSS of every process started by this one
+    (chromedriver, Chrome and its renderers), where /proc is available
+
+    RSS counts pages shared between Chrome processes more than once, so this
+    overestimates slightly, equally for every profile.
+    """
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak_kb = 0
+        self.available = os.path.isdir(f"/proc/{os.getpid()}/task")
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def start(self):
+        if self.available:
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def sample(self):
+        total = 0
+        pending = _proc_children(os.getpid())
+        while pending:
+            pid = pending.pop()
+            try:
+                total += _proc_rss_kb(pid)
+                pending.extend(_proc_children(pid))
+            except OSError:
+                continue  # Exited while being walked
+        self.peak_kb = max(self.peak_kb, total)
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.sample()
+            except OSError:
+                pass
+
+    def peak_mb(self):
+        return round(self.peak_kb / 1024, 1) if self.available else None
+
+
+def run_one(config, base_url, leagues, statistics):
+    """Run one configuration in this process and return its measurements"""
+    import resource
+    from scraper.scraper import create_scraper
+
+    output_dir = tempfile.mkdtemp(prefix="scraper-bench-")
+    scraper = create_scraper(config["engine"], output_dir=output_dir, extraction_mode=config["mode"],
+                             output_format=config["format"], base_url=base_url,
+                             browser_profile=config["profile"])
+    sampler = BrowserMemorySampler().start()
+    start = time.monotonic()
+    try:
+        scraper.scrape_data(leagues, statistics, max_workers=config["workers"])
+        elapsed = time.monotonic() - start
+        pool = scraper.pool_stats() if config["engine"] == "selenium" else None
+    finally:
+        sampler.stop()
+        # Quitting the browsers lets their memory show up in RUSAGE_CHILDREN
+        scraper.close()
+
+    # The selenium engine runs one browser per worker, the async engine one
+    # browser whatever the number of tabs
+    browsers = min(config["workers"], len(leagues)) if config["engine"] == "selenium" else 1
+    browsers_mb = sampler.peak_mb()
+    per_browser_mb = round(browsers_mb / browsers, 1) if browsers_mb else None
+    memory_mb = total_memory_mb()
+
+    output = scraper.output_stats()
+    readiness = scraper.readiness_stats()
+    steps = {step: readiness[step] for step in STEPS if step in readiness}
+    steps["write"] = {
+        "count": output["rows"],
+        "total_seconds": output["write_seconds"],
+        "avg_seconds": round(output["write_seconds"] / output["rows"], 6) if output["rows"] else 0.0,
+    }
+    return dict(config, **{
+        "rows": output["rows"],
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(output["rows"] / elapsed, 1) if elapsed else None,
+        "steps": steps,
+        "timeouts": sum(step.get("timeouts", 0) for step in readiness.values()),
+        "pool": pool,
+        "peak_rss_mb": {
+            "scraper": peak_rss_mb(resource.RUSAGE_SELF),
+            # Largest single child process, when the process tree can't be sampled
+            "largest_child": peak_rss_mb(resource.RUSAGE_CHILDREN),
+            "browsers": browsers_mb,
+            "per_browser": per_browser_mb,
+        },
+        "browsers_per_machine": int(memory_mb // per_browser_mb) if memory_mb and per_browser_mb else None,
+    })
+
+
+def run_isolated(config, base_url, leagues, statistics):
+    """Run one configuration in a fresh Python process"""
+    command = [sys.executable, "-m", "benchmarks.run_benchmarks", "--run-one", json.dumps(config),
+               "--base-url", base_url, "--leagues", *leagues, "--statistics", *statistics]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run(command, cwd=root, capture_output=True, text=True)
+    for line in reversed(process.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    return dict(config, error=(process.stderr or process.stdout).strip().splitlines()[-1:])
+
+
+def build_configs(engines, modes, profiles, workers, output_format):
+    configs = []
+    for engine in engines:
+        for mode in modes if engine == "selenium" else [m for m in modes if m in ASYNC_MODES] or ASYNC_MODES:
+            for profile in profiles:
+                for count in workers:
+                    configs.append({"engine": engine, "mode": mode, "profile": profile, "workers": count,
+                                    "format": output_format})
+    return configs
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_table(results):
+    print(f"\n{'engine':<9}{'mode':<10}{'profile':<8}{'workers':>8}{'rows':>7}{'rows/s':>9}"
+          f"{'load':>8}{'stat':>8}{'game':>8}{'MB/browser':>11}{'fit':>6}")
+    for result in results:
+        label = f"{result['engine']:<9}{result['mode']:<10}{result['profile']:<8}{result['workers']:>8}"
+        if "error" in result:
+            print(f"{label}  failed: {result['error']}")
+            continue
+        steps = result["steps"]
+        avg = lambda step: steps.get(step, {}).get("avg_seconds", 0.0)
+        per_browser = result["peak_rss_mb"]["per_browser"]
+        print(f"{label}{result['rows']:>7}{result['rows_per_sec'] or 0:>9.1f}{avg('page_load'):>8.3f}"
+              f"{avg('stat_click'):>8.3f}{avg('extract_game'):>8.3f}"
+              f"{per_browser if per_browser is not None else '-':>11}{result['browsers_per_machine'] or '-':>6}")
+
+
+def main():
+    from scraper.config import AVAILABLE_LEAGUES, AVAILABLE_STATISTICS, BROWSER_PROFILES
+    from scraper.extractors import EXTRACTORS
+    from benchmarks.fixture_server import FixtureSet, start_fixture_server
+
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against local fixtures")
+    parser.add_argument("--engines", nargs="+", default=["selenium", "async"], choices=["selenium", "async"])
+    parser.add_argument("--modes", nargs="+", default=sorted(EXTRACTORS), choices=sorted(EXTRACTORS))
+    parser.add_argument("--profiles", nargs="+", default=sorted(BROWSER_PROFILES), choices=sorted(BROWSER_PROFILES),
+                        help="Browser profiles to compare")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 3], help="Concurrency levels to run")
+    parser.add_argument("--leagues", nargs="+", default=AVAILABLE_LEAGUES[:3])
+    parser.add_argument("--statistics", nargs="+", default=AVAILABLE_STATISTICS[:2])
+    parser.add_argument("--format", default="csv", help="Output format written during the run")
+    parser.add_argument("--fixtures", help="Directory of saved fixtures (see fixture_server.py)")
+    parser.add_argument("--games", type=int, default=12)
+    parser.add_argument("--players", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every fixture API response")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        result = run_one(json.loads(args.run_one), args.base_url, args.leagues, args.statistics)
+        print(RESULT_MARKER + json.dumps(result))
+        return
+
+    fixtures = FixtureSet(args.fixtures, games=args.games, players=args.players, lines=args.lines)
+    server, base_url = start_fixture_server(fixtures, latency=args.latency)
+    print(f"Fixture server at {base_url}")
+
+    results = []
+    try:
+        for config in build_configs(args.engines, args.modes, args.profiles, args.workers, args.format):
+            print(f"Running {config}...")
+            results.append(run_isolated(config, base_url, args.leagues, args.statistics))
+    finally:
+        server.shutdown()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "memory_mb": total_memory_mb(),
+        "leagues": args.leagues,
+        "statistics": args.statistics,
+        "fixtures": {"directory": args.fixtures, "games": args.games, "players": args.players,
+                     "lines": args.lines, "latency": args.latency},
+        "results": results,
+    }
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         time.strftime("%Y%m%d_%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print_table(results)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
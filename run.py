@@ -16,13 +16,18 @@ def setup_environment():
 
 def run_api():
     """Run the Flask API server"""
-    from api.app import app
+    from api.app import app, start_workers
+    # With debug on, the reloader re-runs this in a child process that serves
+    # requests; start the job workers only there so they aren't started twice
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_workers()
     app.run(debug=True, host='0.0.0.0', port=5000)
 
-def run_scraper(leagues, statistic):
+def run_scraper(leagues, statistics, extraction_mode, engine, output_format, base_url, browser_profile, books):
     """Run the scraper directly without the API"""
-    from scraper.scraper import SportsScraper
-    from scraper.config import AVAILABLE_LEAGUES, AVAILABLE_STATISTICS
+    from scraper.scraper import create_scraper
+    from scraper.odds_store import open_odds_store
+    from scraper.config import AVAILABLE_LEAGUES, AVAILABLE_STATISTICS, SPORTSBOOKS
     
     # Validate inputs
     invalid_leagues = [league for league in leagues if league not in AVAILABLE_LEAGUES]
@@ -31,19 +36,128 @@ def run_scraper(leagues, statistic):
         print(f"Available leagues: {', '.join(AVAILABLE_LEAGUES)}")
         return
     
-    if statistic not in AVAILABLE_STATISTICS:
-        print(f"Error: Invalid statistic: {statistic}")
+    invalid_statistics = [statistic for statistic in statistics if statistic not in AVAILABLE_STATISTICS]
+    if invalid_statistics:
+        print(f"Error: Invalid statistics: {', '.join(invalid_statistics)}")
         print(f"Available statistics: {', '.join(AVAILABLE_STATISTICS)}")
         return
     
+    invalid_books = [book for book in books if book not in SPORTSBOOKS]
+    if invalid_books:
+        print(f"Error: Invalid sportsbooks: {', '.join(invalid_books)}")
+        print(f"Available sportsbooks: {', '.join(SPORTSBOOKS)}")
+        return
+    
     # Create and run the scraper
-    scraper = SportsScraper(output_dir='data')
-    output_file = scraper.scrape_data(leagues, statistic)
+    scraper = create_scraper(engine, output_dir='data', extraction_mode=extraction_mode,
+                             output_format=output_format, base_url=base_url, browser_profile=browser_profile,
+                             odds_store=open_odds_store('data'))
+    try:
+        output_file = scraper.scrape_data(leagues, statistics, books=books)
+    finally:
+        print(f"Driver pool stats: {scraper.pool_stats()}")
+        scraper.close()
     
     print(f"Scraping completed. Output file: {output_file}")
 
+def run_watch(leagues, statistics, extraction_mode, output_format, max_browsers, browser_profile):
+    """Keep browsers warm and re-scrape each league/statistic on an adaptive schedule"""
+    import signal
+    from scraper.scraper import SportsScraper
+    from scraper.scheduler import WatchScheduler
+    from scraper.odds_store import open_odds_store
+    from scraper.config import AVAILABLE_LEAGUES, AVAILABLE_STATISTICS
+    
+    leagues = leagues or AVAILABLE_LEAGUES
+    invalid = [league for league in leagues if league not in AVAILABLE_LEAGUES]
+    invalid += [statistic for statistic in statistics if statistic not in AVAILABLE_STATISTICS]
+    if invalid:
+        print(f"Error: Invalid leagues or statistics: {', '.join(invalid)}")
+        return
+    
+    # The pool matches the concurrency budget so every scrape gets a warm browser
+    scraper = SportsScraper(output_dir='data', pool_size=max_browsers, extraction_mode=extraction_mode,
+                            output_format=output_format, browser_profile=browser_profile,
+                            odds_store=open_odds_store('data'))
+    scheduler = WatchScheduler(scraper, leagues, statistics, max_browsers=max_browsers)
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    try:
+        scraper.driver_pool.warm_up()
+        scheduler.run()
+    except KeyboardInterrupt:
+        print("Stopping watch...")
+        scheduler.stop()
+    finally:
+        print(f"Refresh schedule: {scheduler.stats()}")
+        print(f"Driver pool stats: {scraper.pool_stats()}")
+        scraper.close()
+
+def run_coordinator(leagues, statistics, books, output_format, host, port, local_nodes, node_arguments):
+    """Split a job into book/league/statistic tasks and hand them out to scrape nodes"""
+    import subprocess
+    from scraper.distributed import Coordinator
+    from scraper.odds_store import open_odds_store
+    from scraper.config import AVAILABLE_LEAGUES, AVAILABLE_STATISTICS, SPORTSBOOKS
+    
+    leagues = leagues or AVAILABLE_LEAGUES
+    invalid = [league for league in leagues if league not in AVAILABLE_LEAGUES]
+    invalid += [statistic for statistic in statistics if statistic not in AVAILABLE_STATISTICS]
+    invalid += [book for book in books if book not in SPORTSBOOKS]
+    if invalid:
+        print(f"Error: Invalid leagues, statistics or sportsbooks: {', '.join(invalid)}")
+        return
+    
+    coordinator = Coordinator(host, port, output_dir='data', output_format=output_format,
+                              odds_store=open_odds_store('data')).start()
+    job = coordinator.submit(leagues, statistics, books=books)
+    
+    # Local nodes make it easy to try the protocol on one machine
+    nodes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), 'node', '--host', host,
+                          '--port', str(coordinator.address[1]), '--name', f'local-{index + 1}', *node_arguments])
+        for index in range(local_nodes)
+    ]
+    try:
+        job.done.wait()
+    except KeyboardInterrupt:
+        print("Stopping coordinator...")
+    finally:
+        print(f"Coordinator stats: {coordinator.stats()}")
+        coordinator.stop()
+        for node in nodes:
+            try:
+                node.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                node.terminate()
+    
+    print(f"Distributed scrape completed. Output file: {job.output_file}")
+
+def run_node(host, port, name, browsers, extraction_mode, base_url, browser_profile):
+    """Pull league/statistic tasks from a coordinator and scrape them"""
+    import signal
+    from scraper.scraper import SportsScraper
+    from scraper.distributed import ScrapeNode
+    
+    # Rows are streamed to the coordinator, which writes the real output file
+    scraper = SportsScraper(pool_size=browsers, extraction_mode=extraction_mode, output_format='ndjson',
+                            base_url=base_url, browser_profile=browser_profile)
+    node = ScrapeNode(scraper, host, port, name=name, browsers=browsers)
+    signal.signal(signal.SIGTERM, lambda signum, frame: node.stop())
+    try:
+        node.run()
+    except KeyboardInterrupt:
+        print("Stopping node...")
+        node.stop()
+    finally:
+        print(f"Driver pool stats: {scraper.pool_stats()}")
+        scraper.close()
+
 def main():
     """Main entry point"""
+    from scraper.config import BASE_URL, BROWSER_PROFILES, COORDINATOR_HOST, COORDINATOR_PORT, DEFAULT_BROWSER_PROFILE, DEFAULT_ENGINE, DEFAULT_EXTRACTION_MODE, DEFAULT_OUTPUT_FORMAT, DEFAULT_SPORTSBOOK, NODE_BROWSERS, WATCH_MAX_BROWSERS
+    from scraper.extractors import EXTRACTORS
+    from scraper.writers import WRITERS
+
     parser = argparse.ArgumentParser(description='Sports Betting Scraper')
     subparsers = parser.add_subparsers(dest='command', help='Command to run')
     
@@ -54,8 +168,83 @@ def main():
     scraper_parser = subparsers.add_parser('scrape', help='Run the scraper directly')
     scraper_parser.add_argument('--leagues', '-l', nargs='+', required=True, 
                                help='Leagues to scrape (e.g., EPL "La Liga")')
-    scraper_parser.add_argument('--statistic', '-s', required=True,
-                               help='Statistic to scrape (e.g., Passes, Shots)')
+    scraper_parser.add_argument('--statistic', '--statistics', '-s', dest='statistics', nargs='+', required=True,
+                               help='Statistics to scrape (e.g., Passes Shots)')
+    scraper_parser.add_argument('--books', '-b', nargs='+', default=[DEFAULT_SPORTSBOOK],
+                               help='Sportsbooks (sb= values) to scrape in parallel (default: %(default)s)')
+    scraper_parser.add_argument('--extraction', '-e', default=DEFAULT_EXTRACTION_MODE,
+                               choices=sorted(EXTRACTORS),
+                               help='Game extraction mode (default: %(default)s)')
+    scraper_parser.add_argument('--format', '-f', dest='output_format', default=DEFAULT_OUTPUT_FORMAT,
+                               choices=sorted(WRITERS),
+                               help='Output file format (default: %(default)s)')
+    scraper_parser.add_argument('--engine', default=DEFAULT_ENGINE, choices=['selenium', 'async'],
+                               help='Scraping engine: threaded Selenium browsers or asyncio tabs over CDP (default: %(default)s)')
+    scraper_parser.add_argument('--base-url', default=BASE_URL,
+                               help='Betbuilder page to scrape, e.g. a local fixture server (default: %(default)s)')
+    scraper_parser.add_argument('--profile', default=DEFAULT_BROWSER_PROFILE, choices=sorted(BROWSER_PROFILES),
+                               help='Browser profile; "lean" is headless and skips images, fonts and media (default: %(default)s)')
+    
+    # Watch subcommand
+    watch_parser = subparsers.add_parser('watch', help='Continuously re-scrape leagues on an adaptive schedule')
+    watch_parser.add_argument('--leagues', '-l', nargs='+',
+                             help='Leagues to watch (default: all available leagues)')
+    watch_parser.add_argument('--statistic', '--statistics', '-s', dest='statistics', nargs='+', required=True,
+                             help='Statistics to watch (e.g., Passes Shots)')
+    watch_parser.add_argument('--extraction', '-e', default=DEFAULT_EXTRACTION_MODE,
+                             choices=sorted(EXTRACTORS),
+                             help='Game extraction mode (default: %(default)s)')
+    watch_parser.add_argument('--format', '-f', dest='output_format', default='delta',
+                             choices=sorted(WRITERS),
+                             help='Output file format (default: %(default)s)')
+    watch_parser.add_argument('--max-browsers', type=int, default=WATCH_MAX_BROWSERS,
+                             help='Leagues scraped at the same time (default: %(default)s)')
+    watch_parser.add_argument('--profile', default=DEFAULT_BROWSER_PROFILE, choices=sorted(BROWSER_PROFILES),
+                             help='Browser profile; "lean" is headless and skips images, fonts and media (default: %(default)s)')
+    
+    # Coordinator subcommand
+    coordinator_parser = subparsers.add_parser('coordinator', help='Hand out league/statistic tasks to scrape nodes')
+    coordinator_parser.add_argument('--leagues', '-l', nargs='+',
+                                   help='Leagues to scrape (default: all available leagues)')
+    coordinator_parser.add_argument('--statistic', '--statistics', '-s', dest='statistics', nargs='+', required=True,
+                                   help='Statistics to scrape (e.g., Passes Shots)')
+    coordinator_parser.add_argument('--books', '-b', nargs='+', default=[DEFAULT_SPORTSBOOK],
+                                   help='Sportsbooks (sb= values) to scrape (default: %(default)s)')
+    coordinator_parser.add_argument('--format', '-f', dest='output_format', default=DEFAULT_OUTPUT_FORMAT,
+                                   choices=sorted(WRITERS),
+                                   help='Output file format (default: %(default)s)')
+    coordinator_parser.add_argument('--host', default=COORDINATOR_HOST,
+                                   help='Interface to listen on for nodes (default: %(default)s)')
+    coordinator_parser.add_argument('--port', type=int, default=COORDINATOR_PORT,
+                                   help='Port to listen on for nodes (default: %(default)s)')
+    coordinator_parser.add_argument('--local-nodes', type=int, default=0,
+                                   help='Scrape nodes to start on this machine (default: %(default)s)')
+    coordinator_parser.add_argument('--browsers', type=int, default=NODE_BROWSERS,
+                                   help='Browsers per local node (default: %(default)s)')
+    coordinator_parser.add_argument('--extraction', '-e', default=DEFAULT_EXTRACTION_MODE,
+                                   choices=sorted(EXTRACTORS),
+                                   help='Game extraction mode of local nodes (default: %(default)s)')
+    coordinator_parser.add_argument('--base-url', default=BASE_URL,
+                                   help='Betbuilder page local nodes scrape (default: %(default)s)')
+    coordinator_parser.add_argument('--profile', default=DEFAULT_BROWSER_PROFILE, choices=sorted(BROWSER_PROFILES),
+                                   help='Browser profile of local nodes (default: %(default)s)')
+    
+    # Node subcommand
+    node_parser = subparsers.add_parser('node', help='Scrape tasks handed out by a coordinator')
+    node_parser.add_argument('--host', default=COORDINATOR_HOST,
+                            help='Coordinator address (default: %(default)s)')
+    node_parser.add_argument('--port', type=int, default=COORDINATOR_PORT,
+                            help='Coordinator port (default: %(default)s)')
+    node_parser.add_argument('--name', help='Node name shown by the coordinator (default: host name and PID)')
+    node_parser.add_argument('--browsers', type=int, default=NODE_BROWSERS,
+                            help='Tasks scraped at the same time, one browser each (default: %(default)s)')
+    node_parser.add_argument('--extraction', '-e', default=DEFAULT_EXTRACTION_MODE,
+                            choices=sorted(EXTRACTORS),
+                            help='Game extraction mode (default: %(default)s)')
+    node_parser.add_argument('--base-url', default=BASE_URL,
+                            help='Betbuilder page to scrape (default: %(default)s)')
+    node_parser.add_argument('--profile', default=DEFAULT_BROWSER_PROFILE, choices=sorted(BROWSER_PROFILES),
+                            help='Browser profile; "lean" is headless and skips images, fonts and media (default: %(default)s)')
     
     # Parse arguments
     args = parser.parse_args()
@@ -67,7 +256,18 @@ def main():
     if args.command == 'api':
         run_api()
     elif args.command == 'scrape':
-        run_scraper(args.leagues, args.statistic)
+        run_scraper(args.leagues, args.statistics, args.extraction, args.engine, args.output_format,
+                    args.base_url, args.profile, args.books)
+    elif args.command == 'watch':
+        run_watch(args.leagues, args.statistics, args.extraction, args.output_format, args.max_browsers,
+                  args.profile)
+    elif args.command == 'coordinator':
+        node_arguments = ['--browsers', str(args.browsers), '--extraction', args.extraction,
+                          '--base-url', args.base_url, '--profile', args.profile]
+        run_coordinator(args.leagues, args.statistics, args.books, args.output_format, args.host, args.port,
+                        args.local_nodes, node_arguments)
+    elif args.command == 'node':
+        run_node(args.host, args.port, args.name, args.browsers, args.extraction, args.base_url, args.profile)
     else:
         parser.print_help()
 
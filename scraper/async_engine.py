@@ -0,0 +1,590 @@
+"""
+Asyncio scraping engine that drives many tabs of one Chrome process over the
+DevTools protocol instead of one blocking Selenium driver per thread
+"""
+import os
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import itertools
+import subprocess
+
+import websockets
+
+from scraper.browser_profiles import profile_arguments
+from scraper.config import (
+    ASYNC_MAX_TABS,
+    CDP_COMMAND_TIMEOUT,
+    CHROME_BINARY,
+    CHROME_START_TIMEOUT,
+    DEFAULT_READINESS_TIMEOUT,
+    DEFAULT_SPORTSBOOK,
+    DOM_QUIET_TIME,
+    NETWORK_IDLE_TIME,
+    READINESS_POLL_INTERVAL,
+    READINESS_TIMEOUTS,
+)
+from scraper.network_capture import decode_body, parse_payload, should_capture
+from scraper.readiness import DOM_QUIET_SCRIPT, NetworkLog
+from scraper.scraper import (
+    CaptchaDetected,
+    ScrapeCancelled,
+    SportsScraper,
+    STEALTH_SCRIPT,
+    USER_AGENT,
+    as_statistic_list,
+)
+from scraper.sportsbooks import book_units, get_sportsbooks, sportsbook_url
+
+CHROME_CANDIDATES = [
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "chrome",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+CHROME_ARGUMENTS = [
+    "--remote-debugging-port=0",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-blink-features=AutomationControlled",
+    "--disable-notifications",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--ignore-certificate-errors",
+    "--disable-popup-blocking",
+    "--disable-translate",
+    "--disable-extensions",
+]
+
+# In-page expressions; %(name)s placeholders are filled by PageSelectors.script
+GAME_HEADERS_JS = "Array.from(document.querySelectorAll(%(game_header)s))"
+
+CAPTCHA_JS = "!!document.querySelector(%(captcha)s)"
+
+CLICK_LEAGUE_JS = """(() => {
+    const name = %(name)s;
+    for (const el of document.querySelectorAll(%(league_item)s + ' ' + %(league_name)s)) {
+        if (el.textContent.includes(name)) {
+            el.closest(%(league_item)s).click();
+            return true;
+        }
+    }
+    return false;
+})()"""
+
+CLICK_STATISTIC_JS = """(() => {
+    const name = %(name)s;
+    for (const el of document.querySelectorAll(%(stat_item)s + ' ' + %(stat_label)s)) {
+        if (el.textContent.includes(name)) {
+            el.parentElement.click();
+            return true;
+        }
+    }
+    return false;
+})()"""
+
+
+def call_script(script, *args):
+    """Wrap a Selenium-style script body so it runs via Runtime.evaluate with the given JS arguments"""
+    return f"(function() {{ {script} }}).apply(null, [{', '.join(args)}])"
+
+
+class CDPError(Exception):
+    """Raised when a DevTools command fails or the connection drops"""
+
+
+class StepTimeout(Exception):
+    """Raised when a page condition is not met within the step timeout"""
+
+
+class ChromeProcess:
+    """A Chrome process launched with remote debugging on a free port"""
+
+    def __init__(self, binary=None, arguments=()):
+        self.binary = binary or CHROME_BINARY or self.find_binary()
+        self.arguments = list(arguments)
+        self.process = None
+        self.user_data_dir = None
+
+    @staticmethod
+    def find_binary():
+        for candidate in CHROME_CANDIDATES:
+            path = shutil.which(candidate) or (candidate if os.path.isfile(candidate) else None)
+            if path:
+                return path
+        raise FileNotFoundError("Chrome not found; set CHROME_BINARY in scraper/config.py")
+
+    def start(self):
+        """Launch Chrome and return its browser-level DevTools websocket URL"""
+        self.user_data_dir = tempfile.mkdtemp(prefix="scraper-chrome-")
+        self.process = subprocess.Popen(
+            [self.binary, f"--user-data-dir={self.user_data_dir}"] + CHROME_ARGUMENTS + self.arguments
+            + ["about:blank"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        # Chrome writes the chosen port and browser target path to this file
+        port_file = os.path.join(self.user_data_dir, "DevToolsActivePort")
+        deadline = time.monotonic() + CHROME_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CDPError(f"Chrome exited with code {self.process.returncode}")
+            if os.path.exists(port_file):
+                with open(port_file) as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    return f"ws://127.0.0.1:{lines[0]}{lines[1]}"
+            time.sleep(0.1)
+
+        self.stop()
+        raise CDPError(f"Chrome did not start within {CHROME_START_TIMEOUT} seconds")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class CDPConnection:
+    """Browser-level DevTools connection multiplexing flattened tab sessions"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = {}
+        self._reader = None
+
+    @classmethod
+    async def connect(cls, url):
+        ws = await websockets.connect(url, max_size=None)
+        connection = cls(ws)
+        connection._reader = asyncio.ensure_future(connection._read_loop())
+        return connection
+
+    async def _read_loop(self):
+        try:
+            async for raw in self.ws:
+                message = json.loads(raw)
+                if "id" in message:
+                    future = self._pending.pop(message["id"], None)
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(CDPError(message["error"].get("message")))
+                    else:
+                        future.set_result(message.get("result", {}))
+                else:
+                    for listener in list(self._listeners.get(message.get("sessionId"), ())):
+                        listener(message.get("method"), message.get("params", {}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("DevTools connection closed"))
+            self._pending.clear()
+
+    async def send(self, method, params=None, session_id=None):
+        """Send a command and wait for its result"""
+        message_id = next(self._ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message_id] = future
+        await self.ws.send(json.dumps(message))
+        try:
+            return await asyncio.wait_for(future, CDP_COMMAND_TIMEOUT)
+        finally:
+            self._pending.pop(message_id, None)
+
+    def add_listener(self, session_id, listener):
+        self._listeners.setdefault(session_id, []).append(listener)
+
+    def remove_listener(self, session_id, listener):
+        listeners = self._listeners.get(session_id, [])
+        if listener in listeners:
+            listeners.remove(listener)
+        if not listeners:
+            self._listeners.pop(session_id, None)
+
+    async def close(self):
+        await self.ws.close()
+        if self._reader:
+            await self._reader
+
+
+class CDPTab:
+    """A single tab attached through a flattened DevTools session"""
+
+    def __init__(self, connection, target_id, session_id, recorder):
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+        self.recorder = recorder
+        self.network_log = NetworkLog()
+        self._loaded = asyncio.Event()
+        connection.add_listener(session_id, self._on_event)
+
+    @classmethod
+    async def open(cls, connection, recorder, blocked_urls=()):
+        target = await connection.send("Target.createTarget", {"url": "about:blank"})
+        attached = await connection.send(
+            "Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})
+        tab = cls(connection, target["targetId"], attached["sessionId"], recorder)
+
+        await tab.send("Page.enable")
+        await tab.send("Network.enable")
+        await tab.send("Runtime.enable")
+        await tab.send("Network.setUserAgentOverride", {"userAgent": USER_AGENT})
+        if blocked_urls:
+            await tab.send("Network.setBlockedURLs", {"urls": list(blocked_urls)})
+        await tab.send("Page.addScriptToEvaluateOnNewDocument", {"source": STEALTH_SCRIPT})
+        return tab
+
+    def _on_event(self, method, params):
+        if method.startswith("Network."):
+            self.network_log.handle_event(method, params)
+        elif method == "Page.loadEventFired":
+            self._loaded.set()
+
+    async def send(self, method, params=None):
+        return await self.connection.send(method, params, session_id=self.session_id)
+
+    async def evaluate(self, expression, await_promise=False):
+        """Evaluate an expression in the page and return its JSON value"""
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": await_promise,
+        })
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise CDPError(details.get("exception", {}).get("description") or details.get("text"))
+        return result.get("result", {}).get("value")
+
+    def timeout(self, step):
+        return READINESS_TIMEOUTS.get(step, DEFAULT_READINESS_TIMEOUT)
+
+    async def navigate(self, step, url):
+        """Load a URL and wait for the load event and for the page to settle"""
+        self.network_log.reset()
+        self._loaded.clear()
+        start = time.monotonic()
+        await self.send("Page.navigate", {"url": url})
+        try:
+            await asyncio.wait_for(self._loaded.wait(), self.timeout(step))
+        except asyncio.TimeoutError:
+            self.recorder.record(step, time.monotonic() - start, timed_out=True)
+            raise StepTimeout(f"{url} did not load within {self.timeout(step)} seconds")
+        return await self.settle(step, start=start)
+
+    async def wait_for(self, step, expression):
+        """Poll an expression until it is truthy and return its value"""
+        start = time.monotonic()
+        deadline = start + self.timeout(step)
+        while True:
+            value = await self.evaluate(expression)
+            if value:
+                self.recorder.record(step, time.monotonic() - start)
+                return value
+            if time.monotonic() >= deadline:
+                self.recorder.record(step, time.monotonic() - start, timed_out=True)
+                raise StepTimeout(f"Timed out waiting for {step}")
+            await asyncio.sleep(READINESS_POLL_INTERVAL)
+
+    async def settle(self, step, start=None):
+        """Wait for network idle and then for the DOM to go quiet, sharing the step timeout"""
+        start = start or time.monotonic()
+        deadline = start + self.timeout(step)
+
+        settled = False
+        while time.monotonic() < deadline:
+            if self.network_log.idle_for() >= NETWORK_IDLE_TIME:
+                settled = True
+                break
+            await asyncio.sleep(READINESS_POLL_INTERVAL)
+
+        if settled:
+            quiet_ms = DOM_QUIET_TIME * 1000
+            remaining_ms = max(0, deadline - time.monotonic()) * 1000
+            script = f"new Promise(resolve => (function() {{ {DOM_QUIET_SCRIPT} }})({quiet_ms}, {remaining_ms}, resolve))"
+            quiet_for = await self.evaluate(script, await_promise=True)
+            settled = quiet_for is not None and quiet_for >= quiet_ms
+
+        self.recorder.record(step, time.monotonic() - start, timed_out=not settled)
+        return settled
+
+    async def close(self):
+        self.connection.remove_listener(self.session_id, self._on_event)
+        try:
+            await self.connection.send("Target.closeTarget", {"targetId": self.target_id})
+        except CDPError:
+            pass
+
+
+class AsyncSportsScraper(SportsScraper):
+    """
+    Drop-in alternative to SportsScraper that scrapes every league in its own
+    tab of a single Chrome process, with at most max_tabs tabs open at once
+
+    Games are read with the single-pass JS extraction, or from captured API
+    responses when extraction_mode is "network".
+    """
+
+    def __init__(self, output_dir=None, max_tabs=ASYNC_MAX_TABS, chrome_binary=None, **kwargs):
+        super().__init__(output_dir=output_dir, **kwargs)
+        self.max_tabs = max_tabs
+        self.chrome_binary = chrome_binary
+        self.game_headers_js = self.selectors.script(GAME_HEADERS_JS)
+        self.captcha_js = self.selectors.script(CAPTCHA_JS)
+
+    async def check_page_for_captcha(self, tab):
+        return await tab.evaluate(self.captcha_js)
+
+    async def ensure_no_captcha_async(self, tab, league_name, message):
+        """Raise CaptchaDetected with message if the tab shows a CAPTCHA"""
+        with self.metrics.timer("captcha_check", league=league_name):
+            found = await self.check_page_for_captcha(tab)
+        if found:
+            self.metrics.increment("scraper_captcha_total", league=league_name)
+            self.metrics.log("captcha", league=league_name, message=message)
+            raise CaptchaDetected(message)
+
+    async def captured_games(self, tab, statistic):
+        """Parse games for a statistic out of the tab's captured JSON responses"""
+        games = {}
+        for request_id, url in tab.network_log.take_json_responses():
+            if not should_capture(url):
+                continue
+            try:
+                payload = decode_body(await tab.send("Network.getResponseBody", {"requestId": request_id}))
+            except CDPError as e:
+                print(f"Could not read captured response {url}: {e}")
+                continue
+            for game_title, rows in parse_payload(payload, statistic):
+                games.setdefault(game_title, []).extend(rows)
+        return [{"game": game_title, "rows": rows} for game_title, rows in games.items()]
+
+    async def run_blocking(self, func, *args):
+        """Run a call that may block (SQLite, job callbacks) in the default executor, off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def process_league_async(self, connection, semaphore, book_semaphore, league_name, statistic, output_file,
+                                   should_cancel=None, on_game=None, book=DEFAULT_SPORTSBOOK):
+        """Process a book's league, serving cached statistics and scraping the rest, returning the number of rows written"""
+        rows_written = 0
+        remaining = as_statistic_list(statistic)
+        while remaining and not (should_cancel and await self.run_blocking(should_cancel)):
+            # Cache lookups block on SQLite, so they run off the event loop
+            served, claimed, in_flight = await self.run_blocking(
+                self.serve_cached, league_name, remaining, output_file, on_game, book)
+            rows_written += served
+            if claimed:
+                rows_written += await self.scrape_league_async(
+                    connection, semaphore, book_semaphore, league_name, claimed, output_file, should_cancel, on_game,
+                    book)
+            served, remaining = await self.run_blocking(
+                self.wait_for_cached, league_name, in_flight, output_file, should_cancel, on_game, book)
+            rows_written += served
+        return rows_written
+
+    async def scrape_league_async(self, connection, semaphore, book_semaphore, league_name, statistic, output_file,
+                                  should_cancel=None, on_game=None, book=DEFAULT_SPORTSBOOK):
+        """
+        Scrape a book's league for one or more statistics in its own tab, returning the number of rows written
+
+        should_cancel, on_game and the cache may block on SQLite, so they are
+        called in the executor rather than on the event loop shared by every tab.
+        """
+        statistics = as_statistic_list(statistic)
+        rows_written = 0
+        completed = set()
+
+        # The book's slot is taken first so waiting for it doesn't hold a tab slot
+        async with book_semaphore, semaphore:
+            if should_cancel and await self.run_blocking(should_cancel):
+                return rows_written
+            tab = None
+            try:
+                with self.metrics.timer("driver_checkout", league=league_name):
+                    tab = await CDPTab.open(connection, self.readiness, self.browser_profile["blocked_urls"])
+                print(f"Accessing {book} website for {league_name}, statistics: {', '.join(statistics)}...")
+                with self.metrics.timer("page_load", league=league_name):
+                    await tab.navigate("page_load", sportsbook_url(self.base_url, book))
+
+                await self.ensure_no_captcha_async(tab, league_name, "CAPTCHA detected - aborting scrape")
+
+                with self.metrics.timer("league_click", league=league_name):
+                    await tab.wait_for("league", self.selectors.script(CLICK_LEAGUE_JS, name=league_name))
+                    print(f"Clicked {league_name}")
+                    await tab.settle("league_click")
+
+                await self.ensure_no_captcha_async(
+                    tab, league_name, "CAPTCHA detected after league selection - aborting scrape")
+
+                for stat in statistics:
+                    if should_cancel and await self.run_blocking(should_cancel):
+                        break
+                    try:
+                        # Only responses triggered by this statistic are parsed in network mode
+                        tab.network_log.take_json_responses()
+                        with self.metrics.timer("stat_click", league=league_name):
+                            await tab.wait_for("stat_button", self.selectors.script(CLICK_STATISTIC_JS, name=stat))
+                            print(f"Clicked {stat} button for {league_name}")
+                            await tab.settle("stat_click")
+
+                        await self.ensure_no_captcha_async(
+                            tab, league_name, f"CAPTCHA detected after selecting {stat} - aborting scrape")
+
+                        game_count = await tab.wait_for("games", f"{self.game_headers_js}.length")
+                    except StepTimeout as e:
+                        print(f"No {stat} markets found for {league_name}: {e}")
+                        self.record_error(league_name, e, stat)
+                        continue
+                    print(f"Found {game_count} {stat} games for {league_name}")
+
+                    games = None
+                    if self.extractor.name == "network":
+                        games = await self.captured_games(tab, stat)
+                        if not games:
+                            print(f"No {stat} odds found in captured responses, falling back to DOM extraction")
+
+                    if not games:
+                        if await tab.evaluate(call_script(self.extractor.expand_all_script, self.game_headers_js)):
+                            await tab.settle("game_expand")
+
+                        extract_start = time.monotonic()
+                        games = await tab.evaluate(
+                            call_script(self.extractor.extract_games_script, self.game_headers_js, json.dumps(stat)))
+                        # One script reads every game; record its share per game
+                        for _ in games or []:
+                            self.readiness.record("extract_game", (time.monotonic() - extract_start) / len(games))
+                            self.metrics.observe("game", (time.monotonic() - extract_start) / len(games),
+                                                 league=league_name)
+
+                    cancelled = False
+                    for game in games or []:
+                        if should_cancel and await self.run_blocking(should_cancel):
+                            cancelled = True
+                            break
+                        if game["rows"]:
+                            for row in game["rows"]:
+                                row["book"] = book
+                                row["league"] = league_name
+                            self.write_rows(game["rows"], output_file)
+                            rows_written += len(game["rows"])
+                            self.record_game(league_name, game["rows"])
+                            print(f"Wrote {len(game['rows'])} records for game: {game['game']}")
+                            if on_game:
+                                await self.run_blocking(on_game, league_name, game["game"], game["rows"])
+
+                    if cancelled:
+                        break
+                    # No rows means a failed extraction or an empty page, not that every line was pulled,
+                    # so the slice is neither completed nor cached; its claim is released below
+                    written = [[game["game"], game["rows"]] for game in games or [] if game["rows"]]
+                    if not written:
+                        continue
+                    await self.run_blocking(self.complete_slice, league_name, stat, output_file, book)
+                    if self.cache:
+                        await self.run_blocking(self.cache.put, league_name, stat, written, book)
+                    completed.add(stat)
+
+            except (CaptchaDetected, StepTimeout, CDPError, asyncio.TimeoutError) as e:
+                print(f"Major error processing league {league_name}: {e}")
+                self.record_error(league_name, e)
+
+            finally:
+                if tab:
+                    await tab.close()
+                if self.cache:
+                    for stat in statistics:
+                        if stat not in completed:
+                            await self.run_blocking(self.cache.release, league_name, stat, book)
+
+        return rows_written
+
+    async def scrape_data_async(self, leagues, statistic, max_tabs=None, should_cancel=None, on_game=None,
+                                books=None):
+        """Scrape all leagues of every book concurrently in tabs of one browser and return the output file path"""
+        books = get_sportsbooks(books)
+        units = book_units(books, leagues)
+        output_file = self.get_output_filename(leagues, statistic, books)
+        max_tabs = max_tabs or self.max_tabs
+        print(f"Starting async scraper with up to {max_tabs} concurrent tabs across {', '.join(books)}")
+        print(f"Output file: {output_file}")
+
+        start_time = time.monotonic()
+        loop = asyncio.get_running_loop()
+        chrome = ChromeProcess(self.chrome_binary, profile_arguments(self.browser_profile))
+        with self.metrics.timer("driver_create"):
+            ws_url = await loop.run_in_executor(None, chrome.start)
+        self.open_output(output_file)
+        try:
+            connection = await CDPConnection.connect(ws_url)
+            try:
+                semaphore = asyncio.Semaphore(max_tabs)
+                book_semaphores = {
+                    book: asyncio.Semaphore(self.book_limiter.limit(book)) for book in books
+                }
+                results = await asyncio.gather(*[
+                    self.process_league_async(connection, semaphore, book_semaphores[book], league, statistic,
+                                              output_file, should_cancel, on_game, book)
+                    for book, league in units
+                ], return_exceptions=True)
+            finally:
+                await connection.close()
+        finally:
+            await loop.run_in_executor(None, chrome.stop)
+            await loop.run_in_executor(None, self.close_output, output_file)
+
+        total_rows = 0
+        for (book, league), result in zip(units, results):
+            if isinstance(result, Exception):
+                print(f"League {league} ({book}) generated an exception: {result}")
+            else:
+                total_rows += result
+
+        elapsed = time.monotonic() - start_time
+        print(f"Wrote {total_rows} rows in {elapsed:.1f}s ({total_rows / elapsed if elapsed else 0:.1f} rows/sec)")
+        print(f"Readiness waits: {self.readiness_stats()}")
+        print(f"Step timings: {self.metrics.summary()}")
+
+        if should_cancel and should_cancel():
+            raise ScrapeCancelled(output_file)
+        return output_file
+
+    def scrape_data(self, leagues, statistic, max_workers=None, should_cancel=None, on_game=None, books=None):
+        """
+        Scrape data for the specified leagues and statistic(s) from one or more sportsbooks
+
+        Args:
+            leagues (list): List of league names to scrape
+            statistic (str or list): Statistic or list of statistics to scrape
+            max_workers (int): Maximum number of concurrent tabs, defaults to max_tabs
+            should_cancel (callable): Polled during the scrape; returning True
+                stops it and raises ScrapeCancelled after flushing the output
+            on_game (callable): Called as on_game(league, game_title, rows) as
+                soon as each game has been scraped
+            books (list): Sportsbooks to scrape every league from, each
+                limited to its SPORTSBOOKS number of concurrent tabs
+
+        Returns:
+            str: Path to the output file
+        """
+        return asyncio.run(self.scrape_data_async(leagues, statistic, max_workers, should_cancel, on_game, books))
@@ -0,0 +1,45 @@
+"""
+Chrome launch settings for the "full" and "lean" browser profiles
+
+Profiles are defined in BROWSER_PROFILES in scraper/config.py. Both engines
+turn a profile into Chrome command-line arguments here and block its
+blocked_urls over CDP once the browser or tab is up.
+"""
+from scraper.config import BROWSER_PROFILES
+
+# Background work a scraper never needs: component and safe-browsing
+# updates, sync, default apps, audio, and the field trial / metrics services
+BACKGROUND_SERVICE_ARGUMENTS = [
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-client-side-phishing-detection",
+    "--disable-breakpad",
+    "--disable-domain-reliability",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--hide-scrollbars",
+]
+
+
+def get_browser_profile(name):
+    """Return the settings of a browser profile"""
+    try:
+        return dict(BROWSER_PROFILES[name], name=name)
+    except KeyError:
+        raise ValueError(
+            f"Unknown browser profile: {name} (available: {', '.join(BROWSER_PROFILES)})")
+
+
+def profile_arguments(profile):
+    """Return the Chrome command-line arguments a profile adds"""
+    arguments = [f"--window-size={profile['window_size']}"]
+    if profile.get("headless"):
+        arguments.append("--headless=new")
+    if profile.get("disable_background_services"):
+        arguments += BACKGROUND_SERVICE_ARGUMENTS
+    if profile.get("block_images"):
+        arguments.append("--blink-settings=imagesEnabled=false")
+    return arguments
@@ -0,0 +1,194 @@
+"""
+Short-lived cache of scraped results keyed by (book, league, statistic)
+
+Slices live in SQLite so every process scraping into the same output directory
+(the web app's job workers) shares them. A slice is either "ready" with the
+games scraped for that book, league and statistic, or "pending" while one scraper
+fetches it; other scrapers that need the same slice wait for that result
+instead of scraping the page again.
+"""
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+from scraper.config import (
+    DEFAULT_SPORTSBOOK,
+    RESULT_CACHE_CLAIM_TIMEOUT,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_POLL_INTERVAL,
+    RESULT_CACHE_TTL,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slices (
+    book TEXT NOT NULL,
+    league TEXT NOT NULL,
+    statistic TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner TEXT,
+    games TEXT,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (book, league, statistic)
+);
+CREATE INDEX IF NOT EXISTS slices_last_used ON slices (status, last_used);
+"""
+
+# lookup_or_claim results
+HIT = "hit"
+CLAIMED = "claimed"
+IN_FLIGHT = "in_flight"
+
+
+class ResultCache:
+    def __init__(self, path, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES,
+                 claim_timeout=RESULT_CACHE_CLAIM_TIMEOUT):
+        """
+        Open (and create if needed) the cache database
+
+        Args:
+            path (str): SQLite database file
+            ttl (float): Seconds a scraped slice is served from the cache
+            max_entries (int): Ready slices kept before the least recently used are evicted
+            claim_timeout (float): Seconds after which an unfinished scrape's claim
+                is considered abandoned and can be taken over
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.claim_timeout = claim_timeout
+        # Identifies this cache's claims so only they are released on failure
+        self.owner = uuid.uuid4().hex
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "evicted": 0}
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Caches from before sportsbooks were tracked are only short-lived results; start afresh
+        columns = [row["name"] for row in conn.execute("PRAGMA table_info(slices)")]
+        if columns and "book" not in columns:
+            conn.execute("DROP TABLE slices")
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _is_fresh(self, row, now):
+        return row["status"] == "ready" and now - row["created_at"] < self.ttl
+
+    def _is_abandoned(self, row, now):
+        return row["status"] == "pending" and now - row["created_at"] >= self.claim_timeout
+
+    def lookup_or_claim(self, league, statistic, book=DEFAULT_SPORTSBOOK):
+        """
+        Return a fresh slice, or claim the right to scrape it
+
+        Returns:
+            tuple: (HIT, games) for a fresh slice, (CLAIMED, None) if the caller
+                must scrape it and then put() or release() it, or (IN_FLIGHT, None)
+                if another scraper is already fetching it
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM slices WHERE book = ? AND league = ? AND statistic = ?",
+                (book, league, statistic)).fetchone()
+            if row is not None and self._is_fresh(row, now):
+                conn.execute(
+                    "UPDATE slices SET last_used = ? WHERE book = ? AND league = ? AND statistic = ?",
+                    (now, book, league, statistic))
+                conn.execute("COMMIT")
+                self._count("hits")
+                return HIT, json.loads(row["games"])
+
+            if row is not None and row["status"] == "pending" and not self._is_abandoned(row, now):
+                conn.execute("COMMIT")
+                self._count("coalesced")
+                return IN_FLIGHT, None
+
+            conn.execute(
+                "INSERT OR REPLACE INTO slices (book, league, statistic, status, owner, games, created_at, last_used) "
+                "VALUES (?, ?, ?, 'pending', ?, NULL, ?, ?)",
+                (book, league, statistic, self.owner, now, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("misses")
+        return CLAIMED, None
+
+    def put(self, league, statistic, games, book=DEFAULT_SPORTSBOOK):
+        """
+        Store a freshly scraped slice and evict expired and least recently used ones
+
+        Args:
+            games (list): (game title, rows) pairs in page order
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO slices (book, league, statistic, status, owner, games, created_at, last_used) "
+            "VALUES (?, ?, ?, 'ready', NULL, ?, ?, ?)",
+            (book, league, statistic, json.dumps(games), now, now))
+
+        evicted = conn.execute(
+            "DELETE FROM slices WHERE status = 'ready' AND created_at <= ?", (now - self.ttl,)).rowcount
+        evicted += conn.execute(
+            "DELETE FROM slices WHERE status = 'ready' AND rowid NOT IN "
+            "(SELECT rowid FROM slices WHERE status = 'ready' ORDER BY last_used DESC LIMIT ?)",
+            (self.max_entries,)).rowcount
+        if evicted:
+            self._count("evicted", evicted)
+
+    def release(self, league, statistic, book=DEFAULT_SPORTSBOOK):
+        """Give up a claim without a result so waiting scrapers fetch the slice themselves"""
+        self._connection().execute(
+            "DELETE FROM slices WHERE book = ? AND league = ? AND statistic = ? AND status = 'pending' AND owner = ?",
+            (book, league, statistic, self.owner))
+
+    def wait(self, league, statistic, should_cancel=None, book=DEFAULT_SPORTSBOOK):
+        """
+        Wait for another scraper's in-flight slice
+
+        Returns:
+            list: The slice's games, or None if the claim was released or
+                abandoned (the caller should try to claim it again)
+        """
+        conn = self._connection()
+        while not (should_cancel and should_cancel()):
+            row = conn.execute(
+                "SELECT * FROM slices WHERE book = ? AND league = ? AND statistic = ?",
+                (book, league, statistic)).fetchone()
+            now = time.time()
+            if row is None or self._is_abandoned(row, now):
+                return None
+            if row["status"] == "ready":
+                conn.execute(
+                    "UPDATE slices SET last_used = ? WHERE book = ? AND league = ? AND statistic = ?",
+                    (now, book, league, statistic))
+                return json.loads(row["games"])
+            time.sleep(RESULT_CACHE_POLL_INTERVAL)
+        return None
+
+    def stats(self):
+        """Return hit, miss, coalesced-request and eviction counts for this process"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / lookups, 3) if lookups else None
+        return stats
@@ -30,8 +30,194 @@ DEFAULT_LEAGUE = "EPL"
 DEFAULT_STATISTIC = "Passes"
 DEFAULT_MAX_WORKERS = 3
 
-# Base URL for the scraper
+# WebDriver pool settings
+DEFAULT_POOL_SIZE = DEFAULT_MAX_WORKERS
+DRIVER_MAX_USES = 20  # Recycle a driver after this many checkouts
+POOL_CHECKOUT_TIMEOUT = 300  # Seconds to wait for a free driver
+
+# Split a league's games across idle pooled browsers (1 disables sharding)
+GAME_SHARDS = 3  # Most browsers working on one league's games
+GAME_SHARD_MIN_GAMES = 4  # Games per shard below which no extra browser is used
+
+# Browser profile used to launch Chrome: "full" is a regular headed browser
+# that loads everything; "lean" runs headless with a small viewport,
+# background services off and the URLs below blocked through CDP
+# Network.setBlockedURLs, since none of them are needed to read odds
+DEFAULT_BROWSER_PROFILE = "full"
+BROWSER_PROFILES = {
+    "full": {
+        "headless": False,
+        "window_size": "1920,1080",
+        "disable_background_services": False,
+        "block_images": False,
+        "blocked_urls": [],
+    },
+    "lean": {
+        "headless": True,
+        "window_size": "1280,800",
+        "disable_background_services": True,
+        "block_images": True,  # Also skips images without a blocked extension
+        "blocked_urls": [
+            # Images, fonts and media
+            "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+            "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+            "*.mp4", "*.webm", "*.mp3", "*.ogg",
+            # Third-party analytics and tracking scripts
+            "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+            "*facebook.net*", "*hotjar.com*", "*clarity.ms*",
+        ],
+    },
+}
+
+# Scraping engine: "selenium" (thread per browser) or "async" (asyncio tabs
+# in one Chrome process over the DevTools protocol)
+DEFAULT_ENGINE = "selenium"
+
+# Async engine settings
+ASYNC_MAX_TABS = 8  # Maximum concurrently open tabs
+CHROME_BINARY = None  # Path to Chrome; auto-detected when None
+CHROME_START_TIMEOUT = 30  # Seconds to wait for Chrome's DevTools endpoint
+CDP_COMMAND_TIMEOUT = 30  # Seconds to wait for a DevTools command result
+
+# Game extraction mode: "css" (one WebDriver call per element, with SELECTORS'
+# locators), "js" (one execute_script per game), "js_league" (one
+# execute_script per league) or "network" (parse the betbuilder API responses
+# captured over CDP). "xpath" is the css mode with the original hard-coded
+# XPath lookups, kept only as a benchmark baseline; it ignores SELECTORS.
+DEFAULT_EXTRACTION_MODE = "css"
+
+# Network capture extraction ("network" mode): JSON responses whose URL
+# contains any of these substrings are parsed; all JSON responses when empty
+CAPTURE_URL_PATTERNS = []
+
+# Key names recognized in captured JSON payloads, in priority order
+CAPTURE_KEYS = {
+    "home_team": ["homeTeam", "home_team", "home", "team1"],
+    "away_team": ["awayTeam", "away_team", "away", "team2"],
+    "game": ["eventName", "event_name", "matchName", "game", "match"],
+    "player": ["playerName", "player_name", "player"],
+    "team": ["teamName", "team_name", "team"],
+    "statistic": ["statName", "statistic", "marketName", "market"],
+    "value": ["line", "handicap", "amount", "value", "points"],
+    "odds": ["odds", "price", "americanOdds", "decimalOdds", "coefficient"],
+}
+
+# Readiness timeouts in seconds for each step of a league scrape
+READINESS_TIMEOUTS = {
+    "page_load": 20,
+    "league": 15,
+    "league_click": 10,
+    "stat_button": 15,
+    "stat_click": 10,
+    "games": 15,
+    "game_expand": 5,
+}
+DEFAULT_READINESS_TIMEOUT = 10
+NETWORK_IDLE_TIME = 0.5  # Seconds with no requests in flight
+DOM_QUIET_TIME = 0.3  # Seconds with no DOM mutations
+READINESS_POLL_INTERVAL = 0.1
+
+# Optional delay in seconds between starting league workers
+LEAGUE_START_STAGGER = 0
+
+# Output format: "csv", "ndjson" or "parquet" (requires pyarrow)
+DEFAULT_OUTPUT_FORMAT = "csv"
+WRITER_BATCH_SIZE = 500  # Rows per flush
+WRITER_FLUSH_INTERVAL = 1.0  # Seconds before a partial batch is flushed
+DELTA_STORE_FILENAME = "odds_changes.ndjson"  # Append-only change log used by the "delta" format
+
+# /api/data streaming settings
+DATA_STREAM_CHUNK_ROWS = 200  # Rows per streamed response chunk
+DATA_INDEX_STRIDE = 1000  # Rows between byte-offset checkpoints in the row index
+DATA_INDEX_CACHE_SIZE = 32  # Number of file indexes kept in memory
+
+# run.py watch: adaptive refresh schedule per league/statistic
+WATCH_MAX_BROWSERS = DEFAULT_MAX_WORKERS  # Leagues scraped at the same time
+WATCH_BASE_INTERVAL = 120  # Initial seconds between refreshes
+WATCH_MIN_INTERVAL = 30
+WATCH_MAX_INTERVAL = 900
+WATCH_FAST_MOVE_RATIO = 0.1  # Share of lines whose odds moved that counts as a fast market
+WATCH_SPEEDUP = 0.5  # Interval multiplier for fast-moving markets
+WATCH_BACKOFF = 1.5  # Interval multiplier when nothing moved
+
+# Web app job queue: worker processes and the total browsers they may run at once
+JOB_WORKERS = 2
+BROWSER_BUDGET = 6
+JOB_DB_FILENAME = "jobs.db"  # SQLite queue database in the output directory
+JOB_POLL_INTERVAL = 1.0  # Seconds between claim attempts by an idle worker
+CANCEL_CHECK_INTERVAL = 1.0  # Seconds between checks of a running job's cancel flag
+
+# Cache of recently scraped (league, statistic) slices shared by the job workers
+RESULT_CACHE_TTL = 60  # Seconds a slice is reused; 0 disables the cache
+RESULT_CACHE_MAX_ENTRIES = 256  # Slices kept before the least recently used are evicted
+RESULT_CACHE_FILENAME = "cache.db"  # SQLite cache database in the output directory
+RESULT_CACHE_CLAIM_TIMEOUT = 600  # Seconds before an unfinished scrape of a slice is considered abandoned
+RESULT_CACHE_POLL_INTERVAL = 0.5  # Seconds between checks while waiting for an in-flight slice
+
+# Queryable store of every scraped row across runs (SQLite in the output directory)
+ODDS_STORE_FILENAME = "odds.db"  # Empty to only write output files
+ODDS_QUERY_MAX_ROWS = 10000  # Most rows or groups one /api/odds query returns
+
+# Server-Sent Events for job progress
+JOB_EVENT_POLL_INTERVAL = 0.25  # Seconds between reads of new events by an open stream
+JOB_EVENT_HEARTBEAT = 15  # Seconds between keep-alive comments on an idle stream
+JOB_EVENT_RETENTION = 3600  # Seconds events are kept after their job finishes
+
+# Step timings, per-league counters and the structured step log
+METRICS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # Histogram bucket bounds in seconds
+METRICS_LOG_FILENAME = "scraper.jsonl"  # JSON-lines step log in LOG_DIR; empty to disable
+METRICS_REPORT_INTERVAL = 10  # Seconds between metric reports by a job worker while a job runs
+
+# Page selectors, keyed by version. A site layout change is a new version
+# here (or an edit of the current one); SELECTOR_VERSION picks the set every
+# engine and extractor uses, so rolling back is a one-line change. Selectors
+# are CSS; the ones marked "matched by text" are combined with the league or
+# statistic name and compiled to XPath by scraper/page_selectors.py.
+SELECTOR_VERSION = 1
+SELECTORS = {
+    1: {
+        # One query for every CAPTCHA variant (recaptcha and g-recaptcha included)
+        "captcha": "iframe[src*='captcha'], div[class*='captcha']",
+        "league_item": "div[class*='ligues-slider__item']",
+        "league_name": "div[class*='ligues-slider__ligue-name']",  # In league_item, matched by text
+        "stat_item": "div[class*='main-markets__item']",
+        "stat_label": "p",  # In stat_item, matched by text; its parent is clicked
+        "game_header": "div[class*='tiered-block__item__top']",
+        "game_teams": "p[class*='tiered-block__player-team'] span",
+        "player": "div.shots-block__player",
+        "player_name": "p[class*='shots-block'][class*='player-name']",
+        "player_team": "p[class*='shots-block'][class*='player-team']",
+        "market_item": "div[class*='markets-slider'][class*='item']",
+        "market_amount": "p[class*='markets-slider'][class*='amount']",
+        "market_odds": "p[class*='markets-slider'][class*='stat']",
+    },
+}
+
+# Distributed scraping (run.py coordinator / run.py node): nodes pull
+# (league, statistic) tasks from the coordinator over newline-delimited JSON
+COORDINATOR_HOST = "127.0.0.1"  # Interface the coordinator listens on; the protocol is unauthenticated
+COORDINATOR_PORT = 8766
+NODE_BROWSERS = DEFAULT_MAX_WORKERS  # Tasks a node runs at once, one browser each
+NODE_HEARTBEAT_INTERVAL = 10  # Seconds between a node's heartbeats for its running tasks
+NODE_IDLE_WAIT = 1.0  # Seconds a node waits before asking again when no task is available
+NODE_CONNECT_TIMEOUT = 60  # Seconds a node keeps trying to reach the coordinator
+TASK_LEASE_TIMEOUT = 120  # Seconds without a heartbeat or rows before a task is reassigned
+TASK_MAX_ATTEMPTS = 3  # Failed or stalled attempts before a task is given up
+TASK_SPECULATE_AFTER = 300  # Seconds a task may run before an idle node starts a duplicate attempt
+
+# Base URL for the scraper; its sb= parameter is replaced by each sportsbook scraped
 BASE_URL = "https://troya.xyz/betbuilder?sb=betus"
 
+# Sportsbooks the betbuilder page can show (its sb= value) and, per book, the
+# most browsers one scraper has on that book at once. Jobs fan out across
+# books in parallel within these limits.
+SPORTSBOOKS = {
+    "betus": 3,
+}
+DEFAULT_SPORTSBOOK = "betus"
+
 # Output directory for CSV files
-OUTPUT_DIR = "data"
\ No newline at end of file
+OUTPUT_DIR = "data"
+
+# Directory for log files
+LOG_DIR = "logs"
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Append-only store of odds changes used by the "delta" output format
+
+The store is an NDJSON log of add/change/remove records. Replaying it gives
+the last known snapshot of every line, keyed by (book, league, statistic) and
+then (game, player, line), so each run only records what moved since the previous
+one. Several processes may share a store: appends are serialized with a file
+lock and each process replays what the others appended before diffing.
+"""
+import os
+import json
+import time
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+from scraper.config import DEFAULT_SPORTSBOOK, DELTA_STORE_FILENAME
+from scraper.writers import parse_number, parse_odds
+
+
+def default_store_path(output_file):
+    """Return the store shared by every delta output in the same directory"""
+    return os.path.join(os.path.dirname(os.path.abspath(output_file)), DELTA_STORE_FILENAME)
+
+
+def _record(ts, change, book, league, statistic, row, previous_odds=None):
+    """Build a change record; "line" is the raw line text and part of the key"""
+    odds, american = parse_odds(row.get("odds"))
+    return {
+        "ts": ts,
+        "change": change,
+        "book": book,
+        "league": league,
+        "game": row.get("game"),
+        "player": row.get("player"),
+        "team": row.get("team"),
+        "statistic": statistic,
+        "line": row.get("value"),
+        "value": parse_number(row.get("value")),
+        "odds": odds,
+        "odds_american": american,
+        "previous_odds": previous_odds,
+    }
+
+
+class SnapshotStore:
+    def __init__(self, path):
+        """
+        Open the store, replaying its log into memory
+
+        Args:
+            path (str): NDJSON change log; created on first append
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._offset = 0
+        # (book, league, statistic) -> {(game, player, line): latest add/change record}
+        self._slices = {}
+        with self._lock:
+            self._catch_up()
+
+    def _catch_up(self):
+        """Replay records appended since the last read, by this or another process"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in iter(f.readline, b""):
+                if not line.endswith(b"\n"):
+                    break  # Partially written by another process; read it next time
+                self._offset += len(line)
+                if line.strip():
+                    self._replay(json.loads(line))
+
+    def _replay(self, record):
+        # Records logged before sportsbooks were tracked belong to the default book
+        book = record.get("book") or DEFAULT_SPORTSBOOK
+        lines = self._slices.setdefault((book, record["league"], record["statistic"]), {})
+        key = (record["game"], record["player"], record["line"])
+        if record["change"] == "remove":
+            lines.pop(key, None)
+        else:
+            lines[key] = record
+
+    def snapshot(self, league, statistic, book=DEFAULT_SPORTSBOOK):
+        """Return the last known records of a slice keyed by (game, player, line)"""
+        with self._lock:
+            self._catch_up()
+            return dict(self._slices.get((book, league, statistic), {}))
+
+    def apply(self, league, statistic, rows, complete=True, book=DEFAULT_SPORTSBOOK):
+        """
+        Diff a slice's freshly scraped rows against the snapshot and record the changes
+
+        Args:
+            league (str): League the rows belong to
+            statistic (str): Statistic the rows belong to
+            rows (list): Raw scraped rows
+            complete (bool): Whether rows are the whole slice; lines missing
+                from a complete slice are recorded as removed
+            book (str): Sportsbook the rows were scraped from
+
+        Returns:
+            list: The add/change/remove records appended to the store
+        """
+        ts = time.time()
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self._catch_up()
+                previous = self._slices.get((book, league, statistic), {})
+                changes = []
+                seen = set()
+                for row in rows:
+                    record = _record(ts, "add", book, league, statistic, row)
+                    key = (record["game"], record["player"], record["line"])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    old = previous.get(key)
+                    if old is None:
+                        changes.append(record)
+                    elif (old["odds"], old["odds_american"]) != (record["odds"], record["odds_american"]):
+                        record["change"] = "change"
+                        record["previous_odds"] = old["odds"]
+                        changes.append(record)
+
+                if complete:
+                    for key, old in previous.items():
+                        if key not in seen:
+                            changes.append(dict(old, ts=ts, change="remove", book=book, previous_odds=old["odds"],
+                                                odds=None, odds_american=None))
+
+                if changes:
+                    f.write("".join(json.dumps(change) + "\n" for change in changes))
+                    f.flush()
+                    self._offset = f.tell()
+                    for change in changes:
+                        self._replay(change)
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return changes
@@ -0,0 +1,572 @@
+"""
+Distributed scraping: a coordinator hands (book, league, statistic) tasks to nodes
+
+The coordinator splits each job into one task per sportsbook, league and
+statistic.
+Nodes, typically on other machines, connect over TCP and pull tasks as they
+have free browsers, run SportsScraper.process_league and stream each game's
+rows back. Messages are newline-delimited JSON objects with a "type":
+
+    node -> coordinator: hello, request, rows, done, failed, heartbeat
+    coordinator -> node: welcome, task, wait, cancel, shutdown
+
+Every attempt holds a lease that heartbeats and rows renew. An attempt that
+fails, loses its node or lets its lease expire is retried, preferably on
+another node, up to TASK_MAX_ATTEMPTS times. When there is nothing queued,
+an idle node steals work by starting a duplicate attempt of a task that has
+run for longer than TASK_SPECULATE_AFTER; the first attempt to finish wins
+and the others are cancelled. Rows are buffered per attempt and only the
+winning attempt's rows reach the output file, so retries never duplicate
+rows.
+"""
+import os
+import json
+import time
+import socket
+import tempfile
+import threading
+import socketserver
+import collections
+import concurrent.futures
+
+from scraper.config import (
+    COORDINATOR_HOST,
+    DEFAULT_SPORTSBOOK,
+    COORDINATOR_PORT,
+    NODE_BROWSERS,
+    NODE_CONNECT_TIMEOUT,
+    NODE_HEARTBEAT_INTERVAL,
+    NODE_IDLE_WAIT,
+    TASK_LEASE_TIMEOUT,
+    TASK_MAX_ATTEMPTS,
+    TASK_SPECULATE_AFTER,
+)
+from scraper.sportsbooks import book_units, get_sportsbooks
+from scraper.writers import FORMAT_EXTENSIONS, create_writer, output_filename
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+class Connection:
+    """One end of a newline-delimited JSON stream; send() may be called from any thread"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.rfile = sock.makefile("r", encoding="utf-8")
+        self.wfile = sock.makefile("w", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        """Send a message, returning False if the connection is gone"""
+        try:
+            with self._lock:
+                self.wfile.write(json.dumps(message) + "\n")
+                self.wfile.flush()
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def __iter__(self):
+        """Yield received messages until the connection closes"""
+        try:
+            for line in self.rfile:
+                if line.strip():
+                    yield json.loads(line)
+        except (OSError, ValueError):
+            return
+
+    def close(self):
+        for closeable in (self.rfile, self.wfile, self.sock):
+            try:
+                closeable.close()
+            except OSError:
+                pass
+
+
+class Attempt:
+    def __init__(self, number, node, lease_timeout, speculative=False):
+        self.number = number
+        self.node = node
+        self.speculative = speculative
+        self.started = time.monotonic()
+        self.deadline = self.started + lease_timeout
+        self.rows = []  # (game_title, rows) received so far, written only if this attempt wins
+
+
+class Task:
+    def __init__(self, task_id, job, league, statistic, book=DEFAULT_SPORTSBOOK):
+        self.id = task_id
+        self.job = job
+        self.league = league
+        self.statistic = statistic
+        self.book = book
+        self.status = PENDING
+        self.attempts = {}  # Attempt number -> Attempt, for attempts still running
+        self.attempt_count = 0
+        self.failures = 0
+        self.failed_nodes = set()
+        self.errors = []
+
+    @property
+    def label(self):
+        return f"{self.league} {self.statistic} ({self.book})"
+
+
+class Job:
+    def __init__(self, job_id, output_file, writer, tasks):
+        self.id = job_id
+        self.output_file = output_file
+        self.writer = writer
+        self.tasks = tasks
+        self.rows = 0
+        self.done = threading.Event()
+
+    def finished(self):
+        return all(task.status in (DONE, FAILED) for task in self.tasks)
+
+
+class Coordinator:
+    def __init__(self, host=COORDINATOR_HOST, port=COORDINATOR_PORT, output_dir=None, output_format="csv",
+                 lease_timeout=TASK_LEASE_TIMEOUT, max_attempts=TASK_MAX_ATTEMPTS,
+                 speculate_after=TASK_SPECULATE_AFTER, odds_store=None):
+        """
+        Args:
+            host, port: Address to listen on for nodes (port 0 picks a free port)
+            output_dir (str): Directory for job output files
+            output_format (str): Output format of job files (see scraper.writers)
+            lease_timeout (float): Seconds without news from an attempt before it is reassigned
+            max_attempts (int): Failed or expired attempts before a task is given up
+            speculate_after (float): Seconds a task runs before idle nodes may duplicate it
+            odds_store (OddsStore): Store the job files' rows are also inserted into
+        """
+        self.output_dir = output_dir or os.getcwd()
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.output_format = output_format
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.speculate_after = speculate_after
+        self.odds_store = odds_store
+
+        self.jobs = {}
+        self.tasks = {}
+        self._queue = collections.deque()  # Pending task IDs, in order
+        self._nodes = {}  # Node name -> Connection
+        self._node_stats = {}
+        self._lock = threading.Lock()
+        self._shutdown_nodes = False
+        self._stopping = threading.Event()
+        self._ids = 0
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator._serve_node(Connection(self.request))
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler, bind_and_activate=False)
+        self._server.daemon_threads = True
+        self._server.allow_reuse_address = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self.address = self._server.server_address
+
+    def start(self):
+        """Accept nodes and watch leases in background threads"""
+        threading.Thread(target=self._server.serve_forever, name="coordinator", daemon=True).start()
+        threading.Thread(target=self._watch_leases, name="coordinator-leases", daemon=True).start()
+        print(f"Coordinator listening on {self.address[0]}:{self.address[1]}")
+        return self
+
+    def stop(self, shutdown_nodes=True):
+        """Stop accepting work; connected nodes are told to exit if shutdown_nodes"""
+        with self._lock:
+            self._shutdown_nodes = shutdown_nodes
+            nodes = list(self._nodes.values())
+        if shutdown_nodes:
+            for connection in nodes:
+                connection.send({"type": "shutdown"})
+        self._stopping.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def submit(self, leagues, statistics, output_file=None, books=None):
+        """
+        Split a job into (book, league, statistic) tasks and queue them
+
+        Args:
+            leagues (list): Leagues to scrape
+            statistics (list): Statistics to scrape in every league
+            output_file (str): Job output file, named after the job if omitted
+            books (list): Sportsbooks to scrape, defaults to DEFAULT_SPORTSBOOK
+
+        Returns:
+            Job: Call job.done.wait() to block until every task is done or given up
+        """
+        leagues = list(leagues)
+        statistics = [statistics] if isinstance(statistics, str) else list(statistics)
+        books = get_sportsbooks(books)
+        if output_file is None:
+            name = f"{'_'.join(leagues)}_{'_'.join(statistics)}"
+            if books != [DEFAULT_SPORTSBOOK]:
+                name = f"{'_'.join(books)}_{name}"
+            output_file = output_filename(self.output_dir, name, self.output_format)
+        writer = create_writer(output_file, self.output_format, store=self.odds_store)
+
+        with self._lock:
+            self._ids += 1
+            job = Job(self._ids, output_file, writer, [])
+            for book, league in book_units(books, leagues):
+                for statistic in statistics:
+                    self._ids += 1
+                    task = Task(self._ids, job, league, statistic, book)
+                    job.tasks.append(task)
+                    self.tasks[task.id] = task
+                    self._queue.append(task.id)
+            self.jobs[job.id] = job
+        print(f"Job {job.id}: {len(job.tasks)} tasks, output file {output_file}")
+        return job
+
+    def _serve_node(self, connection):
+        node = None
+        try:
+            for message in connection:
+                kind = message.get("type")
+                if kind == "hello":
+                    node = self._register(message.get("node"), connection)
+                    connection.send({"type": "welcome", "node": node})
+                elif node is None:
+                    connection.send({"type": "shutdown", "error": "Expected hello"})
+                    return
+                elif kind == "request":
+                    connection.send(self._assign(node))
+                elif kind == "rows":
+                    self._on_rows(node, message)
+                elif kind == "heartbeat":
+                    self._on_heartbeat(node, message)
+                elif kind == "done":
+                    self._on_done(node, message)
+                elif kind == "failed":
+                    self._on_failed(node, message.get("task"), message.get("attempt"), message.get("error"))
+        finally:
+            if node:
+                self._unregister(node, connection)
+            connection.close()
+
+    def _register(self, name, connection):
+        with self._lock:
+            base = name or "node"
+            name, suffix = base, 1
+            while name in self._nodes:
+                suffix += 1
+                name = f"{base}-{suffix}"
+            self._nodes[name] = connection
+            self._node_stats.setdefault(name, {"tasks": 0, "rows": 0, "failed": 0})
+        print(f"Node {name} connected")
+        return name
+
+    def _unregister(self, node, connection):
+        with self._lock:
+            if self._nodes.get(node) is connection:
+                del self._nodes[node]
+            lost = [(task, number) for task in self.tasks.values()
+                    for number, attempt in task.attempts.items() if attempt.node == node]
+        print(f"Node {node} disconnected")
+        for task, number in lost:
+            self._on_failed(node, task.id, number, f"Node {node} disconnected")
+
+    def _assign(self, node):
+        """Pick the next task for a node: queued work first, then a straggler to duplicate"""
+        with self._lock:
+            if self._shutdown_nodes:
+                return {"type": "shutdown"}
+
+            # Tasks that failed on this node go to other nodes; it only retries one
+            # once every connected node has failed it
+            task = next((self.tasks[task_id] for task_id in self._queue
+                         if node not in self.tasks[task_id].failed_nodes), None)
+            if task is None:
+                task = next((self.tasks[task_id] for task_id in self._queue
+                             if self.tasks[task_id].failed_nodes >= set(self._nodes)), None)
+            speculative = False
+            if task is not None:
+                self._queue.remove(task.id)
+            else:
+                task = self._straggler(node)
+                speculative = task is not None
+            if task is None:
+                return {"type": "wait", "seconds": NODE_IDLE_WAIT}
+
+            task.status = RUNNING
+            task.attempt_count += 1
+            attempt = Attempt(task.attempt_count, node, self.lease_timeout, speculative)
+            task.attempts[attempt.number] = attempt
+            self._node_stats[node]["tasks"] += 1
+
+        label = "speculative attempt" if speculative else "attempt"
+        print(f"Task {task.id} ({task.label}) {label} {attempt.number} -> {node}")
+        return {"type": "task", "task": task.id, "attempt": attempt.number,
+                "book": task.book, "league": task.league, "statistic": task.statistic}
+
+    def _straggler(self, node):
+        """Running task worth duplicating on node (caller holds the lock)"""
+        now = time.monotonic()
+        candidates = [
+            task for task in self.tasks.values()
+            if task.status == RUNNING and len(task.attempts) == 1 and node not in task.failed_nodes
+            and all(attempt.node != node and now - attempt.started >= self.speculate_after
+                    for attempt in task.attempts.values())
+        ]
+        return min(candidates, key=lambda task: min(a.started for a in task.attempts.values()), default=None)
+
+    def _attempt(self, node, task_id, number):
+        """Return the task and its live attempt from node (caller holds the lock)"""
+        task = self.tasks.get(task_id)
+        attempt = task.attempts.get(number) if task else None
+        if attempt is None or attempt.node != node:
+            return task, None
+        return task, attempt
+
+    def _on_rows(self, node, message):
+        with self._lock:
+            task, attempt = self._attempt(node, message.get("task"), message.get("attempt"))
+            if attempt:
+                attempt.rows.append((message.get("game"), message.get("rows") or []))
+                attempt.deadline = time.monotonic() + self.lease_timeout
+
+    def _on_heartbeat(self, node, message):
+        with self._lock:
+            for task_id, number in message.get("attempts", []):
+                task, attempt = self._attempt(node, task_id, number)
+                if attempt:
+                    attempt.deadline = time.monotonic() + self.lease_timeout
+
+    def _on_done(self, node, message):
+        cancels = []
+        with self._lock:
+            task, attempt = self._attempt(node, message.get("task"), message.get("attempt"))
+            if attempt is None or task.status == DONE:
+                return  # Lost the race to another attempt, or was already written off
+            del task.attempts[attempt.number]
+            task.status = DONE
+            job = task.job
+            for game_title, rows in attempt.rows:
+                job.writer.write(rows)
+                job.rows += len(rows)
+            job.writer.complete_slice(task.league, task.statistic, task.book)
+            self._node_stats[node]["rows"] += sum(len(rows) for _, rows in attempt.rows)
+            cancels = [(other.node, task.id, number) for number, other in task.attempts.items()]
+            task.attempts.clear()
+            finished = job.finished()
+        print(f"Task {task.id} ({task.label}) done by {node}: "
+              f"{sum(len(rows) for _, rows in attempt.rows)} rows")
+        self._cancel(cancels)
+        if finished:
+            self._finish(job)
+
+    def _on_failed(self, node, task_id, number, error):
+        with self._lock:
+            task, attempt = self._attempt(node, task_id, number)
+            if attempt is None:
+                return
+            del task.attempts[attempt.number]
+            self._node_stats[node]["failed"] += 1
+            task.errors.append(f"{node}: {error}")
+            task.failed_nodes.add(node)
+            # Only count the failure once no other attempt of the task is still going
+            retry = task.status == RUNNING and not task.attempts
+            if retry:
+                task.failures += 1
+                if task.failures >= self.max_attempts:
+                    task.status = FAILED
+                else:
+                    task.status = PENDING
+                    self._queue.append(task.id)
+            finished = task.status == FAILED and task.job.finished()
+        print(f"Task {task.id} ({task.label}) attempt {number} on {node} failed: {error}")
+        if retry and task.status == FAILED:
+            print(f"Task {task.id} given up after {task.failures} failed attempts")
+        if finished:
+            self._finish(task.job)
+
+    def _cancel(self, attempts):
+        with self._lock:
+            connections = [(self._nodes.get(node), task_id, number) for node, task_id, number in attempts]
+        for connection, task_id, number in connections:
+            if connection:
+                connection.send({"type": "cancel", "task": task_id, "attempt": number})
+
+    def _watch_leases(self):
+        """Reassign attempts whose lease expired"""
+        while not self._stopping.wait(1.0):
+            now = time.monotonic()
+            with self._lock:
+                expired = [(attempt.node, task.id, number) for task in self.tasks.values()
+                           for number, attempt in task.attempts.items() if attempt.deadline < now]
+            if expired:
+                self._cancel(expired)
+            for node, task_id, number in expired:
+                self._on_failed(node, task_id, number, "Lease expired")
+
+    def _finish(self, job):
+        job.writer.close()
+        failed = [task for task in job.tasks if task.status == FAILED]
+        print(f"Job {job.id} finished: {job.rows} rows, {len(job.tasks) - len(failed)}/{len(job.tasks)} tasks"
+              + (f", failed: {', '.join(task.label for task in failed)}" if failed else ""))
+        job.done.set()
+
+    def stats(self):
+        """Return task counts per job and work done per node"""
+        with self._lock:
+            return {
+                "nodes": {name: dict(stats, connected=name in self._nodes)
+                          for name, stats in self._node_stats.items()},
+                "jobs": {
+                    job.id: {
+                        "output_file": job.output_file,
+                        "rows": job.rows,
+                        "tasks": collections.Counter(task.status for task in job.tasks),
+                        "attempts": sum(task.attempt_count for task in job.tasks),
+                    }
+                    for job in self.jobs.values()
+                },
+            }
+
+
+class ScrapeNode:
+    def __init__(self, scraper, host=COORDINATOR_HOST, port=COORDINATOR_PORT, name=None,
+                 browsers=NODE_BROWSERS):
+        """
+        Args:
+            scraper (SportsScraper): Scraper whose pool should hold `browsers` drivers
+            host, port: Coordinator address
+            name (str): Node name shown by the coordinator, defaults to host name and PID
+            browsers (int): Tasks run at the same time
+        """
+        self.scraper = scraper
+        self.address = (host, port)
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.browsers = browsers
+        self.work_dir = tempfile.mkdtemp(prefix="scrape-node-")
+
+        self._connection = None
+        self._running = {}  # (task, attempt) -> Future
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._requested = threading.Event()  # A request is waiting for its reply
+        self._idle_until = 0.0
+
+    def stop(self):
+        self._stopping.set()
+
+    def connect(self):
+        """Connect to the coordinator, retrying for NODE_CONNECT_TIMEOUT seconds"""
+        deadline = time.monotonic() + NODE_CONNECT_TIMEOUT
+        while not self._stopping.is_set():
+            try:
+                sock = socket.create_connection(self.address, timeout=10)
+                sock.settimeout(None)
+                connection = Connection(sock)
+                connection.send({"type": "hello", "node": self.name, "browsers": self.browsers})
+                return connection
+            except OSError as e:
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(f"Could not reach coordinator at {self.address[0]}:{self.address[1]}: {e}")
+                time.sleep(1)
+        return None
+
+    def run(self):
+        """Pull and run tasks until the coordinator says to shut down or stop() is called"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.browsers) as executor:
+            while not self._stopping.is_set():
+                self._connection = self.connect()
+                if self._connection is None:
+                    break
+                reader = threading.Thread(target=self._read, args=(self._connection, executor),
+                                          name="node-reader", daemon=True)
+                reader.start()
+                self._pull(reader)
+                self._connection.close()
+                # Results of unfinished attempts can't be delivered any more
+                with self._lock:
+                    self._cancelled.update(self._running)
+                if not self._stopping.is_set():
+                    print("Lost connection to coordinator, reconnecting...")
+        print(f"Node {self.name} stopped")
+
+    def _pull(self, reader):
+        """Ask for work while browsers are free and send heartbeats, until disconnected"""
+        heartbeat_at = time.monotonic()
+        while reader.is_alive() and not self._stopping.is_set():
+            now = time.monotonic()
+            with self._lock:
+                busy = len(self._running)
+                attempts = [list(key) for key in self._running]
+            if busy < self.browsers and not self._requested.is_set() and now >= self._idle_until:
+                self._requested.set()
+                self._connection.send({"type": "request"})
+            if now >= heartbeat_at:
+                self._connection.send({"type": "heartbeat", "attempts": attempts})
+                heartbeat_at = now + NODE_HEARTBEAT_INTERVAL
+            self._stopping.wait(0.1)
+
+    def _read(self, connection, executor):
+        for message in connection:
+            kind = message.get("type")
+            if kind == "welcome":
+                self.name = message.get("node", self.name)
+                print(f"Connected to coordinator as {self.name}")
+            elif kind == "task":
+                key = (message["task"], message["attempt"])
+                with self._lock:
+                    self._running[key] = executor.submit(self._run_task, connection, message)
+                self._requested.clear()
+            elif kind == "wait":
+                self._idle_until = time.monotonic() + message.get("seconds", NODE_IDLE_WAIT)
+                self._requested.clear()
+            elif kind == "cancel":
+                with self._lock:
+                    self._cancelled.add((message["task"], message["attempt"]))
+            elif kind == "shutdown":
+                print("Coordinator asked this node to shut down")
+                self._stopping.set()
+                return
+
+    def _run_task(self, connection, task):
+        key = (task["task"], task["attempt"])
+        league, statistic = task["league"], task["statistic"]
+        book = task.get("book", DEFAULT_SPORTSBOOK)
+        output_file = os.path.join(
+            self.work_dir, f"task-{key[0]}-{key[1]}.{FORMAT_EXTENSIONS[self.scraper.output_format]}")
+        completed = []
+        error = None
+
+        def should_cancel():
+            return self._stopping.is_set() or key in self._cancelled
+
+        def on_game(league_name, game_title, rows):
+            connection.send({"type": "rows", "task": key[0], "attempt": key[1], "game": game_title, "rows": rows})
+
+        print(f"Running task {key[0]} attempt {key[1]}: {league} {statistic} ({book})")
+        self.scraper.open_output(output_file, on_slice=lambda league_name, stat: completed.append(stat))
+        try:
+            self.scraper.process_league(league, [statistic], output_file, should_cancel, on_game, book)
+        except Exception as e:
+            error = str(e)
+        finally:
+            # Rows already went to the coordinator; the local copy isn't needed
+            self.scraper.close_output(output_file)
+            if os.path.exists(output_file):
+                os.remove(output_file)
+            with self._lock:
+                self._running.pop(key, None)
+                cancelled = key in self._cancelled
+                self._cancelled.discard(key)
+
+        if cancelled:
+            return
+        if completed:
+            connection.send({"type": "done", "task": key[0], "attempt": key[1]})
+        else:
+            connection.send({"type": "failed", "task": key[0], "attempt": key[1],
+                             "error": error or f"{statistic} for {league} ({book}) was not completed"})
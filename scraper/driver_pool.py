@@ -0,0 +1,226 @@
+"""
+Bounded, thread-safe pool of warm Chrome WebDriver instances
+"""
+import time
+import threading
+from collections import deque
+
+from selenium.common.exceptions import WebDriverException
+
+from scraper.config import DEFAULT_POOL_SIZE, DRIVER_MAX_USES, POOL_CHECKOUT_TIMEOUT
+
+
+class DriverPoolTimeout(Exception):
+    """Raised when no driver becomes available within the checkout timeout"""
+
+
+class DriverPool:
+    def __init__(self, driver_factory, max_size=DEFAULT_POOL_SIZE,
+                 max_uses=DRIVER_MAX_USES, checkout_timeout=POOL_CHECKOUT_TIMEOUT):
+        """
+        Initialize the pool
+
+        Args:
+            driver_factory (callable): Creates a fully configured driver
+            max_size (int): Maximum number of live drivers (idle + checked out)
+            max_uses (int): Number of checkouts after which a driver is recycled
+            checkout_timeout (float): Seconds to wait for a free driver
+        """
+        self.driver_factory = driver_factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = deque()
+        self._uses = {}
+        self._live = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._recycled = 0
+        self._crashed = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+
+    def acquire(self, timeout=None):
+        """
+        Check out a driver, reusing a warm one when available
+
+        Args:
+            timeout (float): Seconds to wait for a free driver, defaults to checkout_timeout
+        """
+        start = time.monotonic()
+        deadline = start + (self.checkout_timeout if timeout is None else timeout)
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+
+                if self._idle:
+                    driver = self._idle.popleft()
+                    self._hits += 1
+                    self._record_wait(start, waited)
+                    break
+
+                if self._live < self.max_size:
+                    # Reserve the slot before releasing the lock to create the driver
+                    self._live += 1
+                    self._misses += 1
+                    self._record_wait(start, waited)
+                    driver = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DriverPoolTimeout(
+                        f"No driver available after {time.monotonic() - start:.0f} seconds")
+                waited = True
+                self._cond.wait(remaining)
+
+        if driver is None:
+            try:
+                driver = self.driver_factory()
+            except Exception:
+                with self._cond:
+                    self._live -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._uses[id(driver)] = 0
+
+        with self._cond:
+            self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+        return driver
+
+    def try_acquire(self):
+        """Check out a driver only if one is idle or can be created without waiting, else return None"""
+        try:
+            return self.acquire(timeout=0)
+        except DriverPoolTimeout:
+            return None
+
+    def release(self, driver, healthy=True):
+        """
+        Return a driver to the pool
+
+        Args:
+            driver: Driver previously returned by acquire()
+            healthy (bool): False if the driver crashed or is in an unknown state
+        """
+        with self._cond:
+            uses = self._uses.get(id(driver), 0)
+            expired = uses >= self.max_uses
+
+        if healthy and not expired and not self._closed:
+            healthy = self._reset(driver)
+
+        if healthy and not expired and not self._closed:
+            with self._cond:
+                self._idle.append(driver)
+                self._cond.notify()
+            return
+
+        with self._cond:
+            if expired:
+                self._recycled += 1
+            elif not healthy:
+                self._crashed += 1
+        self._discard(driver)
+
+    def _reset(self, driver):
+        """Clear per-job state so the next checkout starts from a clean page"""
+        try:
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            if len(driver.window_handles) > 1:
+                main_handle = driver.window_handles[0]
+                for handle in driver.window_handles[1:]:
+                    driver.switch_to.window(handle)
+                    driver.close()
+                driver.switch_to.window(main_handle)
+            network_log = getattr(driver, "network_log", None)
+            if network_log:
+                network_log.reset()
+            return True
+        except WebDriverException as e:
+            print(f"Driver reset failed, recycling: {e}")
+            return False
+
+    def _discard(self, driver):
+        """Quit a driver and free its slot"""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._cond:
+            self._uses.pop(id(driver), None)
+            self._live -= 1
+            self._cond.notify()
+
+    def _record_wait(self, start, waited):
+        """Update checkout-wait metrics (caller holds the lock)"""
+        elapsed = time.monotonic() - start
+        if waited:
+            self._waits += 1
+        self._wait_time += elapsed
+        self._max_wait = max(self._max_wait, elapsed)
+
+    def warm_up(self, count=None):
+        """Pre-create idle drivers so the first checkouts are hits"""
+        count = min(count or self.max_size, self.max_size)
+        drivers = []
+        try:
+            for _ in range(count):
+                with self._cond:
+                    if self._live >= self.max_size:
+                        break
+                    self._live += 1
+                try:
+                    driver = self.driver_factory()
+                except Exception:
+                    with self._cond:
+                        self._live -= 1
+                    raise
+                with self._cond:
+                    self._uses[id(driver)] = 0
+                drivers.append(driver)
+        finally:
+            with self._cond:
+                self._idle.extend(drivers)
+                self._cond.notify_all()
+
+    def close(self):
+        """Quit all idle drivers; checked-out drivers are quit on release"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for driver in idle:
+            self._discard(driver)
+
+    def stats(self):
+        """Return pool metrics as a dictionary"""
+        with self._cond:
+            checkouts = self._hits + self._misses
+            return {
+                "max_size": self.max_size,
+                "live": self._live,
+                "idle": len(self._idle),
+                "in_use": self._live - len(self._idle),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / checkouts) if checkouts else 0.0,
+                "recycled": self._recycled,
+                "crashed": self._crashed,
+                "checkout_waits": self._waits,
+                "total_wait_seconds": round(self._wait_time, 3),
+                "avg_wait_seconds": round(self._wait_time / checkouts, 3) if checkouts else 0.0,
+                "max_wait_seconds": round(self._max_wait, 3),
+            }
@@ -0,0 +1,286 @@
+"""
+Game extraction strategies for an opened league/statistic page
+
+Each extractor yields (game_title, rows) per game, where rows are dicts with
+the game, player, team, statistic, value and odds keys passed to
+SportsScraper.write_rows. Page elements are found with a compiled selector
+set (scraper/page_selectors.py); the scripts below take its selectors as
+%(name)s placeholders.
+"""
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+
+from scraper.network_capture import decode_body, parse_payload, should_capture
+from scraper.page_selectors import get_selectors
+
+# Collects every game/player/team/value/odds tuple for the given game headers
+# in a single round trip
+EXTRACT_GAMES_SCRIPT = """
+    const containers = arguments[0].map(header => header.parentElement);
+    const statistic = arguments[1];
+    const text = el => (el ? (el.innerText || el.textContent || '').trim() : '');
+    const games = [];
+    for (const container of containers) {
+        const teams = container.querySelectorAll(%(game_teams)s);
+        if (teams.length < 2) {
+            continue;
+        }
+        const game = `${text(teams[0])} vs ${text(teams[1])}`;
+        const rows = [];
+        for (const playerEl of container.querySelectorAll(%(player)s)) {
+            const nameEl = playerEl.querySelector(%(player_name)s);
+            const teamEl = playerEl.querySelector(%(player_team)s);
+            if (!nameEl || !teamEl) {
+                continue;
+            }
+            const player = text(nameEl);
+            const team = text(teamEl);
+            for (const item of playerEl.querySelectorAll(%(market_item)s)) {
+                const amountEl = item.querySelector(%(market_amount)s);
+                const oddsEl = item.querySelector(%(market_odds)s);
+                if (!amountEl || !oddsEl) {
+                    continue;
+                }
+                rows.push({
+                    game: game,
+                    player: player,
+                    team: team,
+                    statistic: statistic,
+                    value: text(amountEl),
+                    odds: text(oddsEl)
+                });
+            }
+        }
+        games.push({game: game, rows: rows});
+    }
+    return games;
+"""
+
+# Games stay expanded when switching statistics on the same page, so only
+# collapsed headers are clicked. Both return true if anything was clicked.
+EXPAND_SCRIPT = """
+    const header = arguments[0];
+    if (header.parentElement.querySelector(%(player)s)) {
+        return false;
+    }
+    header.click();
+    return true;
+"""
+
+EXPAND_ALL_SCRIPT = """
+    let clicked = false;
+    for (const header of arguments[0]) {
+        if (!header.parentElement.querySelector(%(player)s)) {
+            header.click();
+            clicked = true;
+        }
+    }
+    return clicked;
+"""
+
+
+class GameExtractor:
+    """Base class for extraction strategies"""
+
+    name = None
+    # Whether games can be split across several browsers (see SportsScraper.scrape_league)
+    per_game = True
+
+    def __init__(self, selectors=None):
+        """
+        Args:
+            selectors (PageSelectors): Compiled selector set, defaults to SELECTOR_VERSION's
+        """
+        self.selectors = selectors or get_selectors()
+        self.expand_script = self.selectors.script(EXPAND_SCRIPT)
+        self.expand_all_script = self.selectors.script(EXPAND_ALL_SCRIPT)
+        self.extract_games_script = self.selectors.script(EXTRACT_GAMES_SCRIPT)
+
+    def prepare(self, driver):
+        """Called on the open league page just before a statistic button is clicked"""
+
+    def extract_games(self, driver, ready, game_headers, statistic):
+        raise NotImplementedError
+
+
+# The per-element lookups of the original scraper, which the xpath mode keeps
+# as a fixed baseline for comparing extraction modes
+XPATH_LOCATORS = {
+    "game_teams": (By.XPATH, ".//p[contains(@class, 'tiered-block__player-team')]//span"),
+    "player": (By.CSS_SELECTOR, "div.shots-block__player"),
+    "player_name": (By.XPATH, ".//p[contains(@class, 'shots-block') and contains(@class, 'player-name')]"),
+    "player_team": (By.XPATH, ".//p[contains(@class, 'shots-block') and contains(@class, 'player-team')]"),
+    "market_item": (By.XPATH, ".//div[contains(@class, 'markets-slider') and contains(@class, 'item')]"),
+    "market_amount": (By.XPATH, ".//p[contains(@class, 'markets-slider') and contains(@class, 'amount')]"),
+    "market_odds": (By.XPATH, ".//p[contains(@class, 'markets-slider') and contains(@class, 'stat')]"),
+}
+
+
+class ElementExtractor(GameExtractor):
+    """One WebDriver call per element, using the selector set's CSS locators"""
+
+    name = "css"
+
+    def __init__(self, selectors=None):
+        super().__init__(selectors)
+        self.locators = {name: getattr(self.selectors, name) for name in XPATH_LOCATORS}
+
+    def extract_games(self, driver, ready, game_headers, statistic):
+        locators = self.locators
+        for header in game_headers:
+            game_data = []  # Store data for current game
+            game_title = None
+            try:
+                # Click to expand the game
+                if driver.execute_script(self.expand_script, header):
+                    ready.settle("game_expand")
+
+                # Find the associated container (parent element)
+                container = header.find_element(By.XPATH, "./..")
+
+                team_spans = container.find_elements(*locators["game_teams"])
+
+                if len(team_spans) < 2:
+                    continue
+
+                game_title = f"{team_spans[0].text} vs {team_spans[1].text}"
+                print(f"Processing game: {game_title}")
+
+                player_containers = container.find_elements(*locators["player"])
+
+                for player_container in player_containers:
+                    try:
+                        player_name = player_container.find_element(*locators["player_name"]).text.strip()
+
+                        team_name = player_container.find_element(*locators["player_team"]).text.strip()
+
+                        market_items = player_container.find_elements(*locators["market_item"])
+
+                        for item in market_items:
+                            value = item.find_element(*locators["market_amount"]).text.strip()
+
+                            odds = item.find_element(*locators["market_odds"]).text.strip()
+
+                            game_data.append({
+                                "game": game_title,
+                                "player": player_name,
+                                "team": team_name,
+                                "statistic": statistic,
+                                "value": value,
+                                "odds": odds
+                            })
+
+                    except Exception as e:
+                        print(f"Error processing player in {game_title}: {e}")
+                        continue
+
+            except Exception as e:
+                print(f"Error processing game {game_title or ''}: {e}")
+                continue
+
+            yield game_title, game_data
+
+
+class XPathExtractor(ElementExtractor):
+    """Original extraction path: one WebDriver call per element with the original XPath lookups"""
+
+    name = "xpath"
+
+    def __init__(self, selectors=None):
+        super().__init__(selectors)
+        self.locators = dict(XPATH_LOCATORS)
+
+
+class ScriptExtractor(GameExtractor):
+    """Single execute_script per game: expand, wait, then read everything as JSON"""
+
+    name = "js"
+
+    def extract_games(self, driver, ready, game_headers, statistic):
+        for header in game_headers:
+            try:
+                if driver.execute_script(self.expand_script, header):
+                    ready.settle("game_expand")
+
+                games = driver.execute_script(self.extract_games_script, [header], statistic)
+            except Exception as e:
+                print(f"Error processing game: {e}")
+                continue
+
+            for game in games:
+                print(f"Processing game: {game['game']}")
+                yield game["game"], game["rows"]
+
+
+class LeagueScriptExtractor(GameExtractor):
+    """Expand every game at once and read the whole league in one execute_script"""
+
+    name = "js_league"
+    per_game = False
+
+    def extract_games(self, driver, ready, game_headers, statistic):
+        if driver.execute_script(self.expand_all_script, game_headers):
+            ready.settle("game_expand")
+
+        for game in driver.execute_script(self.extract_games_script, game_headers, statistic):
+            print(f"Processing game: {game['game']}")
+            yield game["game"], game["rows"]
+
+
+class NetworkExtractor(GameExtractor):
+    """
+    Parse odds from the betbuilder API responses captured over CDP
+
+    Responses are read from the driver's NetworkLog, so games are not clicked
+    open one at a time. Falls back to single-pass DOM extraction when no
+    captured response yields any rows.
+    """
+
+    name = "network"
+    per_game = False
+
+    def prepare(self, driver):
+        # Drop responses from the previous page state so only the upcoming
+        # statistic's responses are parsed
+        network_log = getattr(driver, "network_log", None)
+        if network_log:
+            network_log.take_json_responses()
+
+    def extract_games(self, driver, ready, game_headers, statistic):
+        network_log = getattr(driver, "network_log", None)
+        games = {}
+        for request_id, url in (network_log.take_json_responses() if network_log else []):
+            if not should_capture(url):
+                continue
+            try:
+                payload = decode_body(driver.execute_cdp_cmd(
+                    "Network.getResponseBody", {"requestId": request_id}))
+            except WebDriverException as e:
+                print(f"Could not read captured response {url}: {e}")
+                continue
+            for game_title, rows in parse_payload(payload, statistic):
+                games.setdefault(game_title, []).extend(rows)
+
+        if not games:
+            print(f"No {statistic} odds found in captured responses, falling back to DOM extraction")
+            yield from LeagueScriptExtractor(self.selectors).extract_games(driver, ready, game_headers, statistic)
+            return
+
+        for game_title, rows in games.items():
+            print(f"Processing game: {game_title}")
+            yield game_title, rows
+
+
+EXTRACTORS = {
+    extractor.name: extractor
+    for extractor in (XPathExtractor, ElementExtractor, ScriptExtractor, LeagueScriptExtractor, NetworkExtractor)
+}
+
+
+def get_extractor(mode, selectors=None):
+    """Return an extractor instance for the given extraction mode"""
+    try:
+        return EXTRACTORS[mode](selectors)
+    except KeyError:
+        raise ValueError(
+            f"Unknown extraction mode: {mode} (available: {', '.join(EXTRACTORS)})")
@@ -0,0 +1,198 @@
+"""
+Per-step timings and per-league counters, with a structured JSON step log
+
+Every scraper owns a Metrics instance. Stages (driver creation, page load,
+CAPTCHA checks, league/statistic clicks, each game, each output write) are
+timed into histograms labelled by step and league, and rows, games, errors
+and CAPTCHA hits are counted per league. Each timed step and notable event
+is also appended to a JSON-lines log. Snapshots are plain dicts so job
+workers can report them to the web app, which renders them in the
+Prometheus text format at /metrics.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+from scraper.config import LOG_DIR, METRICS_BUCKETS, METRICS_LOG_FILENAME
+
+STEP_SECONDS = "scraper_step_seconds"
+
+HELP = {
+    STEP_SECONDS: "Time spent in each scraping step",
+    "scraper_rows_total": "Rows scraped",
+    "scraper_games_total": "Games scraped",
+    "scraper_errors_total": "Errors that stopped a league or statistic",
+    "scraper_captcha_total": "CAPTCHA challenges detected",
+}
+
+
+def default_log_path():
+    """Return the JSON step log in LOG_DIR, or None when logging is disabled"""
+    return os.path.join(LOG_DIR, METRICS_LOG_FILENAME) if METRICS_LOG_FILENAME else None
+
+
+def _key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+class Metrics:
+    """Thread-safe counters and step-timing histograms"""
+
+    def __init__(self, log_path=None, buckets=METRICS_BUCKETS):
+        """
+        Args:
+            log_path (str): JSON-lines file every timed step and event is
+                appended to; nothing is logged if omitted
+            buckets (tuple): Histogram bucket upper bounds in seconds
+        """
+        self.log_path = log_path
+        self.buckets = tuple(buckets)
+        self._counters = {}  # (name, labels) -> value
+        self._timings = {}  # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._lock = threading.Lock()
+        self._log_file = None
+        self._log_lock = threading.Lock()
+
+    def increment(self, name, amount=1, **labels):
+        """Add amount to a counter; labels with a None value are left out"""
+        key = (name, _key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, step, seconds, details=None, **labels):
+        """Record how long a step took and log it, along with details (which aren't labels)"""
+        key = _key(dict(labels, step=step))
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                timing = self._timings[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            timing[0][index] += 1
+            timing[1] += seconds
+            timing[2] += 1
+        self.log("step", step=step, seconds=round(seconds, 4), **dict(labels, **(details or {})))
+
+    @contextmanager
+    def timer(self, step, **labels):
+        """Time the enclosed block as a step, also when it raises"""
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.observe(step, time.monotonic() - start, {"error": type(e).__name__}, **labels)
+            raise
+        self.observe(step, time.monotonic() - start, **labels)
+
+    def log(self, event, **fields):
+        """Append a structured event to the JSON log"""
+        if not self.log_path:
+            return
+        record = {"ts": round(time.time(), 3), "pid": os.getpid(), "event": event}
+        record.update((name, value) for name, value in fields.items() if value is not None)
+        line = json.dumps(record, default=str) + "\n"
+        with self._log_lock:
+            try:
+                if self._log_file is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+                    self._log_file = open(self.log_path, "a", encoding="utf-8")
+                self._log_file.write(line)
+                self._log_file.flush()
+            except OSError as e:
+                print(f"Could not write to {self.log_path}: {e}")
+                self.log_path = None
+
+    def snapshot(self):
+        """Return every counter and histogram as JSON-serializable data"""
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "timings": [
+                    {"labels": dict(labels), "counts": list(counts), "sum": round(total, 6), "count": count}
+                    for labels, (counts, total, count) in sorted(self._timings.items())
+                ],
+            }
+
+    def summary(self):
+        """Return count, total and average seconds per step, over every league"""
+        steps = {}
+        for timing in self.snapshot()["timings"]:
+            step = steps.setdefault(timing["labels"]["step"], {"count": 0, "total_seconds": 0.0})
+            step["count"] += timing["count"]
+            step["total_seconds"] += timing["sum"]
+        for step in steps.values():
+            step["avg_seconds"] = round(step["total_seconds"] / step["count"], 4) if step["count"] else 0.0
+            step["total_seconds"] = round(step["total_seconds"], 3)
+        return steps
+
+    def close(self):
+        with self._log_lock:
+            if self._log_file:
+                self._log_file.close()
+                self._log_file = None
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in sorted(labels.items())) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshots, gauges=()):
+    """
+    Render metric snapshots in the Prometheus text exposition format
+
+    Args:
+        snapshots (list): (labels, Metrics.snapshot()) pairs; labels such as
+            the job worker's name are added to every series of that snapshot
+        gauges (list): (name, help, labels, value) tuples rendered as gauges
+
+    Returns:
+        str: The exposition text
+    """
+    series = {}  # metric name -> (type, [lines])
+    help_texts = dict(HELP)
+
+    def add(name, metric_type, line):
+        series.setdefault(name, (metric_type, []))[1].append(line)
+
+    for extra, snapshot in snapshots:
+        for counter in snapshot.get("counters", []):
+            labels = dict(counter["labels"], **extra)
+            add(counter["name"], "counter", f"{counter['name']}{_labels(labels)} {_number(counter['value'])}")
+
+        bounds = [_number(bound) for bound in snapshot.get("buckets", [])] + ["+Inf"]
+        for timing in snapshot.get("timings", []):
+            labels = dict(timing["labels"], **extra)
+            cumulative = 0
+            for bound, count in zip(bounds, timing["counts"]):
+                cumulative += count
+                add(STEP_SECONDS, "histogram",
+                    f"{STEP_SECONDS}_bucket{_labels(dict(labels, le=bound))} {cumulative}")
+            add(STEP_SECONDS, "histogram", f"{STEP_SECONDS}_sum{_labels(labels)} {_number(timing['sum'])}")
+            add(STEP_SECONDS, "histogram", f"{STEP_SECONDS}_count{_labels(labels)} {timing['count']}")
+
+    for name, help_text, labels, value in gauges:
+        help_texts.setdefault(name, help_text)
+        add(name, "gauge", f"{name}{_labels(labels)} {_number(value)}")
+
+    lines = []
+    for name, (metric_type, samples) in series.items():
+        if name in help_texts:
+            lines.append(f"# HELP {name} {help_texts[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
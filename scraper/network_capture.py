@@ -0,0 +1,115 @@
+"""
+Parse player odds out of captured betbuilder API (XHR/fetch) JSON responses
+
+The payload layout is matched by key name rather than by a fixed schema: the
+walker tracks the current game and player while descending the JSON tree and
+emits a row for every object carrying both a line value and odds. The key
+names it recognizes live in CAPTURE_KEYS in scraper/config.py.
+"""
+import json
+import base64
+
+from scraper.config import CAPTURE_KEYS, CAPTURE_URL_PATTERNS
+
+
+def should_capture(url):
+    """True if a response URL matches CAPTURE_URL_PATTERNS (all JSON responses when empty)"""
+    return not CAPTURE_URL_PATTERNS or any(pattern in url for pattern in CAPTURE_URL_PATTERNS)
+
+
+def decode_body(response):
+    """Decode a Network.getResponseBody result into parsed JSON, or None"""
+    body = response.get("body", "")
+    if response.get("base64Encoded"):
+        body = base64.b64decode(body).decode("utf-8", errors="replace")
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _lookup(node, field):
+    """Return the first value in node for any key configured for field"""
+    for key in CAPTURE_KEYS[field]:
+        if key in node and node[key] not in (None, ""):
+            return node[key]
+    return None
+
+
+def _as_text(value):
+    """Render a scalar, or a {"name": ...} object, as display text"""
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("shortName") or value.get("title")
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    return str(value).strip()
+
+
+def _game_title(node):
+    home = _as_text(_lookup(node, "home_team"))
+    away = _as_text(_lookup(node, "away_team"))
+    if home and away:
+        return f"{home} vs {away}"
+    return _as_text(_lookup(node, "game"))
+
+
+def _matches_statistic(market, statistic):
+    return market is None or statistic.lower() in market.lower()
+
+
+def parse_payload(payload, statistic):
+    """
+    Extract rows for a statistic from a captured JSON payload
+
+    Returns:
+        list: (game_title, rows) tuples in payload order, rows using the extractor row schema
+    """
+    games = {}
+
+    def walk(node, context):
+        if isinstance(node, list):
+            for item in node:
+                walk(item, context)
+            return
+        if not isinstance(node, dict):
+            return
+
+        context = dict(context)
+        game = _game_title(node)
+        if game:
+            context["game"] = game
+
+        player = _lookup(node, "player")
+        player_name = _as_text(player)
+        if player_name:
+            context["player"] = player_name
+            context["team"] = ""
+            team = _as_text(_lookup(player, "team")) if isinstance(player, dict) else None
+            team = _as_text(_lookup(node, "team")) or team
+            if team:
+                context["team"] = team
+
+        market = _as_text(_lookup(node, "statistic"))
+        if market:
+            context["statistic"] = market
+
+        value = _as_text(_lookup(node, "value"))
+        odds = _as_text(_lookup(node, "odds"))
+        if (value is not None and odds is not None
+                and context.get("game") and context.get("player")
+                and _matches_statistic(context.get("statistic"), statistic)):
+            games.setdefault(context["game"], []).append({
+                "game": context["game"],
+                "player": context["player"],
+                "team": context.get("team", ""),
+                "statistic": statistic,
+                "value": value,
+                "odds": odds,
+            })
+
+        for child in node.values():
+            if isinstance(child, (dict, list)):
+                walk(child, context)
+
+    walk(payload, {})
+    return list(games.items())
@@ -0,0 +1,277 @@
+"""
+Queryable store of every scraped row across runs
+
+Output writers insert each flushed batch here as well as into their file,
+tagged with the run (the output file's name) and the time it was written.
+Like the delta snapshots, a line is identified by its text ("Over 1.5"), so
+lines sharing a number stay apart; the parsed value is kept for filtering.
+Rows are indexed on player, team, statistic and scrape time, and on the
+(game, player, statistic, line, book) line key, which also serves lookups
+by game. Questions like "latest odds for a player across every run" or "this
+line at every sportsbook" are then one indexed query instead of reading
+every output file. Several processes may write at once (WAL), like the job
+queue and result cache next to it.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from scraper.config import ODDS_QUERY_MAX_ROWS, ODDS_STORE_FILENAME
+from scraper.writers import OUTPUT_COLUMNS, typed_row
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS odds (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    scraped_at REAL NOT NULL,
+    book TEXT COLLATE NOCASE,
+    league TEXT COLLATE NOCASE,
+    game TEXT COLLATE NOCASE,
+    player TEXT COLLATE NOCASE,
+    team TEXT COLLATE NOCASE,
+    statistic TEXT COLLATE NOCASE,
+    value REAL,
+    odds REAL,
+    odds_american REAL,
+    line TEXT COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS odds_player ON odds (player, scraped_at);
+CREATE INDEX IF NOT EXISTS odds_team ON odds (team, scraped_at);
+CREATE INDEX IF NOT EXISTS odds_statistic ON odds (statistic, scraped_at);
+CREATE INDEX IF NOT EXISTS odds_scraped_at ON odds (scraped_at);
+CREATE INDEX IF NOT EXISTS odds_line_text ON odds (game, player, statistic, line, book, scraped_at);
+CREATE INDEX IF NOT EXISTS odds_run ON odds (run_id);
+"""
+
+# Columns of each stored row: the output columns plus the line's raw text
+STORED_COLUMNS = OUTPUT_COLUMNS + ["line"]
+
+# Columns returned by queries: the run and scrape time, then every stored column
+COLUMNS = ["run", "scraped_at"] + STORED_COLUMNS
+
+# Exact-match filters, case-insensitive for text; "run" is an output file name
+FILTERS = ("run", "book", "league", "game", "player", "team", "statistic", "line", "value")
+
+# Columns aggregate() can group by; "day" is the UTC date of the scrape
+GROUPS = {
+    "run": "run",
+    "book": "book",
+    "league": "league",
+    "game": "game",
+    "player": "player",
+    "team": "team",
+    "statistic": "statistic",
+    "line": "line",
+    "value": "value",
+    "day": "date(scraped_at, 'unixepoch')",
+}
+
+# One line of one sportsbook; the latest row per key is its current price
+LINE_KEY = "game, player, statistic, line, book"
+
+
+def open_odds_store(output_dir):
+    """Return the store in output_dir, or None when ODDS_STORE_FILENAME is empty"""
+    return OddsStore(os.path.join(output_dir, ODDS_STORE_FILENAME)) if ODDS_STORE_FILENAME else None
+
+
+class OddsStore:
+    def __init__(self, path):
+        """
+        Open (and create if needed) the store database
+
+        Args:
+            path (str): SQLite database file
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._local = threading.local()
+        self._run_ids = {}
+        self._run_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Stores from before the line column: their lines are only known by number.
+        # Checked under the write lock, since other processes may open the store too.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(odds)")]
+            if columns and "line" not in columns:
+                conn.execute("ALTER TABLE odds ADD COLUMN line TEXT COLLATE NOCASE")
+                conn.execute("UPDATE odds SET line = value")
+                conn.execute("DROP INDEX IF EXISTS odds_line")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def run_id(self, name):
+        """Return the ID of a run, registering it on first use"""
+        with self._run_lock:
+            if name not in self._run_ids:
+                conn = self._connection()
+                conn.execute("INSERT OR IGNORE INTO runs (name, created_at) VALUES (?, ?)", (name, time.time()))
+                self._run_ids[name] = conn.execute("SELECT id FROM runs WHERE name = ?", (name,)).fetchone()[0]
+            return self._run_ids[name]
+
+    def insert(self, run, rows, scraped_at=None):
+        """
+        Add a batch of rows
+
+        Args:
+            run (str): Output file name the rows were written to
+            rows (list): Scraped rows as handed to the writer; typed here (see
+                scraper.writers.typed_row), keeping the value text as the line
+            scraped_at (float): Unix time of the scrape, defaults to now
+        """
+        if not rows:
+            return
+        run_id = self.run_id(run)
+        scraped_at = scraped_at or time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                f"INSERT INTO odds (run_id, scraped_at, {', '.join(STORED_COLUMNS)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in STORED_COLUMNS)})",
+                [(run_id, scraped_at, *typed_row(row).values(), row.get("value")) for row in rows])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _select(self, filters=None, since=None, until=None, latest=False):
+        """
+        Build the row query shared by every read
+
+        Returns:
+            tuple: (SQL selecting COLUMNS plus the insertion order as _row, parameters)
+        """
+        conditions, params = [], []
+        for name, value in (filters or {}).items():
+            if name not in FILTERS:
+                raise ValueError(f"Unknown filter: {name} (available: {', '.join(FILTERS)})")
+            conditions.append("runs.name = ?" if name == "run" else f"odds.{name} = ?")
+            params.append(value)
+        if since is not None:
+            conditions.append("odds.scraped_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("odds.scraped_at < ?")
+            params.append(until)
+
+        columns = ", ".join(f"odds.{column}" for column in COLUMNS[1:])
+        sql = (f"SELECT runs.name AS run, {columns}, odds.rowid AS _row "
+               f"FROM odds JOIN runs ON runs.id = odds.run_id")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if latest:
+            # Filters apply first, so this is the latest matching row of each line
+            sql = (f"SELECT * FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY {LINE_KEY} "
+                   f"ORDER BY scraped_at DESC, _row DESC) AS _rank FROM ({sql})) WHERE _rank = 1")
+        return sql, params
+
+    def iter_rows(self, filters=None, since=None, until=None, latest=False, newest_first=False,
+                  limit=None, offset=0):
+        """
+        Yield matching rows as dicts with COLUMNS
+
+        Args:
+            filters (dict): Filter name (see FILTERS) to wanted value
+            since, until (float): Unix time range of the scrape (until is exclusive)
+            latest (bool): Only the most recent row of each line
+            newest_first (bool): Order by scrape time descending instead of insertion order
+            limit, offset (int): Pagination over matching rows
+        """
+        sql, params = self._select(filters, since, until, latest)
+        sql += " ORDER BY scraped_at DESC, _row DESC" if newest_first else " ORDER BY _row"
+        sql += " LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        # Executed here, so bad filters raise before the caller starts iterating
+        return self._iter_cursor(self._connection().execute(sql, params))
+
+    def _iter_cursor(self, cursor):
+        while True:
+            batch = cursor.fetchmany(500)
+            if not batch:
+                return
+            for row in batch:
+                yield {column: row[column] for column in COLUMNS}
+
+    def query(self, filters=None, since=None, until=None, latest=False, limit=ODDS_QUERY_MAX_ROWS, offset=0):
+        """Return matching rows, newest first"""
+        return list(self.iter_rows(filters, since, until, latest, newest_first=True,
+                                   limit=min(limit, ODDS_QUERY_MAX_ROWS), offset=offset))
+
+    def aggregate(self, group_by, filters=None, since=None, until=None, latest=False, limit=ODDS_QUERY_MAX_ROWS):
+        """
+        Summarize matching rows per group
+
+        Args:
+            group_by (list): Names from GROUPS
+
+        Returns:
+            list: One dict per group with its group columns, row count,
+                min/max/average odds and first/last scrape time
+        """
+        unknown = [name for name in group_by if name not in GROUPS]
+        if unknown or not group_by:
+            raise ValueError(f"Unknown or missing group_by: {', '.join(unknown)} (available: {', '.join(GROUPS)})")
+        sql, params = self._select(filters, since, until, latest)
+        groups = ", ".join(f"{GROUPS[name]} AS {name}" for name in group_by)
+        keys = ", ".join(group_by)
+        sql = (f"SELECT {groups}, COUNT(*) AS rows, MIN(odds) AS min_odds, MAX(odds) AS max_odds, "
+               f"ROUND(AVG(odds), 4) AS avg_odds, MIN(scraped_at) AS first_scraped_at, "
+               f"MAX(scraped_at) AS last_scraped_at FROM ({sql}) GROUP BY {keys} ORDER BY {keys} LIMIT ?")
+        rows = self._connection().execute(sql, params + [min(limit, ODDS_QUERY_MAX_ROWS)]).fetchall()
+        return [dict(row) for row in rows]
+
+    def compare(self, filters=None, since=None, until=None, min_books=1, limit=ODDS_QUERY_MAX_ROWS):
+        """
+        Compare the latest odds of each line across sportsbooks
+
+        Returns:
+            list: One dict per (game, player, statistic, line) line with
+                "books" (book -> latest odds), "best_book" and "best_odds"
+        """
+        sql, params = self._select(filters, since, until, latest=True)
+        sql = (f"SELECT MAX(league) AS league, game, player, MAX(team) AS team, statistic, line, "
+               f"MAX(value) AS value, json_group_object(book, odds) AS books "
+               f"FROM ({sql}) GROUP BY game, player, statistic, line HAVING COUNT(*) >= ? "
+               f"ORDER BY game, player, statistic, line LIMIT ?")
+        lines = []
+        for row in self._connection().execute(sql, params + [min_books, min(limit, ODDS_QUERY_MAX_ROWS)]):
+            line = {name: row[name] for name in ("league", "game", "player", "team", "statistic", "line", "value")}
+            line["books"] = json.loads(row["books"])
+            priced = {book: odds for book, odds in line["books"].items() if odds is not None}
+            line["best_book"] = max(priced, key=priced.get) if priced else None
+            line["best_odds"] = priced.get(line["best_book"])
+            lines.append(line)
+        return lines
+
+    def runs(self, limit=100):
+        """Return the most recent runs with their row counts and scrape times"""
+        rows = self._connection().execute(
+            "SELECT runs.name AS run, runs.created_at, COUNT(odds.run_id) AS rows, "
+            "MAX(odds.scraped_at) AS last_scraped_at FROM runs LEFT JOIN odds ON odds.run_id = runs.id "
+            "GROUP BY runs.id ORDER BY runs.id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def has_run(self, name):
+        return self._connection().execute("SELECT 1 FROM runs WHERE name = ?", (name,)).fetchone() is not None
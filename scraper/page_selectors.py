@@ -0,0 +1,162 @@
+"""
+Compiled page selectors
+
+Turns a SELECTORS set from scraper/config.py into what the engines need:
+CSS locators for plain lookups, XPath for the lookups that match an
+element's text (which CSS can't express), and quoted selectors for the
+in-page scripts. Sets are compiled once, so a malformed selector fails when
+the scraper starts rather than halfway through a league.
+"""
+import re
+import json
+
+from selenium.webdriver.common.by import By
+
+from scraper.config import SELECTORS, SELECTOR_VERSION
+
+# The CSS subset used by SELECTORS: tags, .class, [attr], [attr=v], [attr*=v],
+# [attr^=v], descendant and child combinators, and comma-separated groups
+CSS_TOKEN = re.compile(r"""
+    \s*(?P<combinator>[>,])\s*
+  | (?P<space>\s+)
+  | (?P<tag>[a-zA-Z][\w-]*|\*)
+  | \.(?P<cls>[\w-]+)
+  | \[\s*(?P<attr>[\w-]+)\s*(?:(?P<op>[*^]?=)\s*(?P<quote>['"]?)(?P<value>.*?)(?P=quote))?\s*\]
+""", re.VERBOSE)
+
+ATTRIBUTE_TESTS = {
+    "=": "@{attr}={value}",
+    "*=": "contains(@{attr}, {value})",
+    "^=": "starts-with(@{attr}, {value})",
+}
+
+
+def xpath_literal(text):
+    """Quote text as an XPath string literal, whatever quotes it contains"""
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    return "concat(" + ", \"'\", ".join(f"'{part}'" for part in text.split("'")) + ")"
+
+
+def css_to_xpath(css, prefix="//"):
+    """
+    Compile a CSS selector to an equivalent XPath expression
+
+    Args:
+        css (str): Selector in the subset described by CSS_TOKEN
+        prefix (str): Axis before the first step, e.g. "//" or "./ancestor::"
+
+    Returns:
+        str: The XPath expression; groups are joined with "|"
+    """
+    groups = []
+    steps = []
+    tag, tests, axis = None, [], prefix
+    position = 0
+    css = css.strip()
+
+    def end_step():
+        if tag is None and not tests:
+            raise ValueError(f"Empty step in selector: {css!r}")
+        steps.append(axis + (tag or "*") + "".join(f"[{test}]" for test in tests))
+
+    while position < len(css):
+        match = CSS_TOKEN.match(css, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Unsupported selector syntax at {css[position:]!r} in {css!r}")
+        position = match.end()
+
+        if match.group("combinator") == ",":
+            end_step()
+            groups.append("".join(steps))
+            steps, tag, tests, axis = [], None, [], prefix
+        elif match.group("combinator") == ">" or match.group("space"):
+            end_step()
+            tag, tests = None, []
+            axis = "/" if match.group("combinator") == ">" else "//"
+        elif match.group("tag"):
+            tag = match.group("tag")
+        elif match.group("cls"):
+            tests.append(f"contains(concat(' ', normalize-space(@class), ' '), ' {match.group('cls')} ')")
+        else:
+            attr, op = match.group("attr"), match.group("op")
+            tests.append(ATTRIBUTE_TESTS[op].format(attr=attr, value=xpath_literal(match.group("value")))
+                         if op else f"@{attr}")
+
+    end_step()
+    groups.append("".join(steps))
+    return " | ".join(groups)
+
+
+class PageSelectors:
+    """One compiled selector set"""
+
+    def __init__(self, version, selectors):
+        """
+        Args:
+            version (int): Key of the set in SELECTORS
+            selectors (dict): Name -> CSS selector
+        """
+        self.version = version
+        self.css = dict(selectors)
+        for name, css in selectors.items():
+            try:
+                css_to_xpath(css)
+            except ValueError as e:
+                raise ValueError(f"Selector {name!r} of version {version}: {e}")
+
+        # Plain lookups stay CSS, which browsers match natively
+        self.captcha = (By.CSS_SELECTOR, selectors["captcha"])
+        self.game_headers = (By.CSS_SELECTOR, selectors["game_header"])
+        self.game_teams = (By.CSS_SELECTOR, selectors["game_teams"])
+        self.player = (By.CSS_SELECTOR, selectors["player"])
+        self.player_name = (By.CSS_SELECTOR, selectors["player_name"])
+        self.player_team = (By.CSS_SELECTOR, selectors["player_team"])
+        self.market_item = (By.CSS_SELECTOR, selectors["market_item"])
+        self.market_amount = (By.CSS_SELECTOR, selectors["market_amount"])
+        self.market_odds = (By.CSS_SELECTOR, selectors["market_odds"])
+
+        # Text matches and ancestor lookups need XPath
+        self._league_name = self._single(f"{selectors['league_item']} {selectors['league_name']}")
+        self._stat_label = self._single(f"{selectors['stat_item']} {selectors['stat_label']}")
+        self.league_item_ancestor = (By.XPATH, self._single(selectors["league_item"], "./ancestor::"))
+
+        # Quoted for substitution into in-page scripts as %(name)s
+        self.literals = {name: json.dumps(css) for name, css in selectors.items()}
+
+    @staticmethod
+    def _single(css, prefix="//"):
+        """Compile a selector that must not be a group, so predicates can be appended"""
+        xpath = css_to_xpath(css, prefix)
+        if " | " in xpath or (prefix != "//" and "/" in xpath[len(prefix):]):
+            raise ValueError(f"Selector must be a single {'step' if prefix != '//' else 'selector'}: {css!r}")
+        return xpath
+
+    def league(self, name):
+        """Locator of the league name element whose text contains name"""
+        return By.XPATH, f"{self._league_name}[contains(text(), {xpath_literal(name)})]"
+
+    def stat_button(self, name):
+        """Locator of the button around the statistic label whose text contains name"""
+        return By.XPATH, f"{self._stat_label}[contains(text(), {xpath_literal(name)})]/.."
+
+    def script(self, template, **values):
+        """Fill an in-page script's %(name)s placeholders with quoted CSS selectors and values"""
+        return template % dict(self.literals, **{name: json.dumps(value) for name, value in values.items()})
+
+
+_compiled = {}
+
+
+def get_selectors(version=SELECTOR_VERSION):
+    """Return the compiled selector set for a version"""
+    if version not in _compiled:
+        try:
+            selectors = SELECTORS[version]
+        except KeyError:
+            raise ValueError(
+                f"Unknown selector version: {version} (available: {', '.join(map(str, SELECTORS))})")
+        _compiled[version] = PageSelectors(version, selectors)
+    return _compiled[version]
@@ -0,0 +1,255 @@
+"""
+Event-driven page readiness detection used in place of fixed sleeps
+"""
+import json
+import time
+import threading
+
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import JavascriptException, TimeoutException, WebDriverException
+
+from scraper.config import (
+    READINESS_TIMEOUTS,
+    DEFAULT_READINESS_TIMEOUT,
+    NETWORK_IDLE_TIME,
+    DOM_QUIET_TIME,
+    READINESS_POLL_INTERVAL,
+)
+
+# Resolves with the number of milliseconds the DOM has been quiet, once it has
+# been quiet for arguments[0] ms or arguments[1] ms have passed
+DOM_QUIET_SCRIPT = """
+    const quietMs = arguments[0];
+    const timeoutMs = arguments[1];
+    const done = arguments[arguments.length - 1];
+    if (!window.__scraperMutations) {
+        window.__scraperMutations = {last: performance.now()};
+        new MutationObserver(() => {
+            window.__scraperMutations.last = performance.now();
+        }).observe(document.documentElement, {
+            childList: true, subtree: true, attributes: true, characterData: true
+        });
+    }
+    const start = performance.now();
+    (function check() {
+        const now = performance.now();
+        const quietFor = now - window.__scraperMutations.last;
+        if (quietFor >= quietMs || now - start >= timeoutMs) {
+            done(quietFor);
+        } else {
+            setTimeout(check, Math.min(50, quietMs - quietFor));
+        }
+    })();
+"""
+
+# Request types that never "finish" and must not block network idle
+LONG_LIVED_TYPES = {"EventSource", "WebSocket"}
+
+
+class NetworkLog:
+    """
+    Tracks in-flight requests and finished JSON responses from CDP Network events
+
+    With a Selenium driver, events are read from Chrome's performance log by
+    poll(). Without one, events are pushed in through handle_event().
+    """
+
+    def __init__(self, driver=None):
+        self.driver = driver
+        self._inflight = set()
+        self._json_responses = {}  # requestId -> URL, until loading finishes
+        self._finished_responses = []  # (requestId, URL) ready for Network.getResponseBody
+        self._last_activity = time.monotonic()
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Drain pending CDP events and update the in-flight request set"""
+        if self.driver is None:
+            return
+        try:
+            entries = self.driver.get_log("performance")
+        except WebDriverException:
+            return
+
+        with self._lock:
+            for entry in entries:
+                try:
+                    message = json.loads(entry["message"])["message"]
+                except (KeyError, ValueError):
+                    continue
+                self._apply(message.get("method"), message.get("params", {}))
+
+    def handle_event(self, method, params):
+        """Apply a CDP Network event received outside the performance log"""
+        with self._lock:
+            self._apply(method, params)
+
+    def _apply(self, method, params):
+        """Apply a single CDP Network event (caller holds the lock)"""
+        if method == "Network.requestWillBeSent":
+            if params.get("type") not in LONG_LIVED_TYPES:
+                self._inflight.add(params.get("requestId"))
+                self._last_activity = time.monotonic()
+        elif method == "Network.responseReceived":
+            response = params.get("response", {})
+            if "json" in response.get("mimeType", ""):
+                self._json_responses[params.get("requestId")] = response.get("url")
+        elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+            request_id = params.get("requestId")
+            url = self._json_responses.pop(request_id, None)
+            if url and method == "Network.loadingFinished":
+                self._finished_responses.append((request_id, url))
+            if request_id in self._inflight:
+                self._inflight.discard(request_id)
+                self._last_activity = time.monotonic()
+
+    def take_json_responses(self):
+        """Return and forget the (requestId, URL) of JSON responses finished so far"""
+        self.poll()
+        with self._lock:
+            responses = self._finished_responses
+            self._finished_responses = []
+            return responses
+
+    def idle_for(self):
+        """Seconds since the last request started or finished, 0 if requests are in flight"""
+        with self._lock:
+            if self._inflight:
+                return 0.0
+            return time.monotonic() - self._last_activity
+
+    def reset(self):
+        """Forget requests from the previous page"""
+        self.poll()
+        with self._lock:
+            self._inflight.clear()
+            self._json_responses.clear()
+            self._finished_responses = []
+            self._last_activity = time.monotonic()
+
+
+class ReadinessRecorder:
+    """Thread-safe record of how long each readiness step actually waited"""
+
+    def __init__(self):
+        self._waits = {}
+        self._timeouts = {}
+        self._lock = threading.Lock()
+
+    def record(self, step, seconds, timed_out=False):
+        with self._lock:
+            self._waits.setdefault(step, []).append(seconds)
+            if timed_out:
+                self._timeouts[step] = self._timeouts.get(step, 0) + 1
+
+    def summary(self):
+        """Return per-step wait statistics"""
+        with self._lock:
+            result = {}
+            for step, waits in self._waits.items():
+                result[step] = {
+                    "count": len(waits),
+                    "total_seconds": round(sum(waits), 3),
+                    "avg_seconds": round(sum(waits) / len(waits), 3),
+                    "max_seconds": round(max(waits), 3),
+                    "timeouts": self._timeouts.get(step, 0),
+                }
+            return result
+
+
+class PageReadiness:
+    def __init__(self, driver, recorder=None, timeouts=None):
+        """
+        Initialize readiness checks for a driver
+
+        Args:
+            driver: Selenium WebDriver
+            recorder (ReadinessRecorder): Where measured waits are recorded
+            timeouts (dict): Per-step timeouts in seconds, defaults to READINESS_TIMEOUTS
+        """
+        self.driver = driver
+        self.recorder = recorder or ReadinessRecorder()
+        self.timeouts = timeouts or READINESS_TIMEOUTS
+        self.network_log = getattr(driver, "network_log", None)
+
+    def timeout(self, step):
+        return self.timeouts.get(step, DEFAULT_READINESS_TIMEOUT)
+
+    def _wait_until(self, step, condition):
+        """Wait for an expected condition, recording the wait; raises TimeoutException"""
+        start = time.monotonic()
+        try:
+            result = WebDriverWait(
+                self.driver, self.timeout(step), poll_frequency=READINESS_POLL_INTERVAL
+            ).until(condition)
+        except TimeoutException:
+            self.recorder.record(step, time.monotonic() - start, timed_out=True)
+            raise
+        self.recorder.record(step, time.monotonic() - start)
+        return result
+
+    def wait_for_presence(self, step, locator):
+        """Wait for an element to be present and return it"""
+        return self._wait_until(step, EC.presence_of_element_located(locator))
+
+    def wait_for_all(self, step, locator):
+        """Wait for at least one matching element and return all of them"""
+        return self._wait_until(step, EC.presence_of_all_elements_located(locator))
+
+    def wait_for_clickable(self, step, locator):
+        """Wait for an element to be visible and enabled and return it"""
+        return self._wait_until(step, EC.element_to_be_clickable(locator))
+
+    def navigate(self, step, url):
+        """Load a URL and wait until the page has settled"""
+        if self.network_log:
+            self.network_log.reset()
+        start = time.monotonic()
+        self.driver.get(url)
+        return self.settle(step, start=start)
+
+    def settle(self, step, start=None):
+        """
+        Wait for network idle and then for the DOM to go quiet
+
+        Both conditions share the step's timeout. A timeout is recorded but not
+        raised, since the page is usually usable even if a poller keeps running.
+
+        Returns:
+            bool: True if the page settled before the timeout
+        """
+        start = start or time.monotonic()
+        deadline = start + self.timeout(step)
+
+        settled = self._wait_network_idle(deadline)
+        if settled:
+            settled = self._wait_dom_quiet(deadline)
+
+        self.recorder.record(step, time.monotonic() - start, timed_out=not settled)
+        return settled
+
+    def _wait_network_idle(self, deadline):
+        """Poll the CDP network log until no requests have been in flight for NETWORK_IDLE_TIME"""
+        if not self.network_log:
+            return True
+        while True:
+            self.network_log.poll()
+            if self.network_log.idle_for() >= NETWORK_IDLE_TIME:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(READINESS_POLL_INTERVAL)
+
+    def _wait_dom_quiet(self, deadline):
+        """Wait inside the page for the MutationObserver to report DOM_QUIET_TIME of quiet"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        quiet_ms = DOM_QUIET_TIME * 1000
+        try:
+            quiet_for = self.driver.execute_async_script(
+                DOM_QUIET_SCRIPT, quiet_ms, remaining * 1000)
+        except (TimeoutException, JavascriptException):
+            return False
+        return quiet_for >= quiet_ms
@@ -0,0 +1,177 @@
+"""
+Continuous scraping with a per-(league, statistic) refresh schedule
+
+The watch daemon keeps one scraper, and so one pool of warm browsers, alive
+between scrapes. Every league/statistic pair has its own refresh interval:
+pairs whose odds are moving fast are refreshed more often, quiet ones back
+off. Statistics of the same league that are due together share one browser
+session, and no more than max_browsers leagues are scraped at once.
+"""
+import time
+import heapq
+import threading
+import concurrent.futures
+
+from scraper.config import (
+    WATCH_BACKOFF,
+    WATCH_BASE_INTERVAL,
+    WATCH_FAST_MOVE_RATIO,
+    WATCH_MAX_BROWSERS,
+    WATCH_MAX_INTERVAL,
+    WATCH_MIN_INTERVAL,
+    WATCH_SPEEDUP,
+)
+
+
+class WatchTask:
+    """Refresh state of one (league, statistic) pair"""
+
+    def __init__(self, league, statistic, interval):
+        self.league = league
+        self.statistic = statistic
+        self.interval = interval
+        self.next_run = 0.0
+        self.runs = 0
+        self.last_odds = None  # (game, player, line) -> odds from the previous scrape
+        self.last_move_ratio = None
+
+    def __lt__(self, other):
+        return (self.next_run, self.league, self.statistic) < (other.next_run, other.league, other.statistic)
+
+
+class WatchScheduler:
+    def __init__(self, scraper, leagues, statistics, max_browsers=WATCH_MAX_BROWSERS,
+                 base_interval=WATCH_BASE_INTERVAL, min_interval=WATCH_MIN_INTERVAL,
+                 max_interval=WATCH_MAX_INTERVAL):
+        """
+        Args:
+            scraper (SportsScraper): Scraper whose driver pool is reused by every scrape
+            leagues (list): Leagues to watch
+            statistics (list): Statistics to watch in every league
+            max_browsers (int): Global limit on leagues scraped at the same time
+            base_interval (float): Initial seconds between refreshes of a pair
+            min_interval, max_interval (float): Bounds for the adapted intervals
+        """
+        self.scraper = scraper
+        self.max_browsers = max_browsers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self.tasks = [WatchTask(league, statistic, base_interval)
+                      for league in leagues for statistic in statistics]
+        self._queue = list(self.tasks)
+        heapq.heapify(self._queue)
+        self._running = set()  # Leagues being scraped
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Stop scheduling; scrapes in progress stop after their current game"""
+        self._stopping.set()
+
+    def adapt(self, task, odds):
+        """
+        Update a pair's interval from how much its odds moved since the last scrape
+
+        Args:
+            task (WatchTask): The pair that was just scraped
+            odds (dict): (game, player, line) -> odds from this scrape
+        """
+        if task.last_odds is not None:
+            keys = set(odds) | set(task.last_odds)
+            moved = sum(1 for key in keys if odds.get(key) != task.last_odds.get(key))
+            ratio = moved / len(keys) if keys else 0.0
+            if ratio >= WATCH_FAST_MOVE_RATIO:
+                task.interval = max(self.min_interval, task.interval * WATCH_SPEEDUP)
+            elif moved == 0:
+                task.interval = min(self.max_interval, task.interval * WATCH_BACKOFF)
+            task.last_move_ratio = ratio
+        task.last_odds = odds
+        task.runs += 1
+
+    def scrape_league(self, league, tasks):
+        """Scrape the due statistics of one league in a single session and reschedule them"""
+        statistics = [task.statistic for task in tasks]
+        odds = {statistic: {} for statistic in statistics}
+
+        def on_game(league_name, game_title, rows):
+            for row in rows:
+                if row.get("statistic") in odds:
+                    odds[row["statistic"]][(game_title, row.get("player"), row.get("value"))] = row.get("odds")
+
+        output_file = self.scraper.get_output_filename([league], statistics)
+        self.scraper.open_output(output_file)
+        try:
+            rows = self.scraper.process_league(league, statistics, output_file,
+                                               should_cancel=self._stopping.is_set, on_game=on_game)
+        finally:
+            self.scraper.close_output(output_file)
+
+        for task in tasks:
+            # A pair with no rows at all most likely failed; keep its previous snapshot
+            if odds[task.statistic]:
+                self.adapt(task, odds[task.statistic])
+            task.next_run = time.monotonic() + task.interval
+            print(f"{league} {task.statistic}: next refresh in {task.interval:.0f}s"
+                  + (f" ({task.last_move_ratio:.0%} of lines moved)" if task.last_move_ratio is not None else ""))
+        return rows
+
+    def _due(self, now):
+        """Pop due tasks of leagues that aren't being scraped, grouped by league"""
+        due = {}
+        deferred = []
+        while self._queue and self._queue[0].next_run <= now:
+            task = heapq.heappop(self._queue)
+            if task.league in due:
+                due[task.league].append(task)
+            elif task.league in self._running or len(self._running) + len(due) >= self.max_browsers:
+                deferred.append(task)
+            else:
+                due[task.league] = [task]
+        for task in deferred:
+            heapq.heappush(self._queue, task)
+        return due
+
+    def run(self):
+        """Scrape due pairs until stop() is called"""
+        print(f"Watching {len(self._queue)} league/statistic pairs with up to {self.max_browsers} browsers")
+        futures = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_browsers) as executor:
+            while not self._stopping.is_set():
+                for league, tasks in self._due(time.monotonic()).items():
+                    self._running.add(league)
+                    futures[executor.submit(self.scrape_league, league, tasks)] = (league, tasks)
+
+                # Sleep until the next pair is due or a scrape finishes, waking
+                # at least once a second to notice stop(). Pairs still due here
+                # are waiting for a running scrape, so only a completion helps.
+                timeout = 1.0
+                if self._queue and self._queue[0].next_run > time.monotonic():
+                    timeout = min(timeout, self._queue[0].next_run - time.monotonic())
+                if not futures:
+                    self._stopping.wait(timeout)
+                    continue
+                done, _ = concurrent.futures.wait(
+                    futures, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    league, tasks = futures.pop(future)
+                    self._running.discard(league)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"Watching {league} generated an exception: {e}")
+                        for task in tasks:
+                            task.next_run = time.monotonic() + task.interval
+                    for task in tasks:
+                        heapq.heappush(self._queue, task)
+        print("Watch stopped")
+
+    def stats(self):
+        """Return the current interval and last movement of every pair"""
+        return {
+            f"{task.league}/{task.statistic}": {
+                "interval": round(task.interval, 1),
+                "runs": task.runs,
+                "last_move_ratio": task.last_move_ratio,
+            }
+            for task in self.tasks
+        }
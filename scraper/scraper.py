@@ -1,42 +1,181 @@
 import os
+import math
 import time
-import csv
 import threading
+import concurrent.futures
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
-# Lock for synchronizing CSV writes
-csv_lock = threading.Lock()
+from scraper.browser_profiles import get_browser_profile, profile_arguments
+from scraper.cache import HIT, CLAIMED
+from scraper.config import BASE_URL, DEFAULT_BROWSER_PROFILE, DEFAULT_SPORTSBOOK, DEFAULT_EXTRACTION_MODE, DEFAULT_OUTPUT_FORMAT, DEFAULT_POOL_SIZE, GAME_SHARD_MIN_GAMES, GAME_SHARDS, LEAGUE_START_STAGGER, READINESS_TIMEOUTS, SELECTOR_VERSION
+from scraper.driver_pool import DriverPool
+from scraper.extractors import get_extractor
+from scraper.metrics import Metrics, default_log_path
+from scraper.page_selectors import get_selectors
+from scraper.readiness import NetworkLog, PageReadiness, ReadinessRecorder
+from scraper.sportsbooks import BookLimiter, book_units, get_sportsbooks, sportsbook_url
+from scraper.writers import WRITERS, create_writer, output_filename
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5]
+    });
+    window.navigator.chrome = {
+        runtime: {}
+    };
+"""
+
+
+def as_statistic_list(statistic):
+    """Normalize a statistic name or list of names to a list"""
+    if isinstance(statistic, str):
+        return [statistic]
+    return list(statistic)
+
+
+class CaptchaDetected(Exception):
+    """Raised when the site serves a CAPTCHA challenge"""
+
+
+class ScrapeCancelled(Exception):
+    """Raised by scrape_data when its should_cancel callback returns True"""
+
+    def __init__(self, output_file=None):
+        super().__init__("Scrape cancelled")
+        self.output_file = output_file
+
 
 class SportsScraper:
-    def __init__(self, output_dir=None):
-        """Initialize the scraper with configurable output directory"""
+    # ChromeDriverManager().install() is resolved once per process
+    _chromedriver_path = None
+    _chromedriver_lock = threading.Lock()
+
+    def __init__(self, output_dir=None, driver_pool=None, pool_size=DEFAULT_POOL_SIZE,
+                 extraction_mode=DEFAULT_EXTRACTION_MODE, output_format=DEFAULT_OUTPUT_FORMAT, cache=None,
+                 game_shards=GAME_SHARDS, base_url=BASE_URL, metrics=None,
+                 browser_profile=DEFAULT_BROWSER_PROFILE, selector_version=SELECTOR_VERSION,
+                 odds_store=None):
+        """
+        Initialize the scraper with configurable output directory
+
+        Args:
+            output_dir (str): Directory for output files
+            driver_pool (DriverPool): Shared pool of warm drivers; one is created if omitted
+            pool_size (int): Size of the pool created when driver_pool is omitted
+            extraction_mode (str): "css" (one WebDriver call per element), "js" (one script
+                per game), "js_league" (one script per league), "network" (parse captured
+                betbuilder API responses) or "xpath" (the original lookups, a benchmark baseline)
+            output_format (str): "csv", "ndjson" or "parquet"
+            cache (ResultCache): Shared cache of recently scraped (league, statistic)
+                slices; every slice is scraped if omitted
+            game_shards (int): Most browsers that share one league's games
+                (only idle pool capacity is used for the extra ones)
+            base_url (str): Betbuilder page to scrape, e.g. a local fixture server;
+                its sb= parameter is set to each sportsbook scraped
+            metrics (Metrics): Where step timings and per-league counters are
+                recorded; one logging to LOG_DIR is created if omitted
+            browser_profile (str): "full" or "lean" (headless, with images,
+                fonts, media and trackers blocked); see BROWSER_PROFILES
+            selector_version (int): Which SELECTORS set to find page elements with
+            odds_store (OddsStore): Queryable store every written row is also
+                inserted into; only output files are written if omitted
+        """
         self.output_dir = output_dir or os.getcwd()
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
+
+        self._owns_pool = driver_pool is None
+        self.driver_pool = driver_pool or DriverPool(self.create_driver, max_size=pool_size)
+
+        self.selectors = get_selectors(selector_version)
+        self.extractor = get_extractor(extraction_mode, self.selectors)
+        self.browser_profile = get_browser_profile(browser_profile)
+
+        if output_format not in WRITERS:
+            raise ValueError(f"Unknown output format: {output_format} (available: {', '.join(WRITERS)})")
+        self.output_format = output_format
+        self._writers = {}
+        self._writers_lock = threading.Lock()
+        self._slice_callbacks = {}
+        self._output_stats = {"files": 0, "rows": 0, "write_seconds": 0.0}
+
+        self.cache = cache
+        self.odds_store = odds_store
+        self.game_shards = game_shards
+        self.base_url = base_url
+        # Per-sportsbook browser limits (SPORTSBOOKS), shared by leagues and game shards
+        self.book_limiter = BookLimiter()
+
+        # Measured readiness waits for every step, across all leagues
+        self.readiness = ReadinessRecorder()
+        self.metrics = metrics or Metrics(default_log_path())
+
+    def close(self):
+        """Shut down the driver pool if this scraper created it"""
+        if self._owns_pool:
+            self.driver_pool.close()
+        self.metrics.close()
+
+    def pool_stats(self):
+        """Return driver pool hit/miss and checkout-wait metrics"""
+        return self.driver_pool.stats()
+
+    def readiness_stats(self):
+        """Return how long each readiness step actually waited"""
+        return self.readiness.summary()
+
+    def metrics_snapshot(self):
+        """Return step timings and per-league counters (see scraper.metrics)"""
+        return self.metrics.snapshot()
+
+    def cache_stats(self):
+        """Return result cache hit/miss metrics, or None without a cache"""
+        return self.cache.stats() if self.cache else None
+
+    @classmethod
+    def get_chromedriver_path(cls):
+        """Resolve the chromedriver binary once and reuse it for every driver"""
+        with cls._chromedriver_lock:
+            if cls._chromedriver_path is None:
+                cls._chromedriver_path = ChromeDriverManager().install()
+            return cls._chromedriver_path
     
     def check_for_captcha(self, driver):
-        """Check if a CAPTCHA is present on the page"""
-        captcha_indicators = [
-            "//iframe[contains(@src, 'captcha')]",
-            "//iframe[contains(@src, 'recaptcha')]",
-            "//div[contains(@class, 'captcha')]",
-            "//div[contains(@class, 'g-recaptcha')]"
-        ]
-        
-        for indicator in captcha_indicators:
-            if len(driver.find_elements(By.XPATH, indicator)) > 0:
-                return True
-        return False
+        """Check if a CAPTCHA is present on the page, with a single query"""
+        return len(driver.find_elements(*self.selectors.captcha)) > 0
+
+    def ensure_no_captcha(self, driver, league_name, message):
+        """Raise CaptchaDetected with message if the page shows a CAPTCHA"""
+        with self.metrics.timer("captcha_check", league=league_name):
+            found = self.check_for_captcha(driver)
+        if found:
+            self.metrics.increment("scraper_captcha_total", league=league_name)
+            self.metrics.log("captcha", league=league_name, message=message)
+            raise CaptchaDetected(message)
+
+    def record_game(self, league_name, rows):
+        """Count a scraped game and its rows"""
+        self.metrics.increment("scraper_games_total", league=league_name)
+        self.metrics.increment("scraper_rows_total", len(rows), league=league_name)
+
+    def record_error(self, league_name, error, statistic=None):
+        """Count and log an error that stopped a league or one of its statistics"""
+        self.metrics.increment("scraper_errors_total", league=league_name, error=type(error).__name__)
+        self.metrics.log("error", league=league_name, statistic=statistic,
+                         error=type(error).__name__, message=str(error))
 
     def create_driver(self):
         """Create and configure a Chrome WebDriver instance with anti-detection measures"""
+        start = time.monotonic()
         chrome_options = Options()
         
         # Enhanced stealth settings
@@ -49,239 +188,542 @@ class SportsScraper:
         chrome_options.add_argument('--no-sandbox')
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument("--window-size=1920,1080")
+
+        # Headless mode, viewport and background services come from the browser profile
+        for argument in profile_arguments(self.browser_profile):
+            chrome_options.add_argument(argument)
+        if self.browser_profile.get("block_images"):
+            chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
         
         # Performance optimization flags
         chrome_options.add_argument('--ignore-certificate-errors')
         chrome_options.add_argument('--disable-popup-blocking')
         chrome_options.add_argument('--disable-translate')
         chrome_options.add_argument('--disable-extensions')
+
+        # CDP network events feed the readiness network-idle check
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
         
-        service = ChromeService(executable_path=ChromeDriverManager().install())
+        service = ChromeService(executable_path=self.get_chromedriver_path())
         driver = webdriver.Chrome(service=service, options=chrome_options)
         
         # Enhanced stealth scripts
         driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-            "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+            "userAgent": USER_AGENT
         })
         
         # Additional stealth JavaScript
-        driver.execute_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5]
-            });
-            window.navigator.chrome = {
-                runtime: {}
-            };
-        """)
-        
+        driver.execute_script(STEALTH_SCRIPT)
+
+        # Requests the profile doesn't need (images, fonts, trackers) are never sent
+        if self.browser_profile.get("blocked_urls"):
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {"urls": self.browser_profile["blocked_urls"]})
+
+        # Allow the in-page DOM quiet wait to run for the longest step timeout
+        driver.set_script_timeout(max(READINESS_TIMEOUTS.values()) + 5)
+        driver.network_log = NetworkLog(driver)
+
+        self.metrics.observe("driver_create", time.monotonic() - start)
         return driver
 
-    def write_to_csv(self, data, filename):
-        """Thread-safe CSV writer that appends rows to the given file"""
-        with csv_lock:
-            file_exists = os.path.isfile(filename)
-            with open(filename, 'a', newline='', encoding='utf-8') as f:
-                fieldnames = ["game", "player", "team", "statistic", "value", "odds"]
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                if not file_exists:
-                    writer.writeheader()
-                writer.writerows(data)
-
-    def get_output_filename(self, leagues, statistic):
-        """Generate a filename based on the leagues and statistic"""
+    def open_output(self, filename, on_slice=None):
+        """
+        Start a buffered writer for an output file
+
+        Args:
+            filename (str): Output file path
+            on_slice (callable): Called as on_slice(league, statistic) each time
+                a slice written to this file is complete
+        """
+        with self._writers_lock:
+            if on_slice:
+                self._slice_callbacks[filename] = on_slice
+            if filename not in self._writers:
+                self._writers[filename] = create_writer(filename, self.output_format, metrics=self.metrics,
+                                                         store=self.odds_store)
+            return self._writers[filename]
+
+    def close_output(self, filename):
+        """Flush and close an output file's writer"""
+        with self._writers_lock:
+            writer = self._writers.pop(filename, None)
+            self._slice_callbacks.pop(filename, None)
+        if writer:
+            writer.close()
+            with self._writers_lock:
+                self._output_stats["files"] += 1
+                self._output_stats["rows"] += writer.rows_written
+                self._output_stats["write_seconds"] += writer.write_seconds
+
+    def output_stats(self):
+        """Return rows written and time spent writing them, over every closed output file"""
+        with self._writers_lock:
+            stats = dict(self._output_stats)
+        stats["write_seconds"] = round(stats["write_seconds"], 3)
+        return stats
+
+    def write_rows(self, data, filename):
+        """Queue rows for the output file's writer thread; never blocks on disk"""
+        self.open_output(filename).write(data)
+
+    def complete_slice(self, league_name, statistic, filename, book=DEFAULT_SPORTSBOOK):
+        """Tell the output file's writer that a book's league statistic has been fully written"""
+        self.open_output(filename).complete_slice(league_name, statistic, book)
+        on_slice = self._slice_callbacks.get(filename)
+        if on_slice:
+            on_slice(league_name, statistic)
+
+    def get_output_filename(self, leagues, statistic, books=None):
+        """Generate a filename based on the sportsbooks (unless only the default), leagues, statistic(s) and output format"""
         league_str = "_".join(leagues)
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        return os.path.join(self.output_dir, f"{league_str}_{statistic}_{timestamp}.csv")
+        if books and list(books) != [DEFAULT_SPORTSBOOK]:
+            league_str = f"{'_'.join(books)}_{league_str}"
+        statistic_str = "_".join(as_statistic_list(statistic))
+        return output_filename(self.output_dir, f"{league_str}_{statistic_str}", self.output_format)
 
-    def process_league(self, league_name, statistic, output_file):
-        """Process a single league and statistic combination"""
-        driver = None
-        try:
-            driver = self.create_driver()
-            wait = WebDriverWait(driver, 15)
-            
-            print(f"Accessing website for {league_name}, statistic: {statistic}...")
-            driver.get("https://troya.xyz/betbuilder?sb=betus")
-            time.sleep(5)  # Initial load wait
-            
-            if self.check_for_captcha(driver):
-                raise Exception("CAPTCHA detected - aborting scrape")
-                
-            print(f"Looking for league: {league_name}")
+    def open_league(self, driver, ready, league_name, book=DEFAULT_SPORTSBOOK):
+        """Load a sportsbook's betbuilder page and select a league"""
+        with self.metrics.timer("page_load", league=league_name):
+            ready.navigate("page_load", sportsbook_url(self.base_url, book))
+        
+        self.ensure_no_captcha(driver, league_name, "CAPTCHA detected - aborting scrape")
             
+        print(f"Looking for league: {league_name}")
+        
+        with self.metrics.timer("league_click", league=league_name):
             # Find and click league
-            league_element = wait.until(EC.presence_of_element_located((
-                By.XPATH,
-                f"//div[contains(@class, 'ligues-slider__item')]//div[contains(@class, 'ligues-slider__ligue-name') and contains(text(), '{league_name}')]"
-            )))
+            league_element = ready.wait_for_presence("league", self.selectors.league(league_name))
             print(f"Found {league_name} element")
             
-            league_parent = league_element.find_element(By.XPATH, "./ancestor::div[contains(@class, 'ligues-slider__item')]")
+            league_parent = league_element.find_element(*self.selectors.league_item_ancestor)
             driver.execute_script("arguments[0].click();", league_parent)
             print(f"Clicked {league_name}")
             
-            time.sleep(2)
-            
-            if self.check_for_captcha(driver):
-                raise Exception("CAPTCHA detected after league selection - aborting scrape")
-            
-            # Find and click statistic button
-            stat_button = wait.until(EC.element_to_be_clickable((
-                By.XPATH,
-                f"//div[contains(@class, 'main-markets__item')]//p[contains(text(), '{statistic}')]/.."
-            )))
+            ready.settle("league_click")
+        
+        self.ensure_no_captcha(driver, league_name, "CAPTCHA detected after league selection - aborting scrape")
+
+    def select_statistic(self, driver, ready, league_name, statistic):
+        """Click a statistic button on an open league page and return its game headers"""
+        with self.metrics.timer("stat_click", league=league_name):
+            stat_button = ready.wait_for_clickable("stat_button", self.selectors.stat_button(statistic))
+            self.extractor.prepare(driver)
             driver.execute_script("arguments[0].click();", stat_button)
             print(f"Clicked {statistic} button for {league_name}")
             
-            time.sleep(2)
-            
-            if self.check_for_captcha(driver):
-                raise Exception(f"CAPTCHA detected after selecting {statistic} - aborting scrape")
-            
-            # Find all game headers
-            game_headers = wait.until(EC.presence_of_all_elements_located((
-                By.XPATH,
-                "//div[contains(@class, 'tiered-block__item__top')]"
-            )))
-            print(f"Found {len(game_headers)} games for {league_name}")
+            ready.settle("stat_click")
+        
+        self.ensure_no_captcha(driver, league_name, f"CAPTCHA detected after selecting {statistic} - aborting scrape")
+        
+        # Find all game headers
+        game_headers = ready.wait_for_all("games", self.selectors.game_headers)
+        print(f"Found {len(game_headers)} {statistic} games for {league_name}")
+        return game_headers
+
+    def write_cached(self, league_name, statistic, games, output_file, on_game=None, book=DEFAULT_SPORTSBOOK):
+        """Write a cached slice's games to the output file, returning the number of rows"""
+        rows_written = 0
+        for game_title, game_data in games:
+            self.write_rows(game_data, output_file)
+            rows_written += len(game_data)
+            if on_game:
+                on_game(league_name, game_title, game_data)
+        self.complete_slice(league_name, statistic, output_file, book)
+        print(f"Served {rows_written} cached {statistic} records for {league_name} ({book})")
+        return rows_written
+
+    def serve_cached(self, league_name, statistics, output_file, on_game=None, book=DEFAULT_SPORTSBOOK):
+        """
+        Write every statistic that is fresh in the cache and claim the rest
+
+        Returns:
+            tuple: (rows written, statistics this scraper must scrape,
+                statistics another scraper is already fetching)
+        """
+        if not self.cache:
+            return 0, list(statistics), []
+
+        rows_written = 0
+        claimed = []
+        in_flight = []
+        for stat in statistics:
+            state, games = self.cache.lookup_or_claim(league_name, stat, book)
+            if state == HIT:
+                rows_written += self.write_cached(league_name, stat, games, output_file, on_game, book)
+            elif state == CLAIMED:
+                claimed.append(stat)
+            else:
+                in_flight.append(stat)
+        return rows_written, claimed, in_flight
+
+    def wait_for_cached(self, league_name, statistics, output_file, should_cancel=None, on_game=None,
+                        book=DEFAULT_SPORTSBOOK):
+        """
+        Wait for slices other scrapers are fetching and write them
+
+        Returns:
+            tuple: (rows written, statistics whose scrape was abandoned)
+        """
+        rows_written = 0
+        abandoned = []
+        for stat in statistics:
+            print(f"Waiting for an in-flight scrape of {stat} for {league_name} ({book})")
+            games = self.cache.wait(league_name, stat, should_cancel, book)
+            if games is None:
+                abandoned.append(stat)
+            else:
+                rows_written += self.write_cached(league_name, stat, games, output_file, on_game, book)
+        return rows_written, abandoned
+
+    def process_league(self, league_name, statistic, output_file, should_cancel=None, on_game=None,
+                       book=DEFAULT_SPORTSBOOK, budget=None):
+        """
+        Process a league of one sportsbook for one or more statistics
+
+        Statistics that are fresh in the cache are written straight from it,
+        ones another scraper is fetching are waited for, and only the rest
+        are scraped. budget (a semaphore) caps the browsers of the whole
+        scrape, game shard helpers included.
+
+        Returns:
+            int: Number of rows written
+        """
+        rows_written = 0
+        remaining = as_statistic_list(statistic)
+        while remaining and not (should_cancel and should_cancel()):
+            served, claimed, in_flight = self.serve_cached(league_name, remaining, output_file, on_game, book)
+            rows_written += served
+            if claimed:
+                rows_written += self.scrape_league(league_name, claimed, output_file, should_cancel, on_game, book,
+                                                   budget)
+            # Scrapes abandoned by their owner are claimed on the next pass
+            served, remaining = self.wait_for_cached(league_name, in_flight, output_file, should_cancel, on_game,
+                                                     book)
+            rows_written += served
+        return rows_written
+
+    def extract_shard(self, league_name, statistic, driver, game_count, start, end, book=DEFAULT_SPORTSBOOK):
+        """
+        Open the league and statistic on a helper driver and extract games start:end
+
+        Returns:
+            list: (game_title, rows) pairs, or None if the helper's page doesn't
+                list the same games as the main page
+        """
+        ready = PageReadiness(driver, self.readiness)
+        self.open_league(driver, ready, league_name, book)
+        game_headers = self.select_statistic(driver, ready, league_name, statistic)
+        if len(game_headers) != game_count:
+            print(f"Shard {start}-{end} of {league_name} saw {len(game_headers)} games instead of {game_count}")
+            return None
+        return list(self.extractor.extract_games(driver, ready, game_headers[start:end], statistic))
+
+    def acquire_helper_slot(self, book, budget=None):
+        """Take a sportsbook slot and a budget slot for a shard helper without waiting"""
+        if not self.book_limiter.try_acquire(book):
+            return False
+        if budget and not budget.acquire(blocking=False):
+            self.book_limiter.release(book)
+            return False
+        return True
+
+    def release_helper_slot(self, book, budget=None):
+        self.book_limiter.release(book)
+        if budget:
+            budget.release()
+
+    def extract_sharded(self, driver, ready, league_name, statistic, game_headers, book=DEFAULT_SPORTSBOOK,
+                        budget=None):
+        """
+        Yield (game_title, rows) for every game of the open statistic, in page order
+
+        When the extractor works game by game and the pool has idle capacity,
+        up to game_shards - 1 helper drivers each open the same page and
+        extract a contiguous shard of the games while this driver handles the
+        first shard. Shards a helper fails on are extracted here afterwards.
+        Helpers also count against the sportsbook's browser limit and the
+        scrape's budget. If a helper can't be started, the games are all
+        extracted here.
+        """
+        game_count = len(game_headers)
+        wanted = min(self.game_shards, math.ceil(game_count / GAME_SHARD_MIN_GAMES)) - 1
+        helpers = []
+        if self.extractor.per_game:
+            try:
+                while len(helpers) < wanted and self.acquire_helper_slot(book, budget):
+                    try:
+                        helper = self.driver_pool.try_acquire()
+                    except Exception:
+                        self.release_helper_slot(book, budget)
+                        raise
+                    if helper is None:
+                        self.release_helper_slot(book, budget)
+                        break
+                    helpers.append(helper)
+            except Exception as e:
+                print(f"Could not start shard browsers for {league_name}: {e}")
+                for helper in helpers:
+                    self.driver_pool.release(helper)
+                    self.release_helper_slot(book, budget)
+                helpers = []
+
+        if not helpers:
+            yield from self.extractor.extract_games(driver, ready, game_headers, statistic)
+            return
+
+        # Contiguous shards so results can be merged back in page order
+        shard_size = math.ceil(game_count / (len(helpers) + 1))
+        bounds = [(i, min(i + shard_size, game_count)) for i in range(0, game_count, shard_size)]
+        helpers, spare = helpers[:len(bounds) - 1], helpers[len(bounds) - 1:]
+        for helper in spare:
+            self.driver_pool.release(helper)
+            self.release_helper_slot(book, budget)
+        print(f"Splitting {game_count} {statistic} games for {league_name} across {len(bounds)} browsers")
+
+        healthy = {id(helper): True for helper in helpers}
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(helpers))
+        try:
+            futures = [
+                executor.submit(self.extract_shard, league_name, statistic, helper, game_count, start, end, book)
+                for helper, (start, end) in zip(helpers, bounds[1:])
+            ]
+
+            start, end = bounds[0]
+            yield from self.extractor.extract_games(driver, ready, game_headers[start:end], statistic)
+
+            for helper, future, (start, end) in zip(helpers, futures, bounds[1:]):
+                try:
+                    shard = future.result()
+                except Exception as e:
+                    print(f"Shard {start}-{end} of {league_name} failed: {e}")
+                    healthy[id(helper)] = not isinstance(e, (CaptchaDetected, WebDriverException))
+                    shard = None
+                if shard is None:
+                    shard = self.extractor.extract_games(driver, ready, game_headers[start:end], statistic)
+                yield from shard
+        finally:
+            executor.shutdown(wait=True)
+            for helper in helpers:
+                self.driver_pool.release(helper, healthy=healthy[id(helper)])
+                self.release_helper_slot(book, budget)
+
+    def scrape_league(self, league_name, statistic, output_file, should_cancel=None, on_game=None,
+                      book=DEFAULT_SPORTSBOOK, budget=None):
+        """
+        Scrape a sportsbook's league for one or more statistics in a single browser session
+
+        The league is opened once and each statistic's `main-markets__item`
+        button is clicked in turn on the same page. should_cancel is polled
+        between statistics and games; the league stops early when it returns True.
+        on_game(league_name, game_title, rows) is called after each game's rows
+        are handed to the writer. With a cache, each statistic must have been
+        claimed; complete ones that yielded rows are stored and the rest
+        released, so waiting scrapers retry them. The session waits for a free
+        slot under the sportsbook's browser limit and, with a budget
+        semaphore, for a browser of the scrape's budget.
+
+        Returns:
+            int: Number of rows written
+        """
+        statistics = as_statistic_list(statistic)
+        driver = None
+        budget_slot = False
+        book_slot = False
+        healthy = True
+        rows_written = 0
+        completed = set()
+        try:
+            with self.metrics.timer("driver_checkout", league=league_name):
+                if budget:
+                    budget.acquire()
+                    budget_slot = True
+                self.book_limiter.acquire(book)
+                book_slot = True
+                driver = self.driver_pool.acquire()
+            ready = PageReadiness(driver, self.readiness)
             
-            # Process each game
-            for header in game_headers:
-                game_data = []  # Store data for current game
+            print(f"Accessing {book} website for {league_name}, statistics: {', '.join(statistics)}...")
+            self.open_league(driver, ready, league_name, book)
+
+            for stat in statistics:
+                if should_cancel and should_cancel():
+                    break
                 try:
-                    # Click to expand the game
-                    driver.execute_script("arguments[0].click();", header)
-                    time.sleep(1)
-                    
-                    # Find the associated container (parent element)
-                    container = header.find_element(By.XPATH, "./..")
-                    
-                    team_spans = container.find_elements(
-                        By.XPATH,
-                        ".//p[contains(@class, 'tiered-block__player-team')]//span"
-                    )
-                    
-                    if len(team_spans) < 2:
-                        continue
-                        
-                    game_title = f"{team_spans[0].text} vs {team_spans[1].text}"
-                    print(f"Processing game: {game_title}")
-                    
-                    player_containers = container.find_elements(
-                        By.CSS_SELECTOR,
-                        "div.shots-block__player"
-                    )
-                    
-                    for player_container in player_containers:
-                        try:
-                            player_name = player_container.find_element(
-                                By.XPATH,
-                                ".//p[contains(@class, 'shots-block') and contains(@class, 'player-name')]"
-                            ).text.strip()
-                            
-                            team_name = player_container.find_element(
-                                By.XPATH,
-                                ".//p[contains(@class, 'shots-block') and contains(@class, 'player-team')]"
-                            ).text.strip()
-                            
-                            market_items = player_container.find_elements(
-                                By.XPATH,
-                                ".//div[contains(@class, 'markets-slider') and contains(@class, 'item')]"
-                            )
-                            
-                            for item in market_items:
-                                value = item.find_element(
-                                    By.XPATH,
-                                    ".//p[contains(@class, 'markets-slider') and contains(@class, 'amount')]"
-                                ).text.strip()
-                                
-                                odds = item.find_element(
-                                    By.XPATH,
-                                    ".//p[contains(@class, 'markets-slider') and contains(@class, 'stat')]"
-                                ).text.strip()
-                                
-                                game_data.append({
-                                    "game": game_title,
-                                    "player": player_name,
-                                    "team": team_name,
-                                    "statistic": statistic,
-                                    "value": value,
-                                    "odds": odds
-                                })
-                                
-                        except Exception as e:
-                            print(f"Error processing player in {game_title}: {e}")
-                            continue
-                    
-                    # Write game data to CSV after processing the entire game
+                    game_headers = self.select_statistic(driver, ready, league_name, stat)
+                except TimeoutException as e:
+                    print(f"No {stat} markets found for {league_name}: {e}")
+                    self.record_error(league_name, e, stat)
+                    continue
+
+                # Extract each game and write it as soon as it is parsed, in page order
+                games = []
+                cancelled = False
+                extract_start = time.monotonic()
+                for game_title, game_data in self.extract_sharded(driver, ready, league_name, stat, game_headers,
+                                                                  book, budget):
+                    self.readiness.record("extract_game", time.monotonic() - extract_start)
+                    self.metrics.observe("game", time.monotonic() - extract_start, league=league_name)
+                    if should_cancel and should_cancel():
+                        cancelled = True
+                        break
                     if game_data:
-                        self.write_to_csv(game_data, output_file)
+                        for row in game_data:
+                            row["book"] = book
+                            row["league"] = league_name
+                        self.write_rows(game_data, output_file)
+                        rows_written += len(game_data)
+                        self.record_game(league_name, game_data)
                         print(f"Wrote {len(game_data)} records for game: {game_title}")
-                        
-                except Exception as e:
-                    print(f"Error processing game in {league_name}: {e}")
+                        games.append([game_title, game_data])
+                        if on_game:
+                            on_game(league_name, game_title, game_data)
+                    extract_start = time.monotonic()
+
+                if cancelled:
+                    break
+                # No rows means a failed extraction or an empty page, not that every line was pulled,
+                # so the slice is neither completed nor cached; its claim is released below
+                if not games:
                     continue
-                
+                self.complete_slice(league_name, stat, output_file, book)
+                if self.cache:
+                    self.cache.put(league_name, stat, games, book)
+                completed.add(stat)
+
+        except CaptchaDetected as e:
+            # Don't hand a flagged browser session to the next league
+            healthy = False
+            print(f"Major error processing league {league_name}: {e}")
+            self.record_error(league_name, e)
+
+        except TimeoutException as e:
+            print(f"Major error processing league {league_name}: {e}")
+            self.record_error(league_name, e)
+
+        except WebDriverException as e:
+            # The browser or chromedriver likely crashed; recycle it
+            healthy = False
+            print(f"Major error processing league {league_name}: {e}")
+            self.record_error(league_name, e)
+
         except Exception as e:
             print(f"Major error processing league {league_name}: {e}")
+            self.record_error(league_name, e)
         
         finally:
             if driver:
-                driver.quit()
+                self.driver_pool.release(driver, healthy=healthy)
+            if book_slot:
+                self.book_limiter.release(book)
+            if budget_slot:
+                budget.release()
+            if self.cache:
+                for stat in statistics:
+                    if stat not in completed:
+                        self.cache.release(league_name, stat, book)
+
+        return rows_written
 
-    def scrape_data(self, leagues, statistic, max_workers=3):
+    def scrape_data(self, leagues, statistic, max_workers=3, should_cancel=None, on_game=None, books=None):
         """
-        Scrape data for the specified leagues and statistic
+        Scrape data for the specified leagues and statistic(s) from one or more sportsbooks
         
         Args:
             leagues (list): List of league names to scrape
-            statistic (str): Statistic to scrape (e.g., "Passes", "Shots")
-            max_workers (int): Maximum number of concurrent browser instances
+            statistic (str or list): Statistic or list of statistics to scrape
+                (e.g., "Passes" or ["Passes", "Shots"]); each league is opened
+                once and every statistic is collected in the same session
+            max_workers (int): Maximum number of concurrent browser instances,
+                game shard helpers included
+            should_cancel (callable): Polled during the scrape; returning True
+                stops it and raises ScrapeCancelled after flushing the output
+            on_game (callable): Called as on_game(league, game_title, rows) as
+                soon as each game has been scraped
+            books (list): Sportsbooks (sb= values) to scrape every league from,
+                concurrently within each book's limit in SPORTSBOOKS; defaults
+                to DEFAULT_SPORTSBOOK
             
         Returns:
-            str: Path to the output CSV file
+            str: Path to the output file
         """
         import concurrent.futures
         
+        books = get_sportsbooks(books)
+        units = book_units(books, leagues)
+
         # Generate output filename
-        output_file = self.get_output_filename(leagues, statistic)
+        output_file = self.get_output_filename(leagues, statistic, books)
         
-        # Actually use the smaller of max_workers or number of leagues
-        num_workers = min(max_workers, len(leagues))
+        # Actually use the smaller of max_workers or number of book/league pairs
+        num_workers = min(max_workers, len(units))
         
-        print(f"Starting scraper with {num_workers} concurrent browsers")
+        print(f"Starting scraper with {num_workers} concurrent browsers across {', '.join(books)} ({self.extractor.name} extraction, selectors v{self.selectors.version})")
         print(f"Output file: {output_file}")
         
+        start_time = time.monotonic()
+        self.open_output(output_file)
+        # Shard helpers take browsers left idle by the leagues, never more than max_workers in all
+        budget = threading.BoundedSemaphore(max_workers)
+
         # Process leagues with delays between starts
         with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
             futures = {}
             
             # Submit leagues in batches respecting max_workers limit
-            for i, league in enumerate(leagues):
+            for i, (book, league) in enumerate(units):
                 # Submit the league processing task
-                future = executor.submit(self.process_league, league, statistic, output_file)
-                futures[future] = league
-                print(f"Started processing {league}")
+                if should_cancel and should_cancel():
+                    break
+                future = executor.submit(self.process_league, league, statistic, output_file,
+                                         should_cancel, on_game, book, budget)
+                futures[future] = f"{league} ({book})"
+                print(f"Started processing {league} ({book})")
                 
-                # Add delay before starting next thread (except for last league)
-                if i < len(leagues) - 1:
-                    delay = 5  # 5 second delay between thread starts
-                    print(f"Waiting {delay} seconds before starting next browser...")
-                    time.sleep(delay)
+                # Optional stagger before starting the next league; readiness
+                # checks inside process_league replace the old fixed delay
+                if LEAGUE_START_STAGGER and i < len(units) - 1:
+                    print(f"Waiting {LEAGUE_START_STAGGER} seconds before starting next browser...")
+                    time.sleep(LEAGUE_START_STAGGER)
                 
             # Wait for all tasks to complete and show progress
             completed = 0
+            total_rows = 0
             for future in concurrent.futures.as_completed(futures):
                 league = futures[future]
                 try:
-                    future.result()
+                    total_rows += future.result()
                     completed += 1
-                    print(f"Completed processing {league} ({completed}/{len(leagues)} leagues done)")
+                    print(f"Completed processing {league} ({completed}/{len(futures)} leagues done)")
                 except Exception as e:
                     print(f"League {league} generated an exception: {e}")
+
+        # Wait for the writer thread to flush everything to disk
+        self.close_output(output_file)
+
+        elapsed = time.monotonic() - start_time
+        print(f"Wrote {total_rows} rows in {elapsed:.1f}s ({total_rows / elapsed if elapsed else 0:.1f} rows/sec)")
+        print(f"Readiness waits: {self.readiness_stats()}")
+        print(f"Step timings: {self.metrics.summary()}")
+
+        if should_cancel and should_cancel():
+            raise ScrapeCancelled(output_file)
         
-        return output_file
\ No newline at end of file
+        return output_file
+
+
+def create_scraper(engine="selenium", **kwargs):
+    """
+    Create a scraper for the given engine
+
+    Args:
+        engine (str): "selenium" for SportsScraper or "async" for AsyncSportsScraper
+        **kwargs: Passed to the scraper constructor
+    """
+    if engine == "selenium":
+        return SportsScraper(**kwargs)
+    if engine == "async":
+        # Imported lazily so the websockets dependency is only needed for this engine
+        from scraper.async_engine import AsyncSportsScraper
+        return AsyncSportsScraper(**kwargs)
+    raise ValueError(f"Unknown engine: {engine} (available: selenium, async)")
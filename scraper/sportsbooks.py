@@ -0,0 +1,77 @@
+"""
+Sportsbooks, selected on the betbuilder page by its sb= query parameter
+
+Every row is tagged with the book it was scraped from, so one output file can
+hold several books keyed by (book, game, player, statistic, value). Each book
+has its own concurrency limit in SPORTSBOOKS, enforced per scraper by
+BookLimiter, so fanning a job out across books never puts more than that
+many browsers on one book.
+"""
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from scraper.config import DEFAULT_SPORTSBOOK, SPORTSBOOKS
+
+
+def sportsbook_url(base_url, book):
+    """Return base_url with its sb= query parameter set to book"""
+    parts = urlsplit(base_url)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if name != "sb"]
+    query.append(("sb", book))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def get_sportsbooks(books=None):
+    """
+    Validate a list of sportsbooks
+
+    Returns:
+        list: The books without duplicates, or [DEFAULT_SPORTSBOOK] if none were given
+    """
+    books = list(dict.fromkeys(books or [DEFAULT_SPORTSBOOK]))
+    unknown = [book for book in books if book not in SPORTSBOOKS]
+    if unknown:
+        raise ValueError(f"Unknown sportsbooks: {', '.join(unknown)} (available: {', '.join(SPORTSBOOKS)})")
+    return books
+
+
+def book_units(books, leagues):
+    """Return (book, league) pairs, alternating books so concurrent work spreads across them"""
+    return [(book, league) for league in leagues for book in books]
+
+
+class BookLimiter:
+    """Caps the browsers that have each sportsbook open at the same time"""
+
+    def __init__(self, limits=None):
+        """
+        Args:
+            limits (dict): Book -> most concurrent browsers, defaults to SPORTSBOOKS
+        """
+        self.limits = dict(SPORTSBOOKS if limits is None else limits)
+        self._condition = threading.Condition()
+        self._in_use = {}
+
+    def limit(self, book):
+        """Most browsers allowed on book at once"""
+        return max(1, self.limits.get(book, 1))
+
+    def try_acquire(self, book):
+        """Take a slot for book without waiting; returns whether one was free"""
+        with self._condition:
+            if self._in_use.get(book, 0) >= self.limit(book):
+                return False
+            self._in_use[book] = self._in_use.get(book, 0) + 1
+            return True
+
+    def acquire(self, book):
+        """Take a slot for book, waiting until one is free"""
+        with self._condition:
+            while self._in_use.get(book, 0) >= self.limit(book):
+                self._condition.wait()
+            self._in_use[book] = self._in_use.get(book, 0) + 1
+
+    def release(self, book):
+        with self._condition:
+            self._in_use[book] -= 1
+            self._condition.notify_all()
@@ -0,0 +1,358 @@
+"""
+Buffered output writers with typed columns
+
+Workers hand rows to OutputWriter.write(), which only enqueues them. A single
+writer thread per output file converts rows to typed values and flushes them
+to disk in batches, so workers never wait on a lock or on the disk.
+complete_slice() tells the writer a (book, league, statistic) slice is finished,
+which DeltaWriter uses to detect removed lines. With an OddsStore, each flushed
+batch is also inserted there under the output file's name.
+"""
+import os
+import re
+import csv
+import json
+import time
+import importlib.util
+import uuid
+import queue
+import threading
+
+from scraper.config import DEFAULT_SPORTSBOOK, WRITER_BATCH_SIZE, WRITER_FLUSH_INTERVAL
+
+# Columns of every output file, in order; rows are keyed by (book, game, player, statistic, value)
+OUTPUT_COLUMNS = ["book", "league", "game", "player", "team", "statistic", "value", "odds", "odds_american"]
+
+# Columns stored as floats; everything else is a string
+NUMERIC_COLUMNS = {"value", "odds", "odds_american"}
+
+FORMAT_EXTENSIONS = {
+    "csv": "csv",
+    "ndjson": "ndjson",
+    "parquet": "parquet",
+    "delta": "delta.ndjson",
+}
+
+NUMBER_PATTERN = re.compile(r"[-+]?\d+(?:\.\d+)?")
+
+_SENTINEL = object()
+
+
+class SliceComplete:
+    """Queue marker: every row of a (book, league, statistic) slice has been written"""
+
+    def __init__(self, league, statistic, book=DEFAULT_SPORTSBOOK):
+        self.league = league
+        self.statistic = statistic
+        self.book = book
+
+
+def parse_number(text):
+    """Return the first number in a line value such as "30+" or "Over 1.5", or None"""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = NUMBER_PATTERN.search(str(text).replace(",", ""))
+    return float(match.group()) if match else None
+
+
+def parse_odds(text):
+    """
+    Parse odds in American ("+150", "-200"), decimal ("1.85") or fractional
+    ("5/2") notation
+
+    Returns:
+        tuple: (decimal odds, American odds), each None if unparseable
+    """
+    if text is None:
+        return None, None
+    text = str(text).strip().replace(",", "")
+    try:
+        if "/" in text:
+            numerator, denominator = text.split("/", 1)
+            decimal = 1 + float(numerator) / float(denominator)
+        elif text.startswith(("+", "-")) or abs(float(text)) >= 100:
+            american = float(text)
+            if american > 0:
+                decimal = 1 + american / 100
+            elif american < 0:
+                decimal = 1 + 100 / -american
+            else:
+                return None, None
+        else:
+            decimal = float(text)
+    except (ValueError, ZeroDivisionError):
+        return None, None
+
+    if decimal <= 1:
+        return None, None
+    if decimal >= 2:
+        american = (decimal - 1) * 100
+    else:
+        american = -100 / (decimal - 1)
+    return round(decimal, 4), round(american, 2)
+
+
+def output_filename(output_dir, name, output_format):
+    """
+    Return a new output file path for name in output_dir
+
+    A timestamp and a short random ID are appended, so runs of the same
+    selection started in the same second (even in different processes)
+    never share a file.
+    """
+    run_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    return os.path.join(output_dir, f"{name}_{run_id}.{FORMAT_EXTENSIONS[output_format]}")
+
+
+def typed_row(row, columns=OUTPUT_COLUMNS):
+    """Convert a scraped row of strings to typed output columns"""
+    result = {column: row.get(column) for column in columns}
+    if "value" in result:
+        result["value"] = parse_number(row.get("value"))
+    if "odds" in result:
+        result["odds"], american = parse_odds(row.get("odds"))
+        if "odds_american" in result:
+            result["odds_american"] = american
+    return result
+
+
+class OutputWriter:
+    """Base class: a queue drained by one writer thread that flushes in batches"""
+
+    def __init__(self, path, columns=OUTPUT_COLUMNS, batch_size=WRITER_BATCH_SIZE,
+                 flush_interval=WRITER_FLUSH_INTERVAL, metrics=None, store=None):
+        self.path = path
+        self.metrics = metrics  # Optional scraper.metrics.Metrics timing each flush
+        self.store = store  # Optional scraper.odds_store.OddsStore that also receives every batch
+        self.columns = columns
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.write_seconds = 0.0  # Time spent converting and writing batches
+        self.error = None
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"writer:{path}", daemon=True)
+        self._thread.start()
+
+    def write(self, rows):
+        """Enqueue rows for writing; never blocks on disk"""
+        if rows:
+            self._queue.put(list(rows))
+
+    def complete_slice(self, league, statistic, book=DEFAULT_SPORTSBOOK):
+        """Mark a book's league statistic as fully scraped, after the rows already written"""
+        self._queue.put(SliceComplete(league, statistic, book))
+
+    def close(self):
+        """Flush everything queued so far and close the file"""
+        self._queue.put(_SENTINEL)
+        self._thread.join()
+        if self.error:
+            raise self.error
+
+    def _run(self):
+        batch = []
+        scraped = []  # The batch's rows as queued, for the store
+        try:
+            self._open()
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = None
+
+                if item is _SENTINEL:
+                    break
+                if isinstance(item, SliceComplete):
+                    if batch:
+                        self._flush(batch, scraped)
+                        batch, scraped = [], []
+                    self._complete_slice(item.league, item.statistic, item.book)
+                    continue
+                if item:
+                    start = time.perf_counter()
+                    batch.extend(self._prepare(item))
+                    self.write_seconds += time.perf_counter() - start
+                    if self.store:
+                        scraped.extend(item)
+
+                # Flush on a full batch, or when the queue goes quiet
+                if batch and (len(batch) >= self.batch_size or item is None or self._queue.empty()):
+                    self._flush(batch, scraped)
+                    batch, scraped = [], []
+
+            if batch:
+                self._flush(batch, scraped)
+        except Exception as e:
+            print(f"Error writing {self.path}: {e}")
+            self.error = e
+        finally:
+            try:
+                self._close()
+            except Exception as e:
+                self.error = self.error or e
+
+    def _flush(self, batch, scraped=()):
+        start = time.perf_counter()
+        self._write_batch(batch)
+        elapsed = time.perf_counter() - start
+        self.write_seconds += elapsed
+        self.rows_written += len(batch)
+        if self.metrics:
+            self.metrics.observe("write", elapsed, {"rows": len(batch), "path": os.path.basename(self.path)})
+        if self.store:
+            self._store_batch(scraped)
+
+    def _store_batch(self, rows):
+        # The file is the primary output, so a store failure is reported but not fatal
+        start = time.perf_counter()
+        try:
+            self.store.insert(os.path.basename(self.path), rows)
+        except Exception as e:
+            print(f"Error storing rows from {self.path}: {e}")
+            return
+        if self.metrics:
+            self.metrics.observe("store_write", time.perf_counter() - start,
+                                 {"rows": len(rows), "path": os.path.basename(self.path)})
+
+    def _prepare(self, rows):
+        """Convert queued rows to what _write_batch expects"""
+        return [typed_row(row, self.columns) for row in rows]
+
+    def _complete_slice(self, league, statistic, book):
+        """Called in the writer thread once a slice's rows have all been flushed"""
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _write_batch(self, rows):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CsvWriter(OutputWriter):
+    def _open(self):
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns)
+        self._writer.writeheader()
+        self._file.flush()
+
+    def _write_batch(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class NdjsonWriter(OutputWriter):
+    def _open(self):
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def _write_batch(self, rows):
+        self._file.write("".join(json.dumps(row) + "\n" for row in rows))
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetWriter(OutputWriter):
+    """Writes each batch as a Parquet row group; requires pyarrow"""
+
+    def __init__(self, path, **kwargs):
+        # Fail in the caller's thread rather than in the writer thread
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow")
+        super().__init__(path, **kwargs)
+
+    def _open(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([
+            (column, pa.float64() if column in NUMERIC_COLUMNS else pa.string())
+            for column in self.columns
+        ])
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+
+    def _write_batch(self, rows):
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+
+    def _close(self):
+        if getattr(self, "_writer", None):
+            self._writer.close()
+
+
+class DeltaWriter(OutputWriter):
+    """
+    Writes only what changed since the last snapshot
+
+    Rows are held per (book, league, statistic) slice until the slice is complete,
+    then diffed against the SnapshotStore. The add/change/remove records are
+    appended to the store and written to this run's NDJSON file. Slices that
+    never complete (failed or cancelled) or complete without any rows report
+    additions and changes but no removals.
+    """
+
+    def __init__(self, path, store_path=None, **kwargs):
+        self.store_path = store_path
+        self._pending = {}
+        super().__init__(path, **kwargs)
+
+    def _prepare(self, rows):
+        # The snapshot key uses the raw line text ("Over 1.5"), not the parsed value
+        return [dict(row) for row in rows]
+
+    def _open(self):
+        from scraper.delta import SnapshotStore, default_store_path
+
+        self.snapshots = SnapshotStore(self.store_path or default_store_path(self.path))
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def _write_batch(self, rows):
+        for row in rows:
+            key = (row.get("book") or DEFAULT_SPORTSBOOK, row.get("league"), row.get("statistic"))
+            self._pending.setdefault(key, []).append(row)
+
+    def _write_changes(self, changes):
+        if changes:
+            self._file.write("".join(json.dumps(change) + "\n" for change in changes))
+            self._file.flush()
+
+    def _complete_slice(self, league, statistic, book):
+        rows = self._pending.pop((book, league, statistic), [])
+        # An empty slice is treated as incomplete so it never removes every known line
+        self._write_changes(self.snapshots.apply(league, statistic, rows, complete=bool(rows), book=book))
+
+    def _close(self):
+        try:
+            for (book, league, statistic), rows in self._pending.items():
+                self._write_changes(self.snapshots.apply(league, statistic, rows, complete=False, book=book))
+            self._pending = {}
+        finally:
+            if getattr(self, "_file", None):
+                self._file.close()
+
+
+WRITERS = {
+    "csv": CsvWriter,
+    "ndjson": NdjsonWriter,
+    "parquet": ParquetWriter,
+    "delta": DeltaWriter,
+}
+
+
+def create_writer(path, output_format="csv", **kwargs):
+    """Create and start a writer for the given output format"""
+    try:
+        writer_class = WRITERS[output_format]
+    except KeyError:
+        raise ValueError(f"Unknown output format: {output_format} (available: {', '.join(WRITERS)})")
+    return writer_class(path, **kwargs)
@@ -4,17 +4,27 @@ document.addEventListener('DOMContentLoaded', () => {
     // Elements
     const leaguesContainer = document.getElementById('leagues-container');
     const statisticsContainer = document.getElementById('statistics-container');
+    const sportsbooksContainer = document.getElementById('sportsbooks-container');
     const scraperForm = document.getElementById('scraper-form');
     const statusContainer = document.getElementById('status-container');
     const resultsContainer = document.getElementById('results-container');
     const dataModal = new bootstrap.Modal(document.getElementById('dataModal'));
     const resultsTable = document.getElementById('results-table').querySelector('tbody');
+    // Message rows span every column of the results table
+    const resultsColumnCount = document.querySelectorAll('#results-table thead th').length;
     const downloadLink = document.getElementById('download-link');
+    const loadMoreButton = document.getElementById('load-more-button');
     
     // Active jobs tracking
     const activeJobs = {};
+    // Open event streams and rows received so far, by job ID
+    const jobStreams = {};
+    const liveRows = {};
+    // Most rows kept in memory per job for the live results view
+    const LIVE_ROWS_LIMIT = 5000;
+    let liveResultsJob = null;
     
-    // Initialize by loading leagues and statistics
+    // Initialize by loading leagues, statistics and sportsbooks
     initializeApp();
     
     function initializeApp() {
@@ -34,13 +44,20 @@ document.addEventListener('DOMContentLoaded', () => {
             })
             .catch(error => console.error('Error fetching statistics:', error));
         
+        // Fetch sportsbooks
+        fetch('/api/sportsbooks')
+            .then(response => response.json())
+            .then(data => {
+                renderSportsbooks(data.sportsbooks);
+            })
+            .catch(error => console.error('Error fetching sportsbooks:', error));
+        
         // Check for any existing jobs
         fetch('/api/jobs')
             .then(response => response.json())
             .then(data => {
                 const jobs = data.jobs || {};
                 Object.entries(jobs).forEach(([jobId, jobData]) => {
-                    activeJobs[jobId] = jobData;
                     updateJobStatus(jobId, jobData);
                 });
                 updateStatusContainer();
@@ -64,13 +81,26 @@ document.addEventListener('DOMContentLoaded', () => {
     function renderStatistics(statistics) {
         statisticsContainer.innerHTML = '';
         statistics.forEach((statistic, index) => {
-            const radio = document.createElement('div');
-            radio.className = 'radio-item form-check';
-            radio.innerHTML = `
-                <input class="form-check-input" type="radio" id="stat-${statistic}" name="statistic" value="${statistic}" ${index === 0 ? 'checked' : ''}>
+            const checkbox = document.createElement('div');
+            checkbox.className = 'checkbox-item form-check';
+            checkbox.innerHTML = `
+                <input class="form-check-input" type="checkbox" id="stat-${statistic}" name="statistics" value="${statistic}" ${index === 0 ? 'checked' : ''}>
                 <label class="form-check-label" for="stat-${statistic}">${statistic}</label>
             `;
-            statisticsContainer.appendChild(radio);
+            statisticsContainer.appendChild(checkbox);
+        });
+    }
+    
+    function renderSportsbooks(sportsbooks) {
+        sportsbooksContainer.innerHTML = '';
+        sportsbooks.forEach((book, index) => {
+            const checkbox = document.createElement('div');
+            checkbox.className = 'checkbox-item form-check';
+            checkbox.innerHTML = `
+                <input class="form-check-input" type="checkbox" id="book-${book}" name="books" value="${book}" ${index === 0 ? 'checked' : ''}>
+                <label class="form-check-label" for="book-${book}">${book}</label>
+            `;
+            sportsbooksContainer.appendChild(checkbox);
         });
     }
     
@@ -88,12 +118,20 @@ document.addEventListener('DOMContentLoaded', () => {
             statusItem.innerHTML = `
                 <p><strong>Job ID:</strong> ${jobId}</p>
                 <p><strong>Leagues:</strong> ${job.leagues.join(', ')}</p>
-                <p><strong>Statistic:</strong> ${job.statistic}</p>
-                <p><strong>Status:</strong> ${job.status}</p>
+                <p><strong>Statistics:</strong> ${(job.statistics || [job.statistic]).join(', ')}</p>
+                ${job.books ? `<p><strong>Sportsbooks:</strong> ${job.books.join(', ')}</p>` : ''}
+                <p><strong>Status:</strong> ${job.status}${job.cancel_requested && job.status === 'running' ? ' (cancelling)' : ''}</p>
+                ${job.rows_received ? `<p><strong>Rows received:</strong> ${job.rows_received}</p>` : ''}
+                ${!job.output_file && liveRows[jobId] && liveRows[jobId].length ? `
+                    <button class="btn btn-sm btn-primary live-results-button" data-job-id="${jobId}">View Rows So Far</button>
+                ` : ''}
                 ${job.output_file ? `
                     <button class="btn btn-sm btn-primary results-button" data-job-id="${jobId}" data-file="${job.output_file}">View Results</button>
                     <a href="/api/download/${job.output_file}" class="btn btn-sm btn-success" download>Download CSV</a>
                 ` : ''}
+                ${isActive(job.status) && !job.cancel_requested ? `
+                    <button class="btn btn-sm btn-outline-danger cancel-button" data-job-id="${jobId}">Cancel</button>
+                ` : ''}
                 ${job.error ? `<p class="text-danger"><strong>Error:</strong> ${job.error}</p>` : ''}
             `;
             statusContainer.appendChild(statusItem);
@@ -107,87 +145,186 @@ document.addEventListener('DOMContentLoaded', () => {
                 viewResults(filename);
             });
         });
+        
+        document.querySelectorAll('.live-results-button').forEach(button => {
+            button.addEventListener('click', (e) => {
+                viewLiveResults(e.target.getAttribute('data-job-id'));
+            });
+        });
+        
+        document.querySelectorAll('.cancel-button').forEach(button => {
+            button.addEventListener('click', (e) => {
+                cancelJob(e.target.getAttribute('data-job-id'));
+            });
+        });
+    }
+    
+    function isActive(status) {
+        return status === 'starting' || status === 'queued' || status === 'running';
+    }
+    
+    function cancelJob(jobId) {
+        fetch(`/api/job/${jobId}/cancel`, { method: 'POST' })
+            .then(response => response.json())
+            .then(data => {
+                if (data.error) {
+                    alert(`Error: ${data.error}`);
+                }
+                // The new status arrives on the job's event stream
+            })
+            .catch(error => console.error(`Error cancelling job ${jobId}:`, error));
     }
     
     function getStatusClass(status) {
         switch (status) {
             case 'starting':
+            case 'queued':
             case 'running':
                 return 'status-running';
             case 'completed':
                 return 'status-completed';
             case 'failed':
                 return 'status-failed';
+            case 'cancelled':
+                return 'status-cancelled';
             default:
                 return '';
         }
     }
     
     function updateJobStatus(jobId, data) {
-        activeJobs[jobId] = data;
+        jobId = String(jobId);
+        const rowsReceived = activeJobs[jobId] ? activeJobs[jobId].rows_received : 0;
+        activeJobs[jobId] = Object.assign(data, { rows_received: rowsReceived || 0 });
         
-        // If job is still running, poll for updates
-        if (data.status === 'starting' || data.status === 'running') {
-            setTimeout(() => {
-                pollJobStatus(jobId);
-            }, 5000);
+        // Follow unfinished jobs over Server-Sent Events
+        if (isActive(data.status)) {
+            subscribeToJob(jobId);
         }
         
         updateStatusContainer();
     }
     
-    function pollJobStatus(jobId) {
-        fetch(`/api/job/${jobId}`)
-            .then(response => response.json())
-            .then(data => {
-                updateJobStatus(jobId, data);
-            })
-            .catch(error => {
-                console.error(`Error polling job ${jobId}:`, error);
-            });
+    function subscribeToJob(jobId) {
+        if (jobStreams[jobId]) {
+            return;
+        }
+        // EventSource reconnects by itself and resumes from the last event ID
+        const source = new EventSource(`/api/job/${jobId}/events`);
+        jobStreams[jobId] = source;
+        
+        source.addEventListener('status', (e) => {
+            updateJobStatus(jobId, JSON.parse(e.data));
+        });
+        
+        source.addEventListener('rows', (e) => {
+            const game = JSON.parse(e.data);
+            const rows = liveRows[jobId] || (liveRows[jobId] = []);
+            const kept = game.rows.slice(0, Math.max(0, LIVE_ROWS_LIMIT - rows.length));
+            rows.push(...kept);
+            if (activeJobs[jobId]) {
+                activeJobs[jobId].rows_received += game.rows.length;
+            }
+            if (liveResultsJob === jobId) {
+                kept.forEach(appendResultRow);
+            }
+            updateStatusContainer();
+        });
+        
+        source.addEventListener('end', () => {
+            source.close();
+            delete jobStreams[jobId];
+        });
+    }
+    
+    // Rows fetched per page of results
+    const RESULTS_PAGE_SIZE = 500;
+    let resultsFile = null;
+    let resultsOffset = 0;
+    
+    function appendResultRow(row) {
+        const tr = document.createElement('tr');
+        tr.innerHTML = `
+            <td>${row.book ?? ''}</td>
+            <td>${row.game}</td>
+            <td>${row.player}</td>
+            <td>${row.team}</td>
+            <td>${row.statistic}</td>
+            <td>${row.value ?? ''}</td>
+            <td>${row.odds ?? ''}</td>
+        `;
+        resultsTable.appendChild(tr);
     }
     
     function viewResults(filename) {
         // Clear the table
         resultsTable.innerHTML = '';
+        resultsFile = filename;
+        resultsOffset = 0;
+        liveResultsJob = null;
+        loadMoreButton.classList.add('d-none');
         
         // Set the download link
         downloadLink.href = `/api/download/${filename}`;
+        downloadLink.classList.remove('d-none');
+        
+        loadResultsPage(true);
+    }
+    
+    function viewLiveResults(jobId) {
+        // Show the rows streamed so far; new games are appended as they arrive
+        resultsTable.innerHTML = '';
+        resultsFile = null;
+        liveResultsJob = jobId;
+        loadMoreButton.classList.add('d-none');
+        downloadLink.classList.add('d-none');
+        
+        (liveRows[jobId] || []).forEach(appendResultRow);
+        dataModal.show();
+    }
+    
+    function loadResultsPage(showModal) {
+        const filename = resultsFile;
+        loadMoreButton.disabled = true;
         
-        // Fetch and display the data
-        fetch(`/api/data/${filename}`)
+        // Fetch and display one page of data
+        fetch(`/api/data/${filename}?offset=${resultsOffset}&limit=${RESULTS_PAGE_SIZE}`)
             .then(response => response.json())
             .then(result => {
+                if (filename !== resultsFile) {
+                    return;
+                }
                 const data = result.data || [];
                 
-                if (data.length === 0) {
-                    resultsTable.innerHTML = '<tr><td colspan="6">No data available</td></tr>';
-                    return;
+                if (data.length === 0 && resultsOffset === 0) {
+                    resultsTable.innerHTML = `<tr><td colspan="${resultsColumnCount}">No data available</td></tr>`;
                 }
                 
-                data.forEach(row => {
-                    const tr = document.createElement('tr');
-                    tr.innerHTML = `
-                        <td>${row.game}</td>
-                        <td>${row.player}</td>
-                        <td>${row.team}</td>
-                        <td>${row.statistic}</td>
-                        <td>${row.value}</td>
-                        <td>${row.odds}</td>
-                    `;
-                    resultsTable.appendChild(tr);
-                });
+                data.forEach(appendResultRow);
+                
+                resultsOffset += data.length;
+                loadMoreButton.disabled = false;
+                loadMoreButton.classList.toggle('d-none', !result.has_more);
+                if (result.total !== null && result.total !== undefined) {
+                    loadMoreButton.textContent = `Load more (${resultsOffset} of ${result.total})`;
+                }
                 
                 // Show the modal
-                dataModal.show();
+                if (showModal) {
+                    dataModal.show();
+                }
             })
             .catch(error => {
                 console.error('Error fetching results:', error);
-                resultsTable.innerHTML = '<tr><td colspan="6">Error loading data</td></tr>';
-                dataModal.show();
+                resultsTable.innerHTML = `<tr><td colspan="${resultsColumnCount}">Error loading data</td></tr>`;
+                if (showModal) {
+                    dataModal.show();
+                }
             });
     }
     
+    loadMoreButton.addEventListener('click', () => loadResultsPage(false));
+    
     // Form submission handler
     scraperForm.addEventListener('submit', (e) => {
         e.preventDefault();
@@ -197,8 +334,15 @@ document.addEventListener('DOMContentLoaded', () => {
             document.querySelectorAll('input[name="leagues"]:checked')
         ).map(input => input.value);
         
-        // Get selected statistic
-        const selectedStatistic = document.querySelector('input[name="statistic"]:checked')?.value;
+        // Get selected statistics
+        const selectedStatistics = Array.from(
+            document.querySelectorAll('input[name="statistics"]:checked')
+        ).map(input => input.value);
+        
+        // Get selected sportsbooks
+        const selectedBooks = Array.from(
+            document.querySelectorAll('input[name="books"]:checked')
+        ).map(input => input.value);
         
         // Validate selection
         if (selectedLeagues.length === 0) {
@@ -206,8 +350,13 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
         
-        if (!selectedStatistic) {
-            alert('Please select a statistic');
+        if (selectedStatistics.length === 0) {
+            alert('Please select at least one statistic');
+            return;
+        }
+        
+        if (selectedBooks.length === 0) {
+            alert('Please select at least one sportsbook');
             return;
         }
         
@@ -224,7 +373,8 @@ document.addEventListener('DOMContentLoaded', () => {
             },
             body: JSON.stringify({
                 leagues: selectedLeagues,
-                statistic: selectedStatistic
+                statistics: selectedStatistics,
+                books: selectedBooks
             }),
         })
         .then(response => response.json())
@@ -239,20 +389,14 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
             
-            // Add job to active jobs
-            const jobId = data.job_id;
-            activeJobs[jobId] = {
+            // Add job to active jobs and follow its event stream
+            updateJobStatus(data.job_id, {
                 leagues: selectedLeagues,
-                statistic: selectedStatistic,
-                status: 'starting',
+                statistics: selectedStatistics,
+                books: selectedBooks,
+                status: 'queued',
                 output_file: null
-            };
-            
-            // Update UI
-            updateStatusContainer();
-            
-            // Start polling for job status
-            pollJobStatus(jobId);
+            });
         })
         .catch(error => {
             console.error('Error starting scrape:', error);
@@ -0,0 +1,107 @@
+"""
+Coordinator and scrape nodes on localhost, with fake scrapers instead of browsers
+
+Run with: python -m pytest tests
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper.distributed import DONE, FAILED, Coordinator, ScrapeNode
+
+LEAGUES = ["EPL", "La Liga", "Serie A"]
+STATISTICS = ["Passes", "Shots"]
+
+
+class FakeScraper:
+    """Stands in for SportsScraper: one game per task, or an error every time if failing"""
+
+    output_format = "ndjson"
+
+    def __init__(self, failing=False):
+        self.failing = failing
+        self._slice_callbacks = {}
+
+    def open_output(self, filename, on_slice=None):
+        self._slice_callbacks[filename] = on_slice
+
+    def close_output(self, filename):
+        self._slice_callbacks.pop(filename, None)
+
+    def process_league(self, league, statistics, output_file, should_cancel=None, on_game=None, book=None):
+        if self.failing:
+            raise RuntimeError("browser crashed")
+        for statistic in statistics:
+            rows = [{"book": book, "league": league, "game": "A vs B", "player": "P", "team": "A",
+                     "statistic": statistic, "value": "Over 1.5", "odds": "1.9"}]
+            on_game(league, "A vs B", rows)
+            self._slice_callbacks[output_file](league, statistic)
+        return len(statistics)
+
+
+class LocalCluster(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.coordinator = Coordinator("127.0.0.1", 0, output_dir=self.output_dir, output_format="ndjson").start()
+        self.threads = []
+
+    def tearDown(self):
+        self.coordinator.stop()
+        for thread in self.threads:
+            thread.join(timeout=10)
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def start_node(self, name, failing=False):
+        host, port = self.coordinator.address
+        node = ScrapeNode(FakeScraper(failing), host, port, name=name, browsers=1)
+        thread = threading.Thread(target=node.run, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def wait_for_nodes(self, count):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if sum(stats["connected"] for stats in self.coordinator.stats()["nodes"].values()) == count:
+                return
+            time.sleep(0.05)
+        self.fail(f"{count} nodes did not connect")
+
+    def run_job(self):
+        job = self.coordinator.submit(LEAGUES, STATISTICS)
+        self.assertTrue(job.done.wait(30), "job did not finish")
+        return job
+
+    def test_failed_tasks_move_to_other_nodes(self):
+        self.start_node("bad", failing=True)
+        self.start_node("good-1")
+        self.start_node("good-2")
+        self.wait_for_nodes(3)
+        job = self.run_job()
+
+        self.assertEqual([task.status for task in job.tasks], [DONE] * len(LEAGUES) * len(STATISTICS))
+        for task in job.tasks:
+            # A task that failed on the bad node is never handed back to it while good nodes are connected
+            self.assertLessEqual(sum(error.startswith("bad:") for error in task.errors), 1, task.errors)
+        with open(job.output_file) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(sorted((row["league"], row["statistic"]) for row in rows),
+                         sorted((league, statistic) for league in LEAGUES for statistic in STATISTICS))
+
+    def test_only_node_retries_until_given_up(self):
+        self.start_node("bad", failing=True)
+        self.wait_for_nodes(1)
+        job = self.run_job()
+
+        for task in job.tasks:
+            self.assertEqual(task.status, FAILED)
+            self.assertEqual(task.failures, self.coordinator.max_attempts)
+
+
+if __name__ == "__main__":
+    unittest.main()